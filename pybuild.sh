@@ -4,4 +4,6 @@ COMMIT_HASH=$(git rev-parse --short=8 HEAD)
 sed -i "s/^COMMIT_HASH = .*/COMMIT_HASH = \"$COMMIT_HASH\"/" src/emd/revision.py
 # update supported models
 python tests/generate_supported_models_doc_cli.py -o docs/en/supported_models.md
+# update the model index used to load models on demand
+python tests/generate_model_index_cli.py
 poetry build
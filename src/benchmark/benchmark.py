@@ -2,14 +2,17 @@ import argparse
 import functools
 import random
 import os
+import sys
 import json
+import time
 import logging
+import signal
+import subprocess
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
-from transformers import AutoTokenizer
-
 from userdef import UserDef as BaseUserDef
+from synthetic_prompts import get_synthetic_prompts
 
 model_id = os.environ.get("MODEL_ID", "Qwen2.5-7B-Instruct")
 
@@ -25,7 +28,34 @@ except (TypeError, ValueError):
 
 print(f"max_tokens set to {max_tokens}")
 
-tokenizer = AutoTokenizer.from_pretrained("Qwen/Qwen2.5-7B-Instruct")
+
+class WhitespaceTokenizer:
+    """
+    Stand-in for the HuggingFace tokenizer when transformers or the hub is
+    not available, e.g. offline runs. Tokens are whitespace separated words.
+    """
+
+    def __call__(self, text):
+        return {"input_ids": self.encode(text)}
+
+    def encode(self, text, add_special_tokens=False):
+        return text.split()
+
+    def decode(self, token):
+        return token
+
+
+@functools.lru_cache(maxsize=1)
+def get_tokenizer():
+    tokenizer_id = os.environ.get("TOKENIZER", "Qwen/Qwen2.5-7B-Instruct")
+    if tokenizer_id == "whitespace":
+        return WhitespaceTokenizer()
+    try:
+        from transformers import AutoTokenizer
+        return AutoTokenizer.from_pretrained(tokenizer_id)
+    except Exception as e:
+        print(f"Failed to load tokenizer {tokenizer_id}, fall back to whitespace tokenizer: {e}")
+        return WhitespaceTokenizer()
 
 default_system_prompt = """You are a helpful, respectful and honest assistant. Always answer as helpfully as possible, while being safe. Your answers should not include any harmful, unethical, racist, sexist, toxic, dangerous, or illegal content. Please ensure that your responses are socially unbiased and positive in nature.
 
@@ -67,6 +97,7 @@ def get_prompt_set(min_input_length=0, max_input_length=500):
         dataset = [json.loads(line) for line in content.decode().split("\n")]
         print("Dataset downloaded")
 
+    tokenizer = get_tokenizer()
     for d in dataset:
         d["question"] = d["context"] + d["instruction"]
         d["input_tokens"] = len(tokenizer(d["question"])["input_ids"])
@@ -79,10 +110,19 @@ def get_prompt_set(min_input_length=0, max_input_length=500):
 
 # prompts = get_prompt_set(30, 150)
 user_prompt_file = os.environ.get("PROMPT_FILE")
-with open(user_prompt_file, "r") as f:
-    prompt = f.read()
-    print(f"The tokens of the prompt is {len(tokenizer(prompt)['input_ids'])}")
-prompts = [prompt]
+if user_prompt_file:
+    with open(user_prompt_file, "r") as f:
+        prompt = f.read()
+        print(f"The tokens of the prompt is {len(get_tokenizer()(prompt)['input_ids'])}")
+    prompts = [prompt]
+else:
+    # no prompt file, use the bundled synthetic corpus
+    prompts = get_synthetic_prompts(
+        int(os.environ.get("SYNTHETIC_PROMPT_NUM", 1000)),
+        int(os.environ.get("SYNTHETIC_PROMPT_MIN_WORDS", 16)),
+        int(os.environ.get("SYNTHETIC_PROMPT_MAX_WORDS", 256)),
+    )
+    print(f"Using {len(prompts)} synthetic prompts")
 
 
 class OpenAIUserDef(BaseUserDef):
@@ -129,19 +169,22 @@ class OpenAIUserDef(BaseUserDef):
         decoded_content = response_bytes.decode("utf-8").strip()
         data = json.loads(decoded_content)
         content = data.get("choices")[0].get("message").get("content")
-        print(f"The content length is {len(content)}")
-        print(f"The tokens of the content is {len(tokenizer(content)['input_ids'])}")
-        last_token_id = tokenizer(content)["input_ids"][-1]
-        last_token = tokenizer.decode(last_token_id)
-        print(f"The last token id of the content is {last_token}")
-
         # Convert text to token IDs for benchmarking
-        return tokenizer.encode(content, add_special_tokens=False)
+        return get_tokenizer().encode(content, add_special_tokens=False)
+
+    @classmethod
+    def parse_event(cls, data: bytes):
+        # the token counts of the server, only re-tokenize if it sends no usage
+        usage = json.loads(data).get("usage")
+        if usage and usage.get("completion_tokens") is not None:
+            return usage["completion_tokens"], usage
+        return len(cls.parse_response(data)), None
 
 class OpenAIStreamUserDef(BaseUserDef):
     # Alias endpoint and query inputs for readability
     BASE_URL = base_url
     PROMPTS = prompts
+    STREAM = True
 
     @classmethod
     def make_request(cls):
@@ -168,6 +211,10 @@ class OpenAIStreamUserDef(BaseUserDef):
             "model": model_id,
             "max_tokens": max_tokens,
             "stream": True,
+            # exact token counts in the final chunk
+            "stream_options": {
+                "include_usage": True,
+            },
             "extra_body": {
                 "min_tokens": min_tokens,
             }
@@ -177,30 +224,134 @@ class OpenAIStreamUserDef(BaseUserDef):
         return endpoint, request_metadata, json_parser.dumps(payload)
 
     @staticmethod
-    def parse_response(response_bytes: bytes):
-        # Process the raw bytes from model response
-        decoded_content = response_bytes.decode("utf-8").strip()
+    def parse_event(data: bytes):
+        # no tokenizer on the hot path: every content delta is one token,
+        # the final chunk carries the usage of the whole response
+        data = data.strip()
+        if not data.startswith(b"data:"):
+            return 0, None
+        data = data[5:].strip()
+        if not data or data == b"[DONE]":
+            return 0, None
         try:
-            data = json.loads(decoded_content[6:])
-            content = data.get("choices")[0].get("delta").get("content")
-            if content is None:
-                content = ""
-        except Exception as e:
-            logger.error(f"Failed to decode content: {decoded_content}")
-            content = ""
+            chunk = json.loads(data)
+        except ValueError:
+            logger.error(f"Failed to decode content: {data[:200]!r}")
+            return 0, None
+        choices = chunk.get("choices")
+        content = (choices[0].get("delta") or {}).get("content") if choices else None
+        return (1 if content else 0), chunk.get("usage")
 
-        # Convert text to token IDs for benchmarking
-        return tokenizer.encode(content, add_special_tokens=False)
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.dirname(BENCHMARK_DIR)
+
+
+def start_offline_server(args):
+    """
+    Start the stub server (`--offline stub`) or fast_api.py with the mock
+    backend in front of it (`--offline fastapi`), returns the process and its base url.
+    """
+    stub_args = [
+        "--ttft", str(args.stub_ttft),
+        "--itl", str(args.stub_itl),
+        "--output_tokens", str(args.stub_output_tokens),
+        "--error_rate", str(args.stub_error_rate),
+    ]
+    env = dict(os.environ)
+    if args.offline == "stub":
+        port = args.stub_port
+        command = [sys.executable, os.path.join(BENCHMARK_DIR, "stub_server.py"), "--port", str(port)] + stub_args
+        cwd = BENCHMARK_DIR
+    else:
+        sys.path.insert(0, SRC_DIR)
+        from emd.models.utils.serialize_utils import dump_extra_params
+
+        port = args.fastapi_port
+        extra_params = {
+            "engine_params": {
+                "engine_cls": "mock.mock_backend.MockBackend",
+                "cli_args": " ".join(stub_args),
+            }
+        }
+        command = [
+            sys.executable, os.path.join("framework", "fast_api", "fast_api.py"),
+            "--model_id", model_id,
+            "--backend_type", "vllm",
+            "--service_type", "local",
+            "--instance_type", "local",
+            "--region", os.environ.get("AWS_REGION", "us-east-1"),
+            "--extra_params", dump_extra_params(extra_params),
+            "--port", str(port),
+        ]
+        cwd = os.path.join(SRC_DIR, "pipeline")
+        env["PYTHONPATH"] = os.pathsep.join(
+            [cwd, SRC_DIR] + ([env["PYTHONPATH"]] if env.get("PYTHONPATH") else [])
+        )
+
+    print(f"Starting offline server: {' '.join(command)}")
+    # own process group, fast_api.py starts the stub server as a child
+    process = subprocess.Popen(command, cwd=cwd, env=env, start_new_session=True)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + args.offline_start_timeout
+    import requests
+    while True:
+        if process.poll() is not None:
+            raise RuntimeError(f"offline server exited with code {process.returncode}")
+        try:
+            if requests.get(f"{url}/ping", timeout=1).status_code == 200:
+                return process, url
+        except requests.RequestException:
+            pass
+        if time.time() > deadline:
+            stop_offline_server(process)
+            raise RuntimeError(f"offline server not ready after {args.offline_start_timeout}s")
+        time.sleep(0.5)
+
+
+def stop_offline_server(process):
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+    except ProcessLookupError:
+        return
+    process.wait()
 
 if __name__ == "__main__":
     import asyncio
-    from common import start_benchmark_session
+    from common import start_benchmark_session, add_open_loop_arguments
 
     # arg parsing
     parser = argparse.ArgumentParser(description="Benchmark")
-    parser.add_argument("--max_users", type=int, required=True)
+    parser.add_argument("--max_users", type=int, default=None, help="closed-loop users, searched by AIMD if not set")
     parser.add_argument("--session_time", type=float, default=None)
+    parser.add_argument("--ramp_up", type=float, default=20, help="seconds over which the closed-loop users are spawned")
+    parser.add_argument(
+        "--warmup", type=float, default=0.0, help="leave the requests of the first seconds out of the summary"
+    )
     parser.add_argument("--ping_correction", action="store_true")
+    parser.add_argument(
+        "--offline",
+        choices=["stub", "fastapi"],
+        default=None,
+        help="benchmark a local stub server, or fast_api.py with the mock backend, instead of BASE_URL"
+    )
+    parser.add_argument("--stub_ttft", type=float, default=0.2)
+    parser.add_argument("--stub_itl", type=float, default=0.02)
+    parser.add_argument("--stub_output_tokens", type=int, default=128)
+    parser.add_argument("--stub_error_rate", type=float, default=0.0)
+    parser.add_argument("--stub_port", type=int, default=8000)
+    parser.add_argument("--fastapi_port", type=int, default=8080)
+    parser.add_argument("--offline_start_timeout", type=float, default=120)
+    parser.add_argument("--workers", type=int, default=1, help="load generator processes")
+    parser.add_argument("--metrics_json", type=str, default=None, help="write the metrics summary as json")
+    parser.add_argument("--metrics_csv", type=str, default=None, help="write one row per request as csv")
+    add_open_loop_arguments(parser)
     args = parser.parse_args()
 
-    asyncio.run(start_benchmark_session(args, OpenAIStreamUserDef))
+    offline_process = None
+    if args.offline:
+        offline_process, OpenAIStreamUserDef.BASE_URL = start_offline_server(args)
+    try:
+        asyncio.run(start_benchmark_session(args, OpenAIStreamUserDef))
+    finally:
+        if offline_process is not None:
+            stop_offline_server(offline_process)
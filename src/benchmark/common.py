@@ -8,14 +8,21 @@ import collections
 import contextlib
 import math
 import functools
+import random
+
+from metrics import LatencyHistogram, RequestRecords, write_json
 
 
 class MetricsCollector:
-    def __init__(self, user_def, session_time=None, ping_latency=0.0):
+    def __init__(self, user_def, session_time=None, ping_latency=0.0, warmup=0.0):
         self.start_time = math.floor(time.time())
+        # when the load started and stopped, set by the session runners, the summary
+        # throughput is measured over this window (until now while it runs)
+        self.session_start = time.time()
+        self.session_end = None
+        # requests started in the first `warmup` seconds of the session are left out of the summary
+        self.warmup = warmup or 0.0
         self.response_word_bucket = collections.defaultdict(int)
-        self.response_head_latency_bucket = collections.defaultdict(list)
-        self.response_latency_bucket = collections.defaultdict(list)
         self.on_going_requests = 0
         self.response_bucket = collections.defaultdict(int)
         self.total_requests = 0
@@ -24,28 +31,55 @@ class MetricsCollector:
         self.user_def = user_def
         self.session_time = session_time
         self.ping_latency = ping_latency
-
-    def collect_response_chunk(self, chunk: list):
-        self.response_word_bucket[math.floor(time.time())] += len(chunk)
+        # per-request metrics, the live report reads the same arrays
+        self.records = RequestRecords()
+        self.itl_histogram = LatencyHistogram()
+        # state of the last snapshot and the gauges of every source in merge_snapshot
+        self._snapshot_size = 0
+        self._snapshot_itl_histogram = LatencyHistogram()
+        self._snapshot_buckets = {}
+        self._source_gauges = {}
+
+    def collect_response_chunk(self, num_tokens: int):
+        self.response_word_bucket[math.floor(time.time())] += num_tokens
 
     def collect_response_status(self, status):
         self.status_bucket[status] += 1
 
-    def collect_response_head_latency(self, latency):
-        self.response_head_latency_bucket[math.floor(time.time())] += [
-            latency - self.ping_latency
-        ]
-
     @contextlib.contextmanager
     def collect_http_request(self):
-        start_time = time.time()
         self.on_going_requests += 1
-        yield
-        self.on_going_requests -= 1
-        self.response_bucket[math.floor(time.time())] += 1
-        self.response_latency_bucket[math.floor(time.time())] += [
-            time.time() - start_time - self.ping_latency
-        ]
+        try:
+            yield
+        finally:
+            self.on_going_requests -= 1
+            self.response_bucket[math.floor(time.time())] += 1
+
+    def collect_request(self, start_time, status, ttft=None, e2e=None, itls=None, input_tokens=None, output_tokens=None):
+        """
+        Record one finished request, returns its ping corrected (ttft, e2e).
+        Inter-token latencies go to a histogram, they are too many to keep.
+        """
+        if ttft is not None:
+            ttft -= self.ping_latency
+        if e2e is not None:
+            e2e -= self.ping_latency
+        tpot = None
+        # not for non-streaming responses (itls is None), all their tokens arrive at once
+        if itls is not None and ttft is not None and e2e is not None and output_tokens and output_tokens > 1:
+            tpot = (e2e - ttft) / (output_tokens - 1)
+        self.records.append(
+            start_time=start_time,
+            ttft=ttft,
+            e2e=e2e,
+            tpot=tpot,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            status=status if isinstance(status, int) else -1,
+        )
+        if itls and start_time >= self.session_start + self.warmup:
+            self.itl_histogram.record_many(itls)
+        return ttft, e2e
 
     @contextlib.contextmanager
     def collect_user(self):
@@ -53,6 +87,11 @@ class MetricsCollector:
         yield
         self.on_going_users -= 1
 
+    def _finished_between(self, start, end):
+        """Mask of the successful requests that finished in [start, end)."""
+        finish_time = self.records.column("start_time") + self.records.column("e2e")
+        return self.records.successful() & (finish_time >= start) & (finish_time < end)
+
     async def report_loop(self, time_window=5):
         """
         Each bucket is in 1s. This function will report the avg metrics in the past time_window seconds.
@@ -67,73 +106,121 @@ class MetricsCollector:
             )
             print(f"Total Requests: {self.total_requests}")
             print(f"Active Requests: {self.on_going_requests}")
-            latency_bucket = [
-                j
-                for i in range(now - time_window, now)
-                for j in self.response_head_latency_bucket[i]
-            ]
-            if latency_bucket:
-                print(f"Response Head Latency: {np.mean(latency_bucket)}")
-            latency_bucket = [
-                j
-                for i in range(now - time_window, now)
-                for j in self.response_latency_bucket[i]
-            ]
-            if latency_bucket:
-                print(f"Response Latency: {np.mean(latency_bucket)}")
+            finished = self._finished_between(now - time_window, now)
+            if finished.any():
+                ttfts = self.records.column("ttft")[finished]
+                ttfts = ttfts[~np.isnan(ttfts)]
+                if ttfts.size:
+                    print(f"TTFT: {ttfts.mean()}")
+                print(f"Response Latency: {self.records.column('e2e')[finished].mean()}")
             print(
                 f"Response Tokens/s: {sum(self.response_word_bucket[i] for i in range(now - time_window, now)) / time_window}"
             )
-            print(f"Status: {self.status_bucket}")
+            print(f"Status: {dict(self.status_bucket)}")
             print()
 
             if self.session_time and now - self.start_time >= self.session_time:
                 self.report_final()
                 break
 
+    SNAPSHOT_BUCKETS = ("response_word_bucket", "response_bucket", "status_bucket")
+
+    def snapshot(self):
+        """
+        The metrics collected since the previous snapshot, for a coordinator
+        that merges the collectors of several worker processes.
+        """
+        size = self.records.size
+        rows = {
+            field: self.records.column(field)[self._snapshot_size:size].copy()
+            for field in RequestRecords.FIELDS
+        }
+        self._snapshot_size = size
+        itl_histogram = self.itl_histogram.delta(self._snapshot_itl_histogram)
+        self._snapshot_itl_histogram = self.itl_histogram.copy()
+        buckets = {}
+        for name in self.SNAPSHOT_BUCKETS:
+            sent = self._snapshot_buckets.setdefault(name, {})
+            buckets[name] = {
+                key: value - sent.get(key, 0)
+                for key, value in getattr(self, name).items()
+                if value != sent.get(key, 0)
+            }
+            sent.update(getattr(self, name))
+        return {
+            "rows": rows,
+            "itl_histogram": itl_histogram,
+            "buckets": buckets,
+            "gauges": {
+                "total_requests": self.total_requests,
+                "on_going_requests": self.on_going_requests,
+                "on_going_users": self.on_going_users,
+            },
+        }
+
+    def merge_snapshot(self, snapshot, source=0):
+        self.records.extend_columns(snapshot["rows"])
+        self.itl_histogram.merge(snapshot["itl_histogram"])
+        for name, delta in snapshot["buckets"].items():
+            bucket = getattr(self, name)
+            for key, value in delta.items():
+                bucket[key] += value
+        # gauges are absolute per source, the merged ones are their sums
+        self._source_gauges[source] = snapshot["gauges"]
+        for name in ("total_requests", "on_going_requests", "on_going_users"):
+            setattr(self, name, sum(gauges[name] for gauges in self._source_gauges.values()))
+
+    def summary(self):
+        # from the end of the warmup to the end of the load, without the ping before and the drain after it
+        measure_start = self.session_start + self.warmup
+        session_end = time.time() if self.session_end is None else self.session_end
+        duration = max(session_end - measure_start, 0.0)
+        start_times = self.records.column("start_time")
+        summary = self.records.summary(since=measure_start)
+        summary["itl"] = self.itl_histogram.summary()
+        summary["duration"] = duration
+        summary["request_throughput"] = summary["successful"] / duration if duration > 0 else 0.0
+        output_tokens = self.records.column("output_tokens")[
+            self.records.successful() & (start_times >= measure_start)
+        ]
+        summary["output_token_throughput"] = float(np.nansum(output_tokens)) / duration if duration > 0 else 0.0
+        summary["status"] = {str(status): count for status, count in self.status_bucket.items()}
+        summary["warmup"] = self.warmup
+        return summary
+
     def report_final(self):
+        summary = self.summary()
         print("=================== Final Report ====================")
         print(f"Total Requests: {self.total_requests}")
-        print(
-            f"Average Request/s: {self.total_requests / (time.time() - self.start_time)}"
-        )
-
-        head_latency_size = sum(len(i) for i in self.response_head_latency_bucket.values())
-        if head_latency_size:
-            head_latencies = [j for i in self.response_head_latency_bucket.values() for j in i]
-
-            print(
-                f"Average Response Head Latency: {sum(head_latencies) / head_latency_size}"
-            )
-            print(
-                f"Median Response Head Latency: {np.percentile(head_latencies, 50)}"
-            )
-            print(
-                f"95% Response Head Latency: {np.percentile(head_latencies, 95)}"
-            )
-            print(
-                f"99% Response Head Latency: {np.percentile(head_latencies, 99)}"
-            )
-
-        latency_size = sum(len(i) for i in self.response_latency_bucket.values())
-        if latency_size:
-            latencies = [j for i in self.response_latency_bucket.values() for j in i]
-            print(
-                f"Average Response Latency: {sum(latencies) / latency_size}"
-            )
-            print(
-                f"Median Response Latency: {np.percentile(latencies, 50)}"
-            )
-            print(
-                f"95% Response Latency: {np.percentile(latencies, 95)}"
-            )
-            print(
-                f"99% Response Latency: {np.percentile(latencies, 99)}"
-            )
-
-        print(
-            f"Average Response Tokens/s: {sum(self.response_word_bucket.values()) / (time.time() - self.start_time)}"
-        )
+        print(f"Successful Requests: {summary['successful']}")
+        print(f"Average Request/s: {summary['request_throughput']}")
+        for name, field in (
+            ("TTFT", "ttft"),
+            ("Inter-token Latency", "itl"),
+            ("Time per Output Token", "tpot"),
+            ("Response Latency", "e2e"),
+        ):
+            field_summary = summary[field]
+            if not field_summary["count"]:
+                continue
+            print(f"Average {name}: {field_summary['mean']}")
+            print(f"Median {name}: {field_summary['p50']}")
+            print(f"95% {name}: {field_summary['p95']}")
+            print(f"99% {name}: {field_summary['p99']}")
+        for name, field in (("Input Tokens", "input_tokens"), ("Output Tokens", "output_tokens")):
+            if summary[field]["count"]:
+                print(f"Average {name}: {summary[field]['mean']}")
+        print(f"Average Response Tokens/s: {summary['output_token_throughput']}")
+
+    def export_json(self, path, **extra):
+        """Write the summary and the mergeable ITL histogram."""
+        data = {"summary": self.summary(), "itl_histogram": self.itl_histogram.to_dict()}
+        data.update(extra)
+        write_json(path, data)
+
+    def export_csv(self, path):
+        """Write one row per request."""
+        self.records.to_csv(path)
 
 
 def linear_regression(x, y):
@@ -143,6 +230,79 @@ def linear_regression(x, y):
     return a, b
 
 
+async def send_request(session, user_def, collector):
+    """
+    Send one request of `user_def` and read the response.
+    Returns (status, ttft, latency), the latencies are None for failed requests.
+    """
+    url, headers, data = user_def.make_request()
+    collector.total_requests += 1
+    status = -1
+    ttft = None
+    itls = []
+    output_tokens = 0
+    usage = None
+    with collector.collect_http_request():
+        req_start = time.time()
+        try:
+            async with session.post(
+                url,
+                headers=headers,
+                data=data,
+            ) as response:
+                status = response.status
+                collector.collect_response_status(status)
+                if status != 200:
+                    await response.read()
+                elif user_def.STREAM:
+                    last_token_time = None
+                    async for line in response.content:
+                        num_tokens, line_usage = user_def.parse_event(line)
+                        if line_usage:
+                            usage = line_usage
+                        if not num_tokens:
+                            continue
+                        now = time.time()
+                        if last_token_time is None:
+                            ttft = now - req_start
+                        else:
+                            itls.append(now - last_token_time)
+                        last_token_time = now
+                        output_tokens += num_tokens
+                        collector.collect_response_chunk(num_tokens)
+                else:
+                    num_tokens, usage = user_def.parse_event(await response.read())
+                    # the first token arrives with the whole response
+                    ttft = time.time() - req_start
+                    itls = None
+                    output_tokens = num_tokens
+                    collector.collect_response_chunk(num_tokens)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            collector.collect_response_status(str(e))
+            status = -1
+    latency = time.time() - req_start
+
+    input_tokens = None
+    if usage:
+        input_tokens = usage.get("prompt_tokens")
+        output_tokens = usage.get("completion_tokens") or output_tokens
+    if status != 200:
+        collector.collect_request(req_start, status)
+        return status, None, None
+    ttft, latency = collector.collect_request(
+        req_start,
+        status,
+        ttft=ttft,
+        e2e=latency,
+        itls=itls,
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+    )
+    return status, ttft, latency
+
+
 class UserSpawner:
     def __init__(
         self,
@@ -175,39 +335,7 @@ class UserSpawner:
             try:
                 async with aiohttp.ClientSession(cookie_jar=cookie_jar) as session:
                     while True:
-                        url, headers, data = self.user_def.make_request()
-                        self.data_collector.total_requests += 1
-                        with self.data_collector.collect_http_request():
-                            req_start = time.time()
-                            async with session.post(
-                                url,
-                                headers=headers,
-                                data=data,
-                            ) as response:
-                                self.data_collector.collect_response_status(
-                                    response.status
-                                )
-                                try:
-                                    if response.status != 200:
-                                        continue
-
-                                    first = True
-                                    async for data, end_of_http_chunk in response.content.iter_chunks():
-                                        result = self.user_def.parse_response(data)
-                                        if first:
-                                            first = False
-                                            self.data_collector.collect_response_head_latency(
-                                                time.time() - req_start
-                                            )
-
-                                        self.data_collector.collect_response_chunk(
-                                            result
-                                        )
-                                        if not end_of_http_chunk:
-                                            break
-                                except Exception as e:
-                                    self.data_collector.collect_response_status(str(e))
-                                    raise e
+                        await send_request(session, self.user_def, self.data_collector)
                         await self.user_def.rest()
             except asyncio.CancelledError:
                 pass
@@ -287,8 +415,271 @@ class UserSpawner:
             return 0
 
 
-async def start_benchmark_session(args, user_def):
-    # ping server
+class LoadStep:
+    """
+    One step of an open-loop schedule: the arrival rate goes linearly from
+    `start_rate` to `end_rate` requests/s over `duration` seconds, constant if
+    both are equal. Requests sent during the step are accounted to it.
+    """
+
+    def __init__(self, start_rate, end_rate, duration):
+        self.start_rate = start_rate
+        self.end_rate = end_rate
+        self.duration = duration
+        self.sent = 0
+        self.dropped = 0
+        self.errors = 0
+        self.ttfts = []
+        self.latencies = []
+
+    def merge(self, other: "LoadStep"):
+        """Add the requests and the rate of the same step run by another worker."""
+        self.start_rate += other.start_rate
+        self.end_rate += other.end_rate
+        self.sent += other.sent
+        self.dropped += other.dropped
+        self.errors += other.errors
+        self.ttfts += other.ttfts
+        self.latencies += other.latencies
+        return self
+
+    def time_at(self, count):
+        """
+        Elapsed time at which `count` requests are due, the inverse of the
+        integrated rate. None if the step ends before.
+        """
+        slope = (self.end_rate - self.start_rate) / self.duration
+        if abs(slope) < 1e-12:
+            elapsed = count / self.start_rate if self.start_rate > 0 else None
+        else:
+            discriminant = self.start_rate ** 2 + 2 * slope * count
+            elapsed = (math.sqrt(discriminant) - self.start_rate) / slope if discriminant >= 0 else None
+        if elapsed is None or elapsed >= self.duration:
+            return None
+        return elapsed
+
+    def summary(self, slo_ttft=None, slo_latency=None):
+        completed = len(self.latencies)
+        good = sum(
+            1 for ttft, latency in zip(self.ttfts, self.latencies)
+            if (slo_ttft is None or (ttft is not None and ttft <= slo_ttft))
+            and (slo_latency is None or latency <= slo_latency)
+        )
+        summary = {
+            "target_rate": (self.start_rate + self.end_rate) / 2,
+            "offered_rate": self.sent / self.duration,
+            "throughput": completed / self.duration,
+            "goodput": good / self.duration,
+            "slo_attainment": good / self.sent if self.sent else None,
+            "sent": self.sent,
+            "completed": completed,
+            "errors": self.errors,
+            "dropped": self.dropped,
+        }
+        ttfts = [i for i in self.ttfts if i is not None]
+        for name, values in (("ttft", ttfts), ("latency", self.latencies)):
+            if values:
+                summary[f"{name}_p50"] = float(np.percentile(values, 50))
+                summary[f"{name}_p99"] = float(np.percentile(values, 99))
+        return summary
+
+
+def parse_load_schedule(spec):
+    """
+    Parse a schedule like "2:30,4:30,8-16:60": comma separated steps of
+    `rate:duration`, or `start_rate-end_rate:duration` for a linear ramp.
+    """
+    steps = []
+    for item in spec.split(","):
+        rates, duration = item.strip().split(":")
+        start_rate, _, end_rate = rates.partition("-")
+        steps.append(LoadStep(float(start_rate), float(end_rate or start_rate), float(duration)))
+    return steps
+
+
+def make_load_schedule(start_rate, end_rate, step_rate, step_duration, ramp=False):
+    """
+    Steps from `start_rate` to `end_rate` requests/s in increments of `step_rate`,
+    each held for `step_duration` seconds. With `ramp` the rate rises linearly
+    within every step up to the rate of the next one instead.
+    """
+    rates = list(np.arange(start_rate, end_rate + step_rate / 2, step_rate)) if step_rate > 0 else [start_rate]
+    if ramp:
+        return [
+            LoadStep(float(rate), float(min(rate + step_rate, end_rate)), step_duration)
+            for rate in rates
+        ]
+    return [LoadStep(float(rate), float(rate), step_duration) for rate in rates]
+
+
+def load_arrival_trace(path, speedup=1.0):
+    """
+    Load request arrival times from a file with one timestamp in seconds per
+    line, or jsonl with a `timestamp` field. Returns offsets from the first arrival.
+    """
+    import json
+
+    timestamps = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                timestamps.append(float(json.loads(line)["timestamp"]))
+            else:
+                timestamps.append(float(line))
+    timestamps.sort()
+    return [(t - timestamps[0]) / speedup for t in timestamps]
+
+
+class OpenLoopGenerator:
+    """
+    Send requests at a target arrival rate, independent of the response time
+    of the server. Unlike the closed-loop `UserSpawner` a slow server does not
+    slow down the client, so queueing shows up as rising latency and falling
+    goodput. Arrivals are `poisson`, `constant`, or replayed from `trace`
+    offsets; in trace mode the steps are windows of `step_duration` seconds.
+    """
+
+    def __init__(
+        self,
+        user_def,
+        collector: MetricsCollector,
+        schedule=None,
+        arrival="poisson",
+        trace=None,
+        step_duration=60,
+        max_in_flight=None,
+        slo_ttft=None,
+        slo_latency=None,
+        drain_timeout=60,
+        seed=None,
+    ):
+        assert arrival in ("poisson", "constant", "trace"), arrival
+        self.user_def = user_def
+        self.data_collector = collector
+        self.arrival = arrival
+        if arrival == "trace":
+            assert trace, "trace arrivals need the offsets of the trace"
+            self.trace = trace
+            num_steps = int(trace[-1] // step_duration) + 1
+            self.steps = [LoadStep(0, 0, step_duration) for _ in range(num_steps)]
+            for offset in trace:
+                step = self.steps[int(offset // step_duration)]
+                step.start_rate += 1 / step_duration
+            for step in self.steps:
+                step.end_rate = step.start_rate
+        else:
+            assert schedule, "open-loop arrivals need a schedule"
+            self.steps = schedule
+        self.max_in_flight = max_in_flight
+        self.slo_ttft = slo_ttft
+        self.slo_latency = slo_latency
+        self.drain_timeout = drain_timeout
+        self.rng = random.Random(seed)
+        self.in_flight = 0
+        self.tasks = set()
+
+    @property
+    def duration(self):
+        return sum(step.duration for step in self.steps)
+
+    def arrivals(self):
+        """Yield (offset from the start in seconds, step index) of every request."""
+        if self.arrival == "trace":
+            for offset in self.trace:
+                yield offset, int(offset // self.steps[0].duration)
+            return
+
+        step_start = 0
+        for index, step in enumerate(self.steps):
+            # poisson arrivals have exponential gaps in the integrated rate, constant ones a gap of 1
+            count = 0
+            while True:
+                count += self.rng.expovariate(1) if self.arrival == "poisson" else 1
+                elapsed = step.time_at(count)
+                if elapsed is None:
+                    break
+                yield step_start + elapsed, index
+            step_start += step.duration
+
+    async def request(self, session, step: LoadStep):
+        self.in_flight += 1
+        try:
+            status, ttft, latency = await send_request(session, self.user_def, self.data_collector)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            status, ttft, latency = None, None, None
+        finally:
+            self.in_flight -= 1
+        if status != 200 or latency is None:
+            step.errors += 1
+            return
+        step.ttfts.append(ttft)
+        step.latencies.append(latency)
+
+    async def run(self, start_time=None):
+        """Send the schedule, starting at `start_time` (default now). Returns the steps."""
+        cookie_jar = aiohttp.DummyCookieJar()
+        # the connector must not queue requests, that would close the loop again
+        connector = aiohttp.TCPConnector(limit=0)
+        async with aiohttp.ClientSession(cookie_jar=cookie_jar, connector=connector) as session:
+            start_time = time.time() if start_time is None else start_time
+            self.data_collector.session_start = start_time
+            for offset, index in self.arrivals():
+                delay = start_time + offset - time.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                step = self.steps[index]
+                step.sent += 1
+                if self.max_in_flight and self.in_flight >= self.max_in_flight:
+                    step.dropped += 1
+                    continue
+                task = asyncio.create_task(self.request(session, step))
+                self.tasks.add(task)
+                task.add_done_callback(self.tasks.discard)
+
+            # the arrivals stop at the end of the schedule, or later if sending fell behind
+            self.data_collector.session_end = max(start_time + self.duration, time.time())
+            if self.tasks:
+                await asyncio.wait(list(self.tasks), timeout=self.drain_timeout)
+            for task in list(self.tasks):
+                task.cancel()
+            if self.tasks:
+                await asyncio.wait(list(self.tasks))
+        return self.steps
+
+    def report(self):
+        summaries = [step.summary(self.slo_ttft, self.slo_latency) for step in self.steps]
+        print("=================== Open-loop Report ====================")
+        print(
+            f"SLO: TTFT <= {self.slo_ttft}, latency <= {self.slo_latency}"
+        )
+        header = (
+            f"{'step':>4} {'target/s':>9} {'offered/s':>9} {'thruput/s':>9} {'goodput/s':>9} "
+            f"{'slo %':>6} {'errors':>6} {'dropped':>7} {'ttft p50':>8} {'ttft p99':>8} {'lat p50':>8} {'lat p99':>8}"
+        )
+        print(header)
+
+        def fmt(value, spec):
+            return format(value, spec) if value is not None else "-"
+
+        for index, summary in enumerate(summaries):
+            slo_attainment = summary["slo_attainment"]
+            print(
+                f"{index:>4} {summary['target_rate']:>9.2f} {summary['offered_rate']:>9.2f} "
+                f"{summary['throughput']:>9.2f} {summary['goodput']:>9.2f} "
+                f"{fmt(slo_attainment * 100 if slo_attainment is not None else None, '6.1f'):>6} "
+                f"{summary['errors']:>6} {summary['dropped']:>7} "
+                f"{fmt(summary.get('ttft_p50'), '8.3f'):>8} {fmt(summary.get('ttft_p99'), '8.3f'):>8} "
+                f"{fmt(summary.get('latency_p50'), '8.3f'):>8} {fmt(summary.get('latency_p99'), '8.3f'):>8}"
+            )
+        return summaries
+
+
+async def measure_ping_latency(user_def):
     response_times = []
     async with aiohttp.ClientSession() as session:
         async with session.get(user_def.ping_url()) as response:
@@ -301,27 +692,143 @@ async def start_benchmark_session(args, user_def):
                 assert response.status == 200
             response_times.append(time.time() - time_start)
             await asyncio.sleep(0.3)
-    ping_latency = sum(response_times) / len(response_times)
+    return sum(response_times) / len(response_times)
+
+
+async def start_benchmark_session(args, user_def):
+    # ping server
+    ping_latency = await measure_ping_latency(user_def)
     print(f"Ping latency: {ping_latency}. ping correction: {args.ping_correction}")
+    ping_latency = ping_latency - 0.005 if args.ping_correction else 0
+
+    if getattr(args, "workers", 1) > 1:
+        from distributed import start_distributed_session
+        return await start_distributed_session(args, user_def, ping_latency)
 
     # init
     collector = MetricsCollector(
-        user_def, args.session_time, ping_latency - 0.005 if args.ping_correction else 0
+        user_def, args.session_time, ping_latency, warmup=getattr(args, "warmup", 0.0)
     )
+    if getattr(args, "mode", "closed") == "open":
+        return await start_open_loop_session(args, user_def, collector)
+
+    report_task = asyncio.create_task(collector.report_loop())
+    await run_closed_loop(args, user_def, collector)
+    if not report_task.done():
+        report_task.cancel()
+        collector.report_final()
+    export_metrics(args, collector)
+    return 0
+
+
+async def run_closed_loop(args, user_def, collector, max_users=None, start_time=None):
+    """
+    Run `max_users` (default `args.max_users`) users, they are spawned over
+    `args.ramp_up` seconds (default 20) from `start_time`. Without a user count
+    the count is searched by AIMD.
+    """
+    max_users = args.max_users if max_users is None else max_users
+    start_time = time.time() if start_time is None else start_time
+    collector.session_start = start_time
     user_spawner = UserSpawner(
-        user_def, collector, args.max_users, target_time=time.time() + 20
+        user_def, collector, max_users, target_time=start_time + getattr(args, "ramp_up", 20)
     )
     asyncio.create_task(user_spawner.spawner_loop())
-    asyncio.create_task(collector.report_loop())
-    if args.max_users is None:
+    if max_users is None:
         asyncio.create_task(user_spawner.aimd_loop())
 
     if args.session_time is not None:
-        await asyncio.sleep(args.session_time + 1)
+        await asyncio.sleep(max(start_time + args.session_time + 1 - time.time(), 0))
     else:
         await asyncio.wait(user_spawner.user_list)
 
+    collector.session_end = time.time()
     await user_spawner.cancel_all_users()
+
+
+def export_metrics(args, collector, **extra):
+    if getattr(args, "metrics_json", None):
+        collector.export_json(args.metrics_json, **extra)
+        print(f"Metrics written to {args.metrics_json}")
+    if getattr(args, "metrics_csv", None):
+        collector.export_csv(args.metrics_csv)
+        print(f"Per-request metrics written to {args.metrics_csv}")
+
+
+def add_open_loop_arguments(parser):
+    parser.add_argument(
+        "--mode",
+        choices=["closed", "open"],
+        default="closed",
+        help="closed: simulated users wait for their responses, open: requests arrive at a target rate"
+    )
+    parser.add_argument("--arrival", choices=["poisson", "constant", "trace"], default="poisson")
+    parser.add_argument("--rate", type=float, default=1.0, help="requests/s of the first step")
+    parser.add_argument("--rate_end", type=float, default=None, help="requests/s of the last step")
+    parser.add_argument("--rate_step", type=float, default=0.0, help="rate increment between steps")
+    parser.add_argument("--step_duration", type=float, default=60, help="seconds per step")
+    parser.add_argument("--ramp", action="store_true", help="raise the rate linearly within the steps")
+    parser.add_argument("--schedule", type=str, default=None, help='explicit steps, e.g. "2:30,4:30,8-16:60"')
+    parser.add_argument("--trace_file", type=str, default=None, help="arrival timestamps to replay")
+    parser.add_argument("--trace_speedup", type=float, default=1.0)
+    parser.add_argument("--max_in_flight", type=int, default=None, help="drop arrivals above this many open requests")
+    parser.add_argument("--slo_ttft", type=float, default=None, help="time to first token SLO in seconds")
+    parser.add_argument("--slo_latency", type=float, default=None, help="end-to-end latency SLO in seconds")
+    return parser
+
+
+def make_open_loop_generator(args, user_def, collector, worker_index=0, num_workers=1):
+    """
+    The generator of the open-loop session, or of one of `num_workers` workers
+    sharing it: every worker sends the schedule at 1/num_workers of the rate
+    (the sum of the poisson processes is again poisson) or every num_workers-th
+    request of the trace.
+    """
+    if args.arrival == "trace":
+        schedule = None
+        trace = load_arrival_trace(args.trace_file, args.trace_speedup)[worker_index::num_workers]
+    elif args.schedule:
+        schedule = parse_load_schedule(args.schedule)
+        trace = None
+    else:
+        schedule = make_load_schedule(
+            args.rate,
+            args.rate_end if args.rate_end is not None else args.rate,
+            args.rate_step,
+            args.step_duration,
+            ramp=args.ramp,
+        )
+        trace = None
+    for step in schedule or []:
+        step.start_rate /= num_workers
+        step.end_rate /= num_workers
+    max_in_flight = args.max_in_flight
+    if max_in_flight:
+        max_in_flight = max(max_in_flight // num_workers, 1)
+    return OpenLoopGenerator(
+        user_def,
+        collector,
+        schedule=schedule,
+        arrival=args.arrival,
+        trace=trace,
+        step_duration=args.step_duration,
+        max_in_flight=max_in_flight,
+        slo_ttft=args.slo_ttft,
+        slo_latency=args.slo_latency,
+    )
+
+
+async def start_open_loop_session(args, user_def, collector):
+    generator = make_open_loop_generator(args, user_def, collector)
+    print(f"Open-loop session: {len(generator.steps)} steps, {generator.duration}s")
+    # the periodic report runs until the schedule is done
+    collector.session_time = None
+    report_task = asyncio.create_task(collector.report_loop())
+    await generator.run()
+    steps = generator.report()
+    report_task.cancel()
+    collector.report_final()
+    export_metrics(args, collector, steps=steps)
     return 0
 
 
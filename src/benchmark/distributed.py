@@ -0,0 +1,161 @@
+"""
+Multi-process benchmark.
+
+One asyncio process saturates a CPU core long before a large endpoint
+saturates, so with `--workers N` the users (closed loop) or the arrival rate
+(open loop) are split over N worker processes, each with its own event loop
+and aiohttp sessions. The coordinator starts all workers at the same time,
+so they follow one ramp schedule, merges the metrics snapshots they send
+every second into one `MetricsCollector` and prints the reports.
+"""
+import asyncio
+import math
+import multiprocessing
+import queue
+import time
+
+from common import (
+    MetricsCollector,
+    export_metrics,
+    make_open_loop_generator,
+    run_closed_loop,
+)
+
+SNAPSHOT_INTERVAL = 1.0
+WORKER_START_TIMEOUT = 300
+
+
+def split_evenly(total, num_workers, index):
+    return total // num_workers + (1 if index < total % num_workers else 0)
+
+
+async def _publish_loop(collector, index, result_queue):
+    while True:
+        await asyncio.sleep(SNAPSHOT_INTERVAL)
+        result_queue.put(("metrics", index, collector.snapshot()))
+
+
+async def _run_worker(index, num_workers, args, user_def, ping_latency, result_queue, start_event, start_at):
+    collector = MetricsCollector(user_def, args.session_time, ping_latency, warmup=args.warmup)
+    result_queue.put(("ready", index, None))
+    await asyncio.get_running_loop().run_in_executor(None, start_event.wait)
+    start_time = start_at.value
+    collector.start_time = math.floor(start_time)
+
+    publisher = asyncio.create_task(_publish_loop(collector, index, result_queue))
+    steps = None
+    if getattr(args, "mode", "closed") == "open":
+        generator = make_open_loop_generator(args, user_def, collector, index, num_workers)
+        steps = await generator.run(start_time=start_time)
+    else:
+        max_users = split_evenly(args.max_users, num_workers, index)
+        if max_users:
+            await run_closed_loop(args, user_def, collector, max_users=max_users, start_time=start_time)
+    publisher.cancel()
+    result_queue.put((
+        "done", index, {"snapshot": collector.snapshot(), "steps": steps, "session_end": collector.session_end}
+    ))
+
+
+def worker_main(index, num_workers, args, user_def, base_url, ping_latency, result_queue, start_event, start_at):
+    # class attributes set at runtime, e.g. by --offline, are not pickled with the class
+    user_def.BASE_URL = base_url
+    try:
+        asyncio.run(_run_worker(index, num_workers, args, user_def, ping_latency, result_queue, start_event, start_at))
+    except BaseException as e:
+        result_queue.put(("error", index, repr(e)))
+        raise
+
+
+async def _get(result_queue, timeout):
+    try:
+        return await asyncio.get_running_loop().run_in_executor(None, result_queue.get, True, timeout)
+    except queue.Empty:
+        return None
+
+
+async def start_distributed_session(args, user_def, ping_latency):
+    num_workers = args.workers
+    open_loop = getattr(args, "mode", "closed") == "open"
+    if not open_loop and args.max_users is None:
+        raise ValueError("--workers needs --max_users, the AIMD search runs in a single process only")
+
+    ctx = multiprocessing.get_context("spawn")
+    result_queue = ctx.Queue()
+    start_event = ctx.Event()
+    start_at = ctx.Value("d", 0.0)
+    processes = [
+        ctx.Process(
+            target=worker_main,
+            args=(i, num_workers, args, user_def, user_def.BASE_URL, ping_latency, result_queue, start_event, start_at),
+            daemon=True,
+        )
+        for i in range(num_workers)
+    ]
+    for process in processes:
+        process.start()
+
+    def check_workers():
+        for i, process in enumerate(processes):
+            if not process.is_alive() and i not in done:
+                raise RuntimeError(f"benchmark worker {i} exited with code {process.exitcode}")
+
+    collector = MetricsCollector(user_def, None, ping_latency, warmup=args.warmup)
+    done = {}
+    ready = set()
+    deadline = time.time() + WORKER_START_TIMEOUT
+    while len(ready) < num_workers:
+        message = await _get(result_queue, 1)
+        if message is None:
+            check_workers()
+            if time.time() > deadline:
+                raise RuntimeError(f"benchmark workers not ready after {WORKER_START_TIMEOUT}s")
+            continue
+        kind, index, payload = message
+        if kind == "error":
+            raise RuntimeError(f"benchmark worker {index} failed: {payload}")
+        ready.add(index)
+
+    print(f"Started {num_workers} benchmark workers")
+    start_at.value = time.time()
+    collector.start_time = math.floor(start_at.value)
+    collector.session_start = start_at.value
+    start_event.set()
+    report_task = asyncio.create_task(collector.report_loop())
+
+    while len(done) < num_workers:
+        message = await _get(result_queue, 1)
+        if message is None:
+            check_workers()
+            continue
+        kind, index, payload = message
+        if kind == "metrics":
+            collector.merge_snapshot(payload, source=index)
+        elif kind == "done":
+            collector.merge_snapshot(payload["snapshot"], source=index)
+            done[index] = payload
+        elif kind == "error":
+            raise RuntimeError(f"benchmark worker {index} failed: {payload}")
+
+    report_task.cancel()
+    for process in processes:
+        process.join()
+    session_ends = [payload["session_end"] for payload in done.values() if payload["session_end"] is not None]
+    collector.session_end = max(session_ends) if session_ends else time.time()
+
+    steps = None
+    if open_loop:
+        generator = make_open_loop_generator(args, user_def, collector)
+        worker_steps = [done[i]["steps"] for i in range(num_workers)]
+        steps = []
+        for index in range(max(len(s) for s in worker_steps)):
+            merged = None
+            for s in worker_steps:
+                if index < len(s):
+                    merged = s[index] if merged is None else merged.merge(s[index])
+            steps.append(merged)
+        generator.steps = steps
+        steps = generator.report()
+    collector.report_final()
+    export_metrics(args, collector, **({"steps": steps} if steps is not None else {}))
+    return 0
@@ -0,0 +1,191 @@
+"""
+Storage of per-request benchmark metrics.
+
+`RequestRecords` keeps one row per request in preallocated NumPy columns,
+`LatencyHistogram` counts values in log-spaced buckets (HDR style, bounded
+relative error) for distributions too large to keep, like inter-token
+latencies. Histograms with the same bounds can be merged.
+"""
+import csv
+import json
+import math
+
+import numpy as np
+
+PERCENTILES = (50, 90, 95, 99, 99.9)
+
+
+class LatencyHistogram:
+    def __init__(self, min_value=1e-6, max_value=3600.0, precision=0.01):
+        """
+        Values between min_value and max_value seconds are recorded with a
+        relative error of at most `precision`, smaller and larger ones are
+        counted in the first and last bucket.
+        """
+        self.min_value = min_value
+        self.max_value = max_value
+        self.precision = precision
+        self._log_growth = math.log1p(precision)
+        self.num_buckets = int(math.ceil(math.log(max_value / min_value) / self._log_growth)) + 2
+        self.counts = np.zeros(self.num_buckets, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _bucket_index(self, values):
+        values = np.maximum(values, self.min_value)
+        index = np.floor(np.log(values / self.min_value) / self._log_growth).astype(np.int64) + 1
+        return np.clip(index, 0, self.num_buckets - 1)
+
+    def _bucket_value(self, index):
+        # geometric middle of the bucket
+        return self.min_value * math.exp((index - 0.5) * self._log_growth)
+
+    def record_many(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if not values.size:
+            return
+        self.counts += np.bincount(self._bucket_index(values), minlength=self.num_buckets)
+        self.count += int(values.size)
+        self.total += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    def _check_compatible(self, other):
+        if (self.min_value, self.max_value, self.precision) != (other.min_value, other.max_value, other.precision):
+            raise ValueError("histograms with different bounds can not be merged")
+
+    def merge(self, other: "LatencyHistogram"):
+        self._check_compatible(other)
+        self.counts += other.counts
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def copy(self):
+        return LatencyHistogram(self.min_value, self.max_value, self.precision).merge(self)
+
+    def delta(self, previous: "LatencyHistogram"):
+        """
+        The values recorded since `previous`, an earlier copy of this histogram.
+        min and max are not tracked per delta, they stay the overall ones.
+        """
+        self._check_compatible(previous)
+        histogram = self.copy()
+        histogram.counts -= previous.counts
+        histogram.count -= previous.count
+        histogram.total -= previous.total
+        return histogram
+
+    def percentile(self, p):
+        if not self.count:
+            return None
+        target = max(int(math.ceil(p / 100 * self.count)), 1)
+        index = int(np.searchsorted(np.cumsum(self.counts), target))
+        return min(max(self._bucket_value(index), self.min), self.max)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def summary(self, percentiles=PERCENTILES):
+        summary = {"count": self.count, "mean": self.mean}
+        if self.count:
+            summary["min"] = self.min
+            summary["max"] = self.max
+        for p in percentiles:
+            summary[f"p{p:g}"] = self.percentile(p)
+        return summary
+
+    def to_dict(self):
+        nonzero = np.flatnonzero(self.counts)
+        return {
+            "min_value": self.min_value,
+            "max_value": self.max_value,
+            "precision": self.precision,
+            "count": self.count,
+            "total": self.total,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "buckets": {str(int(i)): int(self.counts[i]) for i in nonzero},
+        }
+
+
+class RequestRecords:
+    """
+    One row per request: start time, TTFT, end-to-end latency, time per
+    output token, token counts and http status (-1 for client errors).
+    Missing values are NaN. The columns grow by doubling.
+    """
+    FIELDS = ("start_time", "ttft", "e2e", "tpot", "input_tokens", "output_tokens", "status")
+    INTEGER_FIELDS = ("input_tokens", "output_tokens", "status")
+
+    def __init__(self, capacity=4096):
+        self.size = 0
+        self.capacity = capacity
+        self.columns = {field: np.full(capacity, np.nan) for field in self.FIELDS}
+
+    def __len__(self):
+        return self.size
+
+    def _grow(self):
+        self.capacity *= 2
+        for field, column in self.columns.items():
+            grown = np.full(self.capacity, np.nan)
+            grown[:self.size] = column[:self.size]
+            self.columns[field] = grown
+
+    def append(self, **values):
+        if self.size == self.capacity:
+            self._grow()
+        for field, value in values.items():
+            self.columns[field][self.size] = np.nan if value is None else value
+        self.size += 1
+
+    def extend_columns(self, columns):
+        """Append rows given as one array per field."""
+        size = len(columns[self.FIELDS[0]])
+        while self.size + size > self.capacity:
+            self._grow()
+        for field in self.FIELDS:
+            self.columns[field][self.size:self.size + size] = columns[field]
+        self.size += size
+        return self
+
+    def column(self, field):
+        return self.columns[field][:self.size]
+
+    def successful(self):
+        return self.column("status") == 200
+
+    def summary(self, percentiles=PERCENTILES, since=None):
+        """Summary of the requests started at or after `since` (default all)."""
+        ok = self.successful()
+        counted = np.ones(self.size, dtype=bool) if since is None else self.column("start_time") >= since
+        ok &= counted
+        summary = {"requests": int(counted.sum()), "successful": int(ok.sum())}
+        for field in ("ttft", "e2e", "tpot", "input_tokens", "output_tokens"):
+            values = self.column(field)[ok]
+            values = values[~np.isnan(values)]
+            field_summary = {"count": int(values.size), "mean": float(values.mean()) if values.size else None}
+            for p, value in zip(percentiles, np.percentile(values, percentiles) if values.size else [None] * len(percentiles)):
+                field_summary[f"p{p:g}"] = None if value is None else float(value)
+            summary[field] = field_summary
+        return summary
+
+    def to_csv(self, path):
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(self.FIELDS)
+            formats = ["{:.0f}" if field in self.INTEGER_FIELDS else "{:.6f}" for field in self.FIELDS]
+            rows = np.column_stack([self.column(field) for field in self.FIELDS])
+            for row in rows:
+                writer.writerow(["" if np.isnan(value) else fmt.format(value) for fmt, value in zip(formats, row)])
+
+
+def write_json(path, data):
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
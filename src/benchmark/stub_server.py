@@ -0,0 +1,190 @@
+"""
+OpenAI-compatible stub server for offline benchmarks.
+
+The server does no inference: it waits `--ttft` seconds before the first
+token, `--itl` seconds between the following tokens and answers with words
+of the synthetic corpus. A share of the requests (`--error_rate`) fails with
+`--error_status`. This is enough to load-test the benchmark client and the
+serving stack (fast_api.py with the mock backend) on a CPU box.
+
+    python stub_server.py --port 8000 --ttft 0.2 --itl 0.02 --output_tokens 128
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+from aiohttp import web
+
+from synthetic_prompts import WORDS
+
+
+class StubServer:
+    def __init__(
+        self,
+        ttft=0.2,
+        itl=0.02,
+        output_tokens=128,
+        error_rate=0.0,
+        error_status=503,
+        jitter=0.1,
+        seed=None,
+    ):
+        self.ttft = ttft
+        self.itl = itl
+        self.output_tokens = output_tokens
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.jitter = jitter
+        self.rng = random.Random(seed)
+
+    def _delay(self, seconds):
+        if seconds <= 0:
+            return 0
+        return max(seconds * (1 + self.rng.uniform(-self.jitter, self.jitter)), 0)
+
+    def _num_output_tokens(self, payload):
+        max_tokens = payload.get("max_tokens") or payload.get("max_completion_tokens")
+        if max_tokens is None:
+            return self.output_tokens
+        return max(min(int(max_tokens), self.output_tokens), 1)
+
+    @staticmethod
+    def _num_prompt_tokens(payload):
+        if "messages" in payload:
+            text = " ".join(str(message.get("content") or "") for message in payload["messages"])
+        else:
+            text = str(payload.get("prompt") or payload.get("input") or "")
+        return len(text.split())
+
+    def _usage(self, payload, completion_tokens):
+        prompt_tokens = self._num_prompt_tokens(payload)
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    def _error_response(self):
+        return web.json_response(
+            {"error": {"message": "injected error", "type": "stub_error", "code": self.error_status}},
+            status=self.error_status,
+        )
+
+    async def ping(self, request):
+        return web.json_response({})
+
+    async def models(self, request):
+        return web.json_response({
+            "object": "list",
+            "data": [{"id": "stub", "object": "model", "created": 0, "owned_by": "stub"}],
+        })
+
+    async def chat_completions(self, request):
+        return await self._completions(request, chat=True)
+
+    async def completions(self, request):
+        return await self._completions(request, chat=False)
+
+    async def _completions(self, request, chat):
+        payload = await request.json()
+        if self.error_rate > 0 and self.rng.random() < self.error_rate:
+            return self._error_response()
+        num_tokens = self._num_output_tokens(payload)
+        tokens = [self.rng.choice(WORDS) + " " for _ in range(num_tokens)]
+        completion_id = f"{'chatcmpl' if chat else 'cmpl'}-{uuid.uuid4().hex}"
+        created = int(time.time())
+        model = payload.get("model") or "stub"
+
+        if not payload.get("stream", False):
+            await asyncio.sleep(self._delay(self.ttft) + sum(self._delay(self.itl) for _ in range(num_tokens - 1)))
+            text = "".join(tokens)
+            if chat:
+                choice = {"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "length"}
+            else:
+                choice = {"index": 0, "text": text, "finish_reason": "length"}
+            return web.json_response({
+                "id": completion_id,
+                "object": "chat.completion" if chat else "text_completion",
+                "created": created,
+                "model": model,
+                "choices": [choice],
+                "usage": self._usage(payload, num_tokens),
+            })
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+
+        async def send(choices, usage=None):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk" if chat else "text_completion",
+                "created": created,
+                "model": model,
+                "choices": choices,
+            }
+            if usage is not None:
+                chunk["usage"] = usage
+            # one event per write, the benchmark client parses every http chunk as one event
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+
+        try:
+            await asyncio.sleep(self._delay(self.ttft))
+            for i, token in enumerate(tokens):
+                if i > 0:
+                    await asyncio.sleep(self._delay(self.itl))
+                finish_reason = "length" if i == num_tokens - 1 else None
+                if chat:
+                    delta = {"role": "assistant", "content": token} if i == 0 else {"content": token}
+                    await send([{"index": 0, "delta": delta, "finish_reason": finish_reason}])
+                else:
+                    await send([{"index": 0, "text": token, "finish_reason": finish_reason}])
+            if (payload.get("stream_options") or {}).get("include_usage"):
+                await send([], usage=self._usage(payload, num_tokens))
+            await response.write(b"data: [DONE]\n\n")
+            await response.write_eof()
+        except ConnectionResetError:
+            # the client went away, e.g. cancelled at the end of the session
+            pass
+        return response
+
+    def make_app(self):
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_get("/ping", self.ping)
+        app.router.add_get("/health", self.ping)
+        app.router.add_get("/v1/models", self.models)
+        app.router.add_post("/v1/chat/completions", self.chat_completions)
+        app.router.add_post("/v1/completions", self.completions)
+        app.router.add_post("/invocations", self.chat_completions)
+        return app
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub server")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--ttft", type=float, default=0.2, help="seconds before the first token")
+    parser.add_argument("--itl", type=float, default=0.02, help="seconds between two tokens")
+    parser.add_argument("--output_tokens", type=int, default=128, help="tokens per response, capped by max_tokens")
+    parser.add_argument("--error_rate", type=float, default=0.0, help="share of the requests that fail")
+    parser.add_argument("--error_status", type=int, default=503)
+    parser.add_argument("--jitter", type=float, default=0.1, help="relative jitter of the delays")
+    parser.add_argument("--seed", type=int, default=None)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    server = StubServer(
+        ttft=args.ttft,
+        itl=args.itl,
+        output_tokens=args.output_tokens,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        jitter=args.jitter,
+        seed=args.seed,
+    )
+    print(f"stub server listening on http://{args.host}:{args.port}")
+    web.run_app(server.make_app(), host=args.host, port=args.port, print=None, access_log=None)
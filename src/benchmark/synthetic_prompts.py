@@ -0,0 +1,78 @@
+"""
+Synthetic prompt corpus for offline benchmarks.
+
+The prompts are generated from a fixed vocabulary and a seed, so every run
+(and every machine) gets the same corpus without downloading a dataset.
+"""
+import functools
+import random
+
+TOPICS = [
+    "distributed systems", "database indexing", "network protocols", "compiler design",
+    "operating systems", "machine learning", "cloud cost optimization", "container scheduling",
+    "load balancing", "caching strategies", "message queues", "stream processing",
+    "data compression", "cryptography", "search engines", "recommendation systems",
+    "time series storage", "observability", "incident response", "api design",
+    "renewable energy", "supply chains", "urban planning", "marine biology",
+    "ancient history", "music theory", "photography", "nutrition",
+]
+
+INSTRUCTIONS = [
+    "Explain {topic} to a new engineer on the team.",
+    "Summarize the main trade-offs in {topic}.",
+    "Write a short tutorial about {topic}.",
+    "List common mistakes people make with {topic} and how to avoid them.",
+    "Compare two popular approaches to {topic}.",
+    "Describe how {topic} has changed over the last decade.",
+    "Answer the question below about {topic} in a few paragraphs.",
+    "Draft an outline for a talk on {topic}.",
+]
+
+WORDS = (
+    "the of and to in is that for it as with was on be by this are from at or an which "
+    "system data request response latency throughput memory cache queue server client model "
+    "token batch worker thread process network storage disk cluster node region instance "
+    "service endpoint error retry timeout budget cost metric trace log window buffer stream "
+    "design pattern tradeoff scale load peak average median tail percentile sample record "
+    "build deploy release rollback test verify measure profile tune optimize limit capacity "
+    "user team product feature customer document report question answer example context "
+    "simple complex fast slow small large first last next previous common rare stable "
+    "because however therefore although while when where before after during between"
+).split()
+
+
+def _make_prompt(rng: random.Random, min_words: int, max_words: int) -> str:
+    instruction = rng.choice(INSTRUCTIONS).format(topic=rng.choice(TOPICS))
+    num_words = rng.randint(min_words, max_words)
+    sentences = []
+    while num_words > 0:
+        sentence_len = min(rng.randint(6, 18), num_words)
+        sentence = " ".join(rng.choice(WORDS) for _ in range(sentence_len))
+        sentences.append(sentence[0].upper() + sentence[1:] + ".")
+        num_words -= sentence_len
+    return f"{' '.join(sentences)}\n\n{instruction}"
+
+
+@functools.lru_cache(maxsize=8)
+def get_synthetic_prompts(num_prompts=1000, min_words=16, max_words=256, seed=0):
+    """
+    return `num_prompts` prompts with a context of min_words to max_words words
+    followed by an instruction
+    """
+    rng = random.Random(seed)
+    return [_make_prompt(rng, min_words, max_words) for _ in range(num_prompts)]
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Dump the synthetic prompt corpus as jsonl")
+    parser.add_argument("--num_prompts", type=int, default=1000)
+    parser.add_argument("--min_words", type=int, default=16)
+    parser.add_argument("--max_words", type=int, default=256)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for prompt in get_synthetic_prompts(args.num_prompts, args.min_words, args.max_words, args.seed):
+        print(json.dumps({"prompt": prompt}))
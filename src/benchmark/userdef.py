@@ -2,11 +2,23 @@ import asyncio
 
 class UserDef:
     BASE_URL = ""
+    # streaming responses are parsed line by line with `parse_event`,
+    # other responses once as a whole
+    STREAM = False
 
     @classmethod
     def ping_url(cls):
         return f"{cls.BASE_URL}/ping"
 
+    @classmethod
+    def parse_event(cls, data: bytes):
+        """
+        Parse one line of a streaming response, or a whole response.
+        Returns the number of output tokens in it and the `usage` of the
+        response if it carries one, otherwise None.
+        """
+        return len(cls.parse_response(data)), None
+
     @staticmethod
     async def rest():
         import asyncio
@@ -21,12 +21,17 @@ def _load_destroy_status():
     from .sdk.status import get_destroy_status
     return get_destroy_status
 
+def _load_watch_status():
+    from .sdk.status import watch_status
+    return watch_status
+
 
 
 functions_map = {
     "deploy": _load_deploy,
     "destroy": _load_destroy,
-    "destroy_status": _load_destroy_status
+    "destroy_status": _load_destroy_status,
+    "watch_status": _load_watch_status
 }
 
 
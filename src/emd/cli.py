@@ -6,7 +6,8 @@ from emd.commands import (
     destroy,
     version,
     status,
-    config
+    config,
+    benchmark
 )
 from emd.commands.invoke import invoke
 from emd.revision import VERSION, COMMIT_HASH
@@ -54,6 +55,12 @@ app.add_typer(
     help="Remove deployed models and clean up resources",
 )
 
+app.add_typer(
+    benchmark.app,
+    name="benchmark",
+    help="Benchmark models across engine configs, concurrency and workloads",
+)
+
 app.add_typer(models.app, name="list-supported-models", help="Display available models")
 
 app.add_typer(
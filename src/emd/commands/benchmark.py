@@ -0,0 +1,109 @@
+from typing import Annotated, Optional
+
+import typer
+from emd.sdk.benchmark import (
+    BenchmarkSpecError,
+    cell_id,
+    default_output_dir,
+    expand_benchmark_matrix,
+    iter_benchmark_matrix,
+    load_benchmark_spec,
+    result_to_row,
+    write_comparison_table,
+)
+from rich.console import Console
+from rich.table import Table
+
+app = typer.Typer(pretty_exceptions_enable=False)
+console = Console()
+
+
+def _fmt(value, fmt=".3f"):
+    return "-" if value is None else format(value, fmt)
+
+
+def _print_comparison_table(results):
+    table = Table(show_lines=False, expand=False)
+    for column in (
+        "Model", "Engine config", "Workload", "Concurrency", "Req/s", "Output tok/s",
+        "TTFT p50", "TTFT p99", "ITL p50", "ITL p99", "E2E p99", "Errors",
+    ):
+        table.add_column(column, justify="left" if column in ("Model", "Engine config", "Workload") else "right")
+    for result in results:
+        row = result_to_row(result)
+        if result.get("summary") is None:
+            table.add_row(
+                row["model_id"], row["engine_config"], row["workload"], str(row["concurrency"]),
+                *(["-"] * 7), "[red]failed[/red]",
+            )
+            continue
+        table.add_row(
+            row["model_id"], row["engine_config"], row["workload"], str(row["concurrency"]),
+            _fmt(row["request_throughput"], ".2f"), _fmt(row["output_token_throughput"], ".1f"),
+            _fmt(row["ttft_p50"]), _fmt(row["ttft_p99"]), _fmt(row["itl_p50"]), _fmt(row["itl_p99"]),
+            _fmt(row["e2e_p99"]), _fmt(row["error_rate"] * 100 if row["error_rate"] is not None else None, ".1f") + "%",
+        )
+    console.print(table)
+
+
+@app.callback(invoke_without_command=True)
+def benchmark(
+    spec_file: Annotated[
+        str, typer.Argument(help="Benchmark matrix spec (json) with models, engine_configs, concurrency and workloads")
+    ],
+    output_dir: Annotated[
+        Optional[str], typer.Option("-o", "--output-dir", help="Directory of the results, reused to resume an interrupted run")
+    ] = None,
+    restart: Annotated[
+        Optional[bool], typer.Option("--restart", help="Discard the results of earlier runs instead of resuming")
+    ] = False,
+    dry_run: Annotated[
+        Optional[bool], typer.Option("--dry-run", help="List the cells of the matrix without running them")
+    ] = False,
+):
+    """
+    Benchmark every combination of models, engine configs, concurrency and workloads.
+
+    Examples:
+        emd benchmark matrix.json
+        emd benchmark matrix.json --output-dir results/qwen --restart
+    """
+    try:
+        spec = load_benchmark_spec(spec_file)
+    except (OSError, ValueError, BenchmarkSpecError) as e:
+        console.print(f"[red]❌ Invalid benchmark spec: {e}[/red]")
+        raise typer.Exit(1)
+
+    cells = expand_benchmark_matrix(spec)
+    if dry_run:
+        for cell in cells:
+            console.print(cell_id(cell))
+        console.print(f"[dim]{len(cells)} cells, target: {spec['target']}[/dim]")
+        return
+
+    output_dir = output_dir or default_output_dir(spec)
+    console.print(f"[bold blue]Running {len(cells)} benchmark cells, results in {output_dir}[/bold blue]")
+
+    results = []
+    status = console.status("")
+
+    def on_cell_start(cell):
+        status.update(f"[bold green]Benchmarking {cell_id(cell)} ({len(results) + 1}/{len(cells)})")
+
+    with status:
+        for result in iter_benchmark_matrix(spec, output_dir, resume=not restart, on_cell_start=on_cell_start):
+            results.append(result)
+            if result.get("resumed"):
+                console.print(f"[dim]↺ {result['cell_id']} (finished in an earlier run)[/dim]")
+            elif result.get("summary") is None:
+                console.print(f"[red]✗ {result['cell_id']}: {result['error']}[/red]")
+            else:
+                console.print(f"[green]✓ {result['cell_id']}[/green] [dim]{result['elapsed']:.0f}s[/dim]")
+
+    _print_comparison_table(results)
+    table_path = write_comparison_table(results, output_dir)
+    console.print(f"[dim]Comparison table written to {table_path}[/dim]")
+    failed = [result for result in results if result.get("summary") is None]
+    if failed:
+        console.print(f"[yellow]{len(failed)} cells failed, run the same command again to retry them[/yellow]")
+        raise typer.Exit(1)
@@ -119,6 +119,36 @@ def vlm_invoke(model_id,model_tag):
     ret = invoker.invoke()
     console.print(f"[bold green]Outputs: {ret}[/bold green]")
 
+def batch_async_invoke(model_id, model_tag, input_file, output_file, concurrency=None):
+    """Submit every line of a JSONL file to an async endpoint, write one JSONL line per result."""
+    import json
+    import sys
+    from emd.sdk.invoke.invoker_base import InvokerBase
+    # results may go to stdout, keep the progress on stderr
+    err_console = Console(stderr=True)
+    invoker = InvokerBase(model_id, model_tag)
+    with open(input_file) as f:
+        pyloads = [json.loads(line) for line in f if line.strip()]
+    err_console.print(f"Submitting {len(pyloads)} requests from {input_file}")
+    batch = invoker.invoke_async_many(pyloads, max_concurrency=concurrency)
+    failed = 0
+    out = sys.stdout if output_file == "-" else open(output_file, "w")
+    try:
+        with err_console.status(f"Waiting for {len(pyloads)} results", spinner="dots") as status:
+            for done, (index, future) in enumerate(batch.as_completed(), start=1):
+                try:
+                    record = {"index": index, "output": future.result()}
+                except Exception as e:
+                    failed += 1
+                    record = {"index": index, "error": str(e)}
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                status.update(f"Completed {done}/{len(pyloads)}, failed: {failed}")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    err_console.print(f"[bold green]Completed {len(pyloads)} requests, failed: {failed}[/bold green]")
+
 
 @app.callback(invoke_without_command=True)
 @catch_aws_credential_errors
@@ -129,8 +159,19 @@ def invoke(
     model_tag: Annotated[str, typer.Argument(help="Model rag")] = MODEL_DEFAULT_TAG,
     stream: Annotated[
         bool, typer.Option("-s", "--stream", help="Stream the response, it only works with language models")
-    ] = True
+    ] = True,
+    input_file: Annotated[
+        Optional[str], typer.Option("--input-file", help="JSONL file with one request payload per line, submitted to an async endpoint")
+    ] = None,
+    output_file: Annotated[
+        str, typer.Option("--output-file", help="JSONL file of the results of --input-file, '-' for stdout")
+    ] = "-",
+    concurrency: Annotated[
+        Optional[int], typer.Option("--concurrency", help="Max number of concurrent submissions of --input-file")
+    ] = None
 ):
+    if input_file is not None:
+        return batch_async_invoke(model_id, model_tag, input_file, output_file, concurrency)
     console.print(f"Invoking model {model_id} with tag {model_tag}")
     model:Model = Model.get_model(model_id)
     model_type = model.model_type
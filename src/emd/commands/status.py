@@ -1,8 +1,9 @@
-from typing import Annotated
+import time
+from typing import Annotated, Optional
 
 import typer
 from emd.constants import MODEL_DEFAULT_TAG
-from emd.sdk.status import get_model_status
+from emd.sdk.status import get_model_status, watch_status
 from emd.utils.aws_service_utils import get_account_id
 from emd.utils.decorators import catch_aws_credential_errors, check_emd_env_exist, load_aws_profile
 from emd.utils.logger_utils import make_layout
@@ -27,7 +28,14 @@ def status(
     model_tag: Annotated[
         str, typer.Argument(help="Model tag")
     ] = MODEL_DEFAULT_TAG,
+    watch: Annotated[
+        Optional[bool], typer.Option("-w", "--watch", help="Keep running and print status changes as they happen")
+    ] = False,
 ):
+    if watch:
+        _watch(model_id, model_tag)
+        return
+
     with console.status("[bold green]Fetching model deployment status. Please wait patiently", spinner="dots"):
         ret = get_model_status(model_id, model_tag=model_tag)
 
@@ -204,5 +212,22 @@ def status(
         console.print("No Base URL found")
 
 
+def _watch(model_id, model_tag):
+    console.print("Watching model deployment status, press Ctrl+C to stop.", style="bold")
+    try:
+        for event in watch_status(model_id, model_tag=model_tag):
+            timestamp = time.strftime("%H:%M:%S", time.localtime(event['time']))
+            model_name = f"{event['model_id']}/{event['model_tag']}"
+            if event['event'] == 'added':
+                change = event['status']
+            elif event['event'] == 'changed':
+                change = f"{event['previous_status']} [bold]->[/bold] {event['status']}"
+            else:
+                change = f"{event['previous_status']} [bold]->[/bold] removed"
+            console.print(f"[dim]{timestamp}[/dim] [cyan]{model_name}[/cyan] ({event['source']}) {change}")
+    except KeyboardInterrupt:
+        pass
+
+
 if __name__ == "__main__":
     status()
@@ -12,16 +12,8 @@ from .model import (
 
 
 
-from . import (
-    llms,
-    vlms,
-    comfyui,
-    asr,
-    audio,
-    embeddings,
-    reranks,
-    custom,
-)
+# model definitions (llms, vlms, embeddings, ...) are imported on demand by
+# `Model.get_model`, see `Model.load_model` and model_index.json
 # text-2-image,text-2-video
 
 from . import engines
@@ -1 +0,0 @@
-from .whisper import *
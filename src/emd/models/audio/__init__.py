@@ -1 +0,0 @@
-from . import higgs_audio
@@ -1 +0,0 @@
-from .comfyui import *
@@ -1 +0,0 @@
-from .custom_docker import *
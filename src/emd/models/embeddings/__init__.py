@@ -1,4 +0,0 @@
-from . import bert_embedding
-from . import jina
-from . import qwen
-from . import bge_vl
@@ -9,6 +9,13 @@ class OpenAICompitableEngine(Engine):
     default_cli_args: str = ""
     custom_gpu_num: Union[int,None] = None
     custom_neuron_core_num: Union[int,None] = None
+    # connection pool of the proxy backend to the local engine server
+    http_max_connections: int = 1000
+    http_max_keepalive_connections: int = 100
+    http_keepalive_expiry: float = 60
+    http_timeout: float = 600
+    # proxy the engine server's SSE stream as raw bytes instead of parsing every chunk
+    streaming_passthrough: bool = False
 
 
 class VllmEngine(OpenAICompitableEngine):
@@ -42,6 +49,20 @@ class HuggingFaceWhisperEngine(Engine):
 class HuggingFaceLLMEngine(Engine):
     pretrained_model_init_kwargs: Union[dict,None] = None
     pretrained_tokenizer_init_kwargs: Union[dict,None] = None
+    # admit new requests into the running decode batch at every step
+    continuous_batching: bool = False
+    max_num_seqs: int = 16
+
+class HuggingFaceEmbeddingEngine(HuggingFaceLLMEngine):
+    # concurrent requests are merged into one encode call
+    max_batch_size: int = 32
+    max_batch_wait_ms: float = 5
+
+class HuggingFaceRerankEngine(HuggingFaceLLMEngine):
+    # all pairs are scored in one call by default, set max_tokens_per_batch (e.g. 16384)
+    # to sort pairs by length and pack them into batches of at most that many padded tokens
+    max_tokens_per_batch: int = 0
+    max_length: int = 1024
 
 class ComfyuiEngine(Engine):
     pass
@@ -535,7 +556,7 @@ huggingface_baichuan_engine_4d41d2 = HuggingFaceLLMEngine(**{
             "pretrained_tokenizer_init_kwargs":{"trust_remote_code":True}
 })
 
-huggingface_embedding_engine449 = HuggingFaceLLMEngine(**{
+huggingface_embedding_engine449 = HuggingFaceEmbeddingEngine(**{
             "engine_type":EngineType.HUGGINGFACE,
             "engine_cls":"huggingface.embedding.transformers_embedding_backend.TransformerEmbeddingBackend",
             "python_name":"python3",
@@ -546,7 +567,7 @@ huggingface_embedding_engine449 = HuggingFaceLLMEngine(**{
             "pretrained_model_init_kwargs":{"trust_remote_code":True,"torch_dtype":"float16"},
 })
 
-huggingface_rerank_engine449 = HuggingFaceLLMEngine(**{
+huggingface_rerank_engine449 = HuggingFaceRerankEngine(**{
             "engine_type":EngineType.HUGGINGFACE,
             "engine_cls":"huggingface.rerank.transformers_rerank_backend.TransformerRerankBackend",
             "python_name":"python3",
@@ -6,7 +6,18 @@ class FastAPIFramework(Framework):
     limit_concurrency: int = 1000
     timeout_keep_alive: int = 300
     uvicorn_log_level: str = "info"
-
+    # blocking inference calls run on a dedicated bounded thread pool
+    inference_max_workers: int = 8
+    inference_max_queue_size: int = 512
+    inference_overload_status_code: int = 503
+    # admission control in front of the engine, disabled when admission_max_concurrency is 0
+    admission_max_concurrency: int = 0
+    admission_max_queue_size: int = 100
+    admission_route_max_queue_size: dict = {}
+    admission_max_queue_wait: float = 30
+    # exact-match cache of deterministic responses, disabled when response_cache_max_bytes is 0
+    response_cache_max_bytes: int = 0
+    response_cache_ttl: float = 3600
 
 
 
@@ -1,13 +0,0 @@
-from . import (
-    glm,
-    internlm,
-    openai_oss,
-    qwen,
-    llama,
-    deepseek,
-    baichuan,
-    jina,
-    txgemma,
-    medgemma,
-    openai_oss
-)
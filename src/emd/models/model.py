@@ -1,7 +1,9 @@
 import os
 import re
+import json
+import pkgutil
 import importlib
-from pydantic import BaseModel,Field,ConfigDict,SerializeAsAny
+from pydantic import BaseModel,Field,ConfigDict,SerializeAsAny,PrivateAttr
 from typing import List,ClassVar,Union,TypeVar, Generic,Any,Dict
 from .utils.constants import (
     EngineType,
@@ -26,6 +28,18 @@ T = TypeVar('T', bound='Model')
 
 
 abs_dir = os.path.dirname(__file__)
+MODEL_INDEX_PATH = os.path.join(abs_dir, "model_index.json")
+# packages holding the `Model.register` calls, their modules are imported on demand
+MODEL_FAMILY_PACKAGES = (
+    "llms",
+    "vlms",
+    "comfyui",
+    "asr",
+    "audio",
+    "embeddings",
+    "reranks",
+    "custom",
+)
 
 class ModelBase(BaseModel):
     model_config = ConfigDict(
@@ -192,69 +206,124 @@ class Model(ModelBase,Generic[T]):
     model_series: ModelSeries = None
     executable_config: Union[ExecutableConfig,None] = None
 
+    # model_id -> {"module", "model_type", "model_series"}, generated at build time
+    _model_index: ClassVar[Union[dict,None]] = None
+    _all_models_loaded: ClassVar[bool] = False
+    supported_type_fields: ClassVar[dict] = {
+        "supported_engines": "engine_type",
+        "supported_instances": "instance_type",
+        "supported_services": "service_type",
+        "supported_frameworks": "framework_type",
+    }
+    # field name -> (supported list, {type: item dump})
+    _supported_maps: dict = PrivateAttr(default_factory=dict)
+
     @classmethod
     def register(cls, model_dict) -> T:
         model = cls(**model_dict)
         Model.model_map[model.model_id] = model
         return model
 
+    @classmethod
+    def get_model_index(cls) -> dict:
+        if Model._model_index is None:
+            try:
+                with open(MODEL_INDEX_PATH) as f:
+                    Model._model_index = json.load(f)
+            except (OSError, ValueError):
+                Model._model_index = {}
+        return Model._model_index
+
+    @classmethod
+    def iter_model_modules(cls):
+        for package_name in MODEL_FAMILY_PACKAGES:
+            package = importlib.import_module(f"{__package__}.{package_name}")
+            for module_info in pkgutil.iter_modules(package.__path__):
+                yield f"{package.__name__}.{module_info.name}"
+
+    @classmethod
+    def load_all_models(cls):
+        if Model._all_models_loaded:
+            return
+        for module_name in cls.iter_model_modules():
+            importlib.import_module(module_name)
+        Model._all_models_loaded = True
+
+    @classmethod
+    def load_model(cls, model_id:str):
+        if model_id in Model.model_map:
+            return
+        index_item = cls.get_model_index().get(model_id)
+        if index_item is not None:
+            importlib.import_module(index_item["module"])
+        if model_id not in Model.model_map:
+            # stale or missing index
+            cls.load_all_models()
 
     @classmethod
     def get_model(cls ,model_id:str,update:dict = None) -> T:
+        cls.load_model(model_id)
         try:
             model = cls.model_map[model_id]
         except KeyError:
             raise KeyError(f"model_id:{model_id} is not supported")
         if update:
-            model = model.copy(update=update)
+            model = model.model_copy(update=update)
         return model
 
     @classmethod
     def get_supported_models(cls,detail=False) -> dict:
+        model_index = cls.get_model_index()
+        if detail or not model_index:
+            cls.load_all_models()
         if not detail:
-            return {model_id: model.model_type for model_id,model in cls.model_map.items()}
+            supported_models = {model_id: item["model_type"] for model_id,item in model_index.items()}
+            # models registered at runtime are not in the index
+            supported_models.update({model_id: model.model_type for model_id,model in cls.model_map.items()})
+            return supported_models
         return {model_id: model.model_dump() for model_id,model in cls.model_map.items()}
 
+    def model_post_init(self, __context: Any) -> None:
+        self._supported_maps = {}
+        for field_name,type_name in self.supported_type_fields.items():
+            self._get_supported_map(field_name,type_name)
+
+    def model_copy(self, *, update=None, deep=False):
+        model = super().model_copy(update=update, deep=deep)
+        # the cache depends on the fields, do not share it with the copy
+        model._supported_maps = {}
+        return model
+
+    def _get_supported_map(self,field_name:str,type_name:str) -> dict:
+        supported = getattr(self,field_name)
+        cached = self._supported_maps.get(field_name)
+        # rebuild when the list was replaced, e.g. by model_copy(update=...)
+        if cached is None or cached[0] is not supported:
+            supported_map = {}
+            for item in supported:
+                if getattr(item,type_name) not in supported_map:
+                    supported_map[getattr(item,type_name)] = item.model_dump()
+            cached = self._supported_maps[field_name] = (supported,supported_map)
+        return cached[1]
+
+    def _find_current(self,field_name:str,type_value) -> dict:
+        type_name = self.supported_type_fields[field_name]
+        cur = self._get_supported_map(field_name,type_name).get(type_value)
+        assert cur is not None, (type_value, getattr(self,field_name))
+        # callers update the returned dict
+        return dict(cur)
+
     def find_current_engine(self,engine_type:str) -> dict:
-        supported_engines:List[Engine]  = self.supported_engines
-        cur_engine = None
-        for supported_engine in supported_engines:
-            if supported_engine.engine_type == engine_type:
-                cur_engine = supported_engine.model_dump()
-                break
-        assert cur_engine is not None, (engine_type,supported_engines)
-        return cur_engine
+        return self._find_current("supported_engines",engine_type)
 
     def find_current_instance(self,instance_type):
-        supported_instances = self.supported_instances
-        cur_instance = None
-        for supported_instance in supported_instances:
-            if supported_instance.instance_type == instance_type:
-                cur_instance = supported_instance.model_dump()
-                break
-        assert cur_instance is not None, (instance_type, supported_instances)
-        return cur_instance
+        return self._find_current("supported_instances",instance_type)
 
     def find_current_service(self,service_type):
-        supported_services = self.supported_services
-        cur_service = None
-        for supported_service in supported_services:
-            if supported_service.service_type == service_type:
-                cur_service = supported_service.model_dump()
-                break
-        assert cur_service is not None, (service_type, supported_services)
-
-        return cur_service
+        return self._find_current("supported_services",service_type)
 
     def find_current_framework(self,framework_type):
-        supported_frameworks = self.supported_frameworks
-        cur_framework = None
-        for supported_framework in supported_frameworks:
-            if supported_framework.framework_type == framework_type:
-                cur_framework = supported_framework.model_dump()
-                break
-        assert cur_framework is not None, (framework_type, supported_frameworks)
-        return cur_framework
+        return self._find_current("supported_frameworks",framework_type)
 
 
     @property
@@ -1,2 +0,0 @@
-from . import bge
-from . import jina
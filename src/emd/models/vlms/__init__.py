@@ -1,5 +0,0 @@
-from . import qwen
-from . import internvl
-from . import gemma3
-from . import mistral
-from . import dots_ocr
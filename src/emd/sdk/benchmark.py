@@ -0,0 +1,435 @@
+"""
+Benchmark matrix runner.
+
+A matrix spec (json) lists models, engine configs, concurrency levels and
+workloads. Every combination is one cell, run with `benchmark.py` of the
+benchmark tools shipped with emd. Finished cells are appended to
+`results.jsonl` in the output directory, so an interrupted run resumes with
+the remaining cells, and all cells are summarized in `results.csv`.
+
+Example spec:
+
+    {
+        "name": "qwen-max-num-seq",
+        "target": "deploy",
+        "deploy": {"instance_type": "g5.2xlarge", "engine_type": "vllm", "service_type": "ecs"},
+        "models": ["Qwen2.5-7B-Instruct"],
+        "engine_configs": [
+            {"name": "seq8", "engine_params": {"default_cli_args": " --max_num_seq 8"}},
+            {"name": "seq32", "engine_params": {"default_cli_args": " --max_num_seq 32"}}
+        ],
+        "concurrency": [1, 8, 32],
+        "workloads": [
+            {"name": "short", "min_input_words": 16, "max_input_words": 128, "max_tokens": 128, "min_tokens": 128},
+            {"name": "long", "prompt_file": "long_prompts.txt", "max_tokens": 1024}
+        ],
+        "session_time": 120
+    }
+
+`target` is `endpoint` (an already deployed `base_url`, given on the spec,
+a model or an engine config), `deploy` (every model and engine config is
+deployed to ECS with emd, benchmarked and destroyed), `stub` or `fastapi`
+(the offline stub server, alone or behind fast_api.py, no AWS needed).
+Engine configs of a `deploy` target may override its `instance_type` and
+`engine_type`.
+
+The users of a cell are all spawned at its start unless the spec sets
+`ramp_up` seconds, the first `warmup` seconds (default `ramp_up`) are run in
+addition to `session_time` and left out of the summary, so every cell is
+measured at its full concurrency.
+"""
+import csv
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, Iterator, List, Optional
+
+from emd.constants import MODEL_DEFAULT_TAG
+from emd.models.utils.constants import ServiceType
+from emd.utils.logger_utils import get_logger
+from emd.utils.upload_pipeline import emd_package_dir
+
+logger = get_logger(__name__)
+
+BENCHMARK_TARGETS = ("endpoint", "deploy", "stub", "fastapi")
+RESULTS_FILE_NAME = "results.jsonl"
+TABLE_FILE_NAME = "results.csv"
+DEFAULT_SESSION_TIME = 120
+DEPLOY_OVERRIDE_KEYS = ("instance_type", "engine_type")
+TABLE_COLUMNS = [
+    "model_id", "engine_config", "workload", "concurrency",
+    "requests", "error_rate", "request_throughput", "output_token_throughput",
+    "ttft_p50", "ttft_p99", "itl_p50", "itl_p99", "tpot_p50", "e2e_p50", "e2e_p99",
+]
+
+
+class BenchmarkSpecError(ValueError):
+    pass
+
+
+def get_benchmark_dir() -> str:
+    """The benchmark tools, shipped as emd/benchmark or src/benchmark of a source checkout."""
+    candidates = [
+        os.environ.get("EMD_BENCHMARK_DIR"),
+        os.path.join(emd_package_dir, "benchmark"),
+        os.path.join(os.path.dirname(emd_package_dir), "benchmark"),
+    ]
+    for candidate in candidates:
+        if candidate and os.path.exists(os.path.join(candidate, "benchmark.py")):
+            return os.path.abspath(candidate)
+    raise FileNotFoundError("benchmark tools not found, set EMD_BENCHMARK_DIR to the benchmark directory")
+
+
+def _named(items: list, key: str, default_name: str) -> List[dict]:
+    named = []
+    for i, item in enumerate(items or [{}]):
+        if isinstance(item, str):
+            item = {key: item}
+        item = dict(item)
+        item.setdefault("name", item.get(key) or (default_name if len(items or [{}]) == 1 else f"{default_name}{i}"))
+        named.append(item)
+    return named
+
+
+def load_benchmark_spec(spec_path: str) -> dict:
+    with open(spec_path) as f:
+        spec = json.load(f)
+    spec["spec_dir"] = os.path.dirname(os.path.abspath(spec_path))
+    return validate_benchmark_spec(spec)
+
+
+def validate_benchmark_spec(spec: dict) -> dict:
+    spec = dict(spec)
+    spec.setdefault("name", "benchmark")
+    spec.setdefault("target", "endpoint")
+    if spec["target"] not in BENCHMARK_TARGETS:
+        raise BenchmarkSpecError(f"target must be one of {BENCHMARK_TARGETS}, got: {spec['target']}")
+    if not spec.get("models"):
+        raise BenchmarkSpecError("the spec has no models")
+    spec["models"] = _named(spec["models"], "model_id", "model")
+    spec["engine_configs"] = _named(spec.get("engine_configs"), "name", "default")
+    spec["workloads"] = _named(spec.get("workloads"), "name", "default")
+    spec["concurrency"] = [int(c) for c in spec.get("concurrency") or [1]]
+    for name in ("models", "engine_configs", "workloads"):
+        names = [item["name"] for item in spec[name]]
+        if len(set(names)) != len(names):
+            raise BenchmarkSpecError(f"names of {name} must be unique: {names}")
+
+    if spec["target"] == "endpoint":
+        for model in spec["models"]:
+            for config in spec["engine_configs"]:
+                if not (config.get("base_url") or model.get("base_url") or spec.get("base_url")):
+                    raise BenchmarkSpecError(
+                        f"no base_url for model {model['name']} and engine config {config['name']}"
+                    )
+    if spec["target"] == "deploy":
+        deploy = spec.get("deploy") or {}
+        for config in spec["engine_configs"]:
+            missing = [key for key in DEPLOY_OVERRIDE_KEYS if not (config.get(key) or deploy.get(key))]
+            if missing:
+                raise BenchmarkSpecError(f"deploy of engine config {config['name']} needs {missing}")
+        if deploy.get("service_type", ServiceType.ECS) != ServiceType.ECS:
+            raise BenchmarkSpecError("benchmark deployments must use the ecs service, it exposes an http endpoint")
+    return spec
+
+
+def cell_id(cell: dict) -> str:
+    return f"{cell['model']}/{cell['engine_config']}/{cell['workload']}/c{cell['concurrency']}"
+
+
+def expand_benchmark_matrix(spec: dict) -> List[dict]:
+    """Cells grouped by model and engine config, every deployment is used for all of its cells."""
+    cells = []
+    for model in spec["models"]:
+        for config in spec["engine_configs"]:
+            for workload in spec["workloads"]:
+                for concurrency in spec["concurrency"]:
+                    cells.append({
+                        "model": model["name"],
+                        "engine_config": config["name"],
+                        "workload": workload["name"],
+                        "concurrency": concurrency,
+                    })
+    return cells
+
+
+def load_finished_cells(output_dir: str) -> Dict[str, dict]:
+    """Results of the cells that finished in an earlier run, by cell id."""
+    finished = {}
+    path = os.path.join(output_dir, RESULTS_FILE_NAME)
+    if not os.path.exists(path):
+        return finished
+    with open(path) as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                # a line cut off by an interrupted run
+                continue
+            if result.get("summary") is not None:
+                finished[result["cell_id"]] = result
+    return finished
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_.-]+", "_", name)
+
+
+def _deploy_model_tag(spec: dict, config: dict) -> str:
+    return re.sub(r"[^a-zA-Z0-9]", "", f"bench{spec['name']}{config['name']}")[:32] or MODEL_DEFAULT_TAG
+
+
+class BenchmarkDeployError(RuntimeError):
+    pass
+
+
+class _Target:
+    """
+    The endpoint of one model and engine config, deployed on enter if the spec
+    says so. A failed deployment is destroyed again and raises `BenchmarkDeployError`.
+    """
+
+    def __init__(self, spec: dict, model: dict, config: dict):
+        self.spec = spec
+        self.model = model
+        self.config = config
+        self.base_url = config.get("base_url") or model.get("base_url") or spec.get("base_url")
+        self.model_tag = None
+
+    def __enter__(self):
+        if self.spec["target"] != "deploy":
+            return self
+        from emd.sdk.clients.ecs_client import ECSClient
+        from emd.sdk.deploy import deploy
+
+        deploy_config = self.spec["deploy"]
+        self.model_tag = _deploy_model_tag(self.spec, self.config)
+        extra_params = dict(deploy_config.get("extra_params") or {})
+        extra_params["engine_params"] = {
+            **(extra_params.get("engine_params") or {}),
+            **(self.config.get("engine_params") or {}),
+        }
+        logger.info(f"deploying {self.model['model_id']}/{self.model_tag} for engine config {self.config['name']}")
+        try:
+            deploy(
+                model_id=self.model["model_id"],
+                instance_type=self.config.get("instance_type") or deploy_config["instance_type"],
+                engine_type=self.config.get("engine_type") or deploy_config["engine_type"],
+                service_type=ServiceType.ECS,
+                model_tag=self.model_tag,
+                extra_params=extra_params,
+                waiting_until_deploy_complete=True,
+            )
+            base_url = ECSClient(model_id=self.model["model_id"], model_tag=self.model_tag).base_url
+        except Exception as e:
+            error = BenchmarkDeployError(f"deploy of {self.model['model_id']}/{self.model_tag} failed: {e}")
+            # __exit__ is not called when __enter__ raises, remove what was created
+            self.__exit__(type(e), e, e.__traceback__)
+            raise error from e
+        self.base_url = base_url if base_url.startswith("http") else f"http://{base_url}"
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.model_tag is None or not self.spec["deploy"].get("destroy", True):
+            return
+        from emd.sdk.destroy import destroy
+        logger.info(f"destroying {self.model['model_id']}/{self.model_tag}")
+        try:
+            destroy(model_id=self.model["model_id"], model_tag=self.model_tag, waiting_until_complete=True)
+        except Exception as e:
+            logger.error(f"failed to destroy {self.model['model_id']}/{self.model_tag}: {e}")
+        self.model_tag = None
+
+
+def _cell_command(spec: dict, cell: dict, config: dict, metrics_path: str) -> List[str]:
+    ramp_up = spec.get("ramp_up", 0)
+    warmup = spec.get("warmup", ramp_up)
+    command = [
+        sys.executable, "benchmark.py",
+        "--max_users", str(cell["concurrency"]),
+        # the measured window is session_time long, after the warmup
+        "--session_time", str(spec.get("session_time", DEFAULT_SESSION_TIME) + warmup),
+        "--ramp_up", str(ramp_up),
+        "--warmup", str(warmup),
+        "--workers", str(spec.get("workers", 1)),
+        "--metrics_json", metrics_path,
+    ]
+    if spec.get("ping_correction"):
+        command.append("--ping_correction")
+    if spec["target"] in ("stub", "fastapi"):
+        command += ["--offline", spec["target"]]
+        stub = {**(spec.get("stub") or {}), **(config.get("stub") or {})}
+        for key in ("ttft", "itl", "output_tokens", "error_rate"):
+            if key in stub:
+                command += [f"--stub_{key}", str(stub[key])]
+    return command
+
+
+def _cell_env(spec: dict, model: dict, workload: dict, base_url: Optional[str]) -> Dict[str, str]:
+    env = dict(os.environ)
+    env["MODEL_ID"] = model["model_id"]
+    if base_url:
+        env["BASE_URL"] = base_url.rstrip("/")
+    if spec.get("tokenizer"):
+        env["TOKENIZER"] = spec["tokenizer"]
+    env_keys = {
+        "max_tokens": "MAX_TOKENS",
+        "min_tokens": "MIN_TOKENS",
+        "num_prompts": "SYNTHETIC_PROMPT_NUM",
+        "min_input_words": "SYNTHETIC_PROMPT_MIN_WORDS",
+        "max_input_words": "SYNTHETIC_PROMPT_MAX_WORDS",
+    }
+    for key, env_key in env_keys.items():
+        if workload.get(key) is not None:
+            env[env_key] = str(workload[key])
+    env.pop("PROMPT_FILE", None)
+    if workload.get("prompt_file"):
+        env["PROMPT_FILE"] = os.path.join(spec.get("spec_dir", "."), workload["prompt_file"])
+    if workload.get("system_prompt"):
+        env["SYSTEM_PROMPT"] = "1"
+    return env
+
+
+def run_benchmark_cell(spec: dict, cell: dict, base_url: Optional[str], output_dir: str) -> dict:
+    """Run one cell, returns its result record with the metrics summary, or with the error."""
+    model = next(m for m in spec["models"] if m["name"] == cell["model"])
+    config = next(c for c in spec["engine_configs"] if c["name"] == cell["engine_config"])
+    workload = next(w for w in spec["workloads"] if w["name"] == cell["workload"])
+    cell_dir = os.path.join(output_dir, "cells")
+    os.makedirs(cell_dir, exist_ok=True)
+    name = _safe_name(cell_id(cell))
+    metrics_path = os.path.abspath(os.path.join(cell_dir, f"{name}.json"))
+    log_path = os.path.join(cell_dir, f"{name}.log")
+
+    t0 = time.time()
+    result = {"cell_id": cell_id(cell), "cell": cell, "base_url": base_url, "summary": None}
+    with open(log_path, "w") as log:
+        process = subprocess.run(
+            _cell_command(spec, cell, config, metrics_path),
+            cwd=get_benchmark_dir(),
+            env=_cell_env(spec, model, workload, base_url),
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+    result["elapsed"] = time.time() - t0
+    if process.returncode != 0 or not os.path.exists(metrics_path):
+        result["error"] = f"benchmark exited with code {process.returncode}, see {log_path}"
+        return result
+    with open(metrics_path) as f:
+        result["summary"] = json.load(f)["summary"]
+    return result
+
+
+def _checkpoint(results_path: str, result: dict):
+    """Append the result of a cell, a rerun skips the cells with a summary."""
+    with open(results_path, "a") as f:
+        f.write(json.dumps(result, default=str) + "\n")
+
+
+def iter_benchmark_matrix(
+    spec: dict,
+    output_dir: str,
+    resume: bool = True,
+    on_cell_start: Optional[Callable[[dict], None]] = None,
+) -> Iterator[dict]:
+    """
+    Run the cells of the matrix that did not finish in an earlier run and
+    yield their results as they finish, results of earlier runs are yielded
+    first with `"resumed": True`.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    finished = load_finished_cells(output_dir) if resume else {}
+    results_path = os.path.join(output_dir, RESULTS_FILE_NAME)
+    if not resume and os.path.exists(results_path):
+        os.remove(results_path)
+
+    cells = expand_benchmark_matrix(spec)
+    for cell in cells:
+        if cell_id(cell) in finished:
+            yield {**finished[cell_id(cell)], "resumed": True}
+
+    pending = [cell for cell in cells if cell_id(cell) not in finished]
+    groups: Dict[tuple, List[dict]] = {}
+    for cell in pending:
+        groups.setdefault((cell["model"], cell["engine_config"]), []).append(cell)
+
+    for (model_name, config_name), group in groups.items():
+        model = next(m for m in spec["models"] if m["name"] == model_name)
+        config = next(c for c in spec["engine_configs"] if c["name"] == config_name)
+        target = _Target(spec, model, config)
+        try:
+            target.__enter__()
+        except BenchmarkDeployError as e:
+            logger.error(str(e))
+            # the cells are run again by the next run, like failed benchmarks
+            for cell in group:
+                result = {"cell_id": cell_id(cell), "cell": cell, "base_url": None, "summary": None, "error": str(e)}
+                _checkpoint(results_path, result)
+                yield result
+            continue
+        try:
+            for cell in group:
+                if on_cell_start is not None:
+                    on_cell_start(cell)
+                result = run_benchmark_cell(spec, cell, target.base_url, output_dir)
+                _checkpoint(results_path, result)
+                yield result
+        finally:
+            target.__exit__(None, None, None)
+
+def _percentile(summary: dict, field: str, p: str):
+    return (summary.get(field) or {}).get(p)
+
+
+def result_to_row(result: dict) -> dict:
+    cell = result["cell"]
+    row = {
+        "model_id": cell["model"],
+        "engine_config": cell["engine_config"],
+        "workload": cell["workload"],
+        "concurrency": cell["concurrency"],
+    }
+    summary = result.get("summary")
+    if summary is None:
+        return row
+    requests = summary.get("requests") or 0
+    row.update({
+        "requests": requests,
+        "error_rate": (requests - summary.get("successful", 0)) / requests if requests else None,
+        "request_throughput": summary.get("request_throughput"),
+        "output_token_throughput": summary.get("output_token_throughput"),
+        "ttft_p50": _percentile(summary, "ttft", "p50"),
+        "ttft_p99": _percentile(summary, "ttft", "p99"),
+        "itl_p50": _percentile(summary, "itl", "p50"),
+        "itl_p99": _percentile(summary, "itl", "p99"),
+        "tpot_p50": _percentile(summary, "tpot", "p50"),
+        "e2e_p50": _percentile(summary, "e2e", "p50"),
+        "e2e_p99": _percentile(summary, "e2e", "p99"),
+    })
+    return row
+
+
+def write_comparison_table(results: List[dict], output_dir: str) -> str:
+    path = os.path.join(output_dir, TABLE_FILE_NAME)
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=TABLE_COLUMNS)
+        writer.writeheader()
+        for result in results:
+            writer.writerow(result_to_row(result))
+    return path
+
+
+def default_output_dir(spec: dict) -> str:
+    return os.path.join("benchmark_results", _safe_name(spec["name"]))
+
+
+def run_benchmark_matrix(spec_path: str, output_dir: Optional[str] = None, resume: bool = True) -> List[dict]:
+    """Run the matrix of the spec file and write the comparison table, returns the results of all cells."""
+    spec = load_benchmark_spec(spec_path)
+    output_dir = output_dir or default_output_dir(spec)
+    results = list(iter_benchmark_matrix(spec, output_dir, resume=resume))
+    write_comparison_table(results, output_dir)
+    return results
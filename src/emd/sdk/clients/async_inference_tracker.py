@@ -0,0 +1,260 @@
+"""
+Completion tracking of SageMaker async inference requests.
+
+Instead of running S3 waiters per request, every outstanding request of a
+client is registered in one `AsyncInferenceTracker`. A single poller thread
+checks all of them per round with HEAD requests on a bounded pool, so a round
+costs a request per outstanding path whatever the history of the output
+prefix. If the endpoint publishes its success/error notifications to SNS
+and an SQS queue is subscribed to the topics, the tracker also consumes the
+queue and resolves requests as soon as their notification arrives, S3 polling
+then only runs as a slow fallback.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+from emd.utils.logger_utils import get_logger
+
+logger = get_logger(__name__)
+
+# resolved paths remembered to acknowledge notifications that arrive after polling found the result
+MAX_RECENT_PATHS = 10000
+
+
+def _split_s3_path(s3_path: str) -> Tuple[str, str]:
+    bucket, _, key = s3_path[len("s3://"):].partition("/")
+    return bucket, key
+
+
+class _PendingRequest:
+    __slots__ = ("output_path", "failure_path", "deadline", "timeout", "future")
+
+    def __init__(self, output_path: str, failure_path: Optional[str], timeout: float):
+        self.output_path = output_path
+        self.failure_path = failure_path
+        self.timeout = timeout
+        self.deadline = time.monotonic() + timeout
+        self.future = Future()
+
+
+class AsyncInferenceTracker:
+    """
+    Multiplex the completion checks of many async inference requests onto one poller.
+
+    `track` returns a `concurrent.futures.Future` that resolves to the parsed
+    result of the request, or fails with `AsyncInferenceModelError` if the
+    endpoint wrote a failure object, or with `PollingTimeoutError`.
+    """
+    def __init__(
+        self,
+        s3_client,
+        response_handler: Callable[[dict], Any],
+        sqs_client=None,
+        notification_queue_url: Optional[str] = None,
+        min_poll_interval: float = 0.2,
+        max_poll_interval: float = 5.0,
+        notification_poll_interval: float = 30.0,
+        head_workers: int = 8,
+        fetch_workers: int = 16,
+    ):
+        """
+        Args:
+            s3_client: boto3 s3 client used to poll and fetch the results
+            response_handler: Parses a `get_object` response into the result
+            sqs_client: boto3 sqs client, required with `notification_queue_url`
+            notification_queue_url: SQS queue subscribed to the SNS success and
+                error topics of the endpoint
+            min_poll_interval: Delay between polls right after a result landed
+            max_poll_interval: The delay doubles up to this value while nothing lands
+            notification_poll_interval: S3 polling interval when notifications are consumed
+            head_workers: Number of threads checking the outstanding paths
+            fetch_workers: Number of threads fetching result objects
+        """
+        self.s3_client = s3_client
+        self.response_handler = response_handler
+        self.sqs_client = sqs_client
+        self.notification_queue_url = notification_queue_url
+        if notification_queue_url is not None:
+            assert sqs_client is not None, "sqs_client is required to consume notifications"
+        self.min_poll_interval = min_poll_interval
+        self.max_poll_interval = notification_poll_interval if notification_queue_url else max_poll_interval
+        # s3 path -> pending request, registered under both its output and failure path
+        self._pending: Dict[str, _PendingRequest] = {}
+        self._recent: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._head_pool = ThreadPoolExecutor(max_workers=head_workers, thread_name_prefix="async-inference-head")
+        self._fetch_pool = ThreadPoolExecutor(max_workers=fetch_workers, thread_name_prefix="async-inference-fetch")
+        self._poller: Optional[threading.Thread] = None
+        self._listener: Optional[threading.Thread] = None
+
+    @property
+    def pending_count(self) -> int:
+        with self._lock:
+            return len({id(request) for request in self._pending.values()})
+
+    def track(self, output_path: str, failure_path: Optional[str] = None, timeout: float = 15 * 60) -> Future:
+        request = _PendingRequest(output_path, failure_path, timeout)
+        with self._lock:
+            self._pending[output_path] = request
+            if failure_path is not None:
+                self._pending[failure_path] = request
+            self._ensure_threads()
+        return request.future
+
+    def _ensure_threads(self):
+        if self._poller is None or not self._poller.is_alive():
+            self._poller = threading.Thread(target=self._poll_loop, name="async-inference-poller", daemon=True)
+            self._poller.start()
+        if self.notification_queue_url is not None and (self._listener is None or not self._listener.is_alive()):
+            self._listener = threading.Thread(target=self._listen_loop, name="async-inference-listener", daemon=True)
+            self._listener.start()
+
+    def _pop(self, request: _PendingRequest) -> bool:
+        """Unregister the request, returns False if it was already resolved."""
+        with self._lock:
+            if self._pending.get(request.output_path) is not request:
+                return False
+            for path in (request.output_path, request.failure_path):
+                if path is not None:
+                    self._pending.pop(path, None)
+                    self._recent[path] = None
+            while len(self._recent) > MAX_RECENT_PATHS:
+                self._recent.popitem(last=False)
+            return True
+
+    def _resolve(self, s3_path: str):
+        """Fetch the object at `s3_path` and resolve the request registered under it."""
+        with self._lock:
+            request = self._pending.get(s3_path)
+        if request is None or not self._pop(request):
+            return
+        self._fetch_pool.submit(self._fetch, request, s3_path)
+
+    def _fetch(self, request: _PendingRequest, s3_path: str):
+        from .sagemaker_client import AsyncInferenceModelError
+        bucket, key = _split_s3_path(s3_path)
+        try:
+            result = self.response_handler(self.s3_client.get_object(Bucket=bucket, Key=key))
+        except Exception as e:
+            request.future.set_exception(e)
+            return
+        if s3_path == request.output_path:
+            request.future.set_result(result)
+        else:
+            request.future.set_exception(AsyncInferenceModelError(message=result))
+
+    def _fail(self, request: _PendingRequest, error: Exception):
+        if self._pop(request):
+            request.future.set_exception(error)
+
+    # s3 polling
+
+    def _exists(self, path: str) -> bool:
+        bucket, key = _split_s3_path(path)
+        try:
+            self.s3_client.head_object(Bucket=bucket, Key=key)
+        except ClientError as e:
+            if e.response["Error"]["Code"] not in ("404", "NoSuchKey", "NotFound"):
+                raise
+            return False
+        return True
+
+    def _existing_paths(self, paths: List[str]) -> List[str]:
+        """Return the paths that exist."""
+        # HEAD instead of listing the prefix, it also holds every earlier result of the endpoint
+        return [path for path, exists in zip(paths, self._head_pool.map(self._exists, paths)) if exists]
+
+    def _poll_loop(self):
+        from .sagemaker_client import PollingTimeoutError
+        interval = self.min_poll_interval
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._poller = None
+                    return
+                paths = list(self._pending)
+                requests = {id(request): request for request in self._pending.values()}.values()
+
+            now = time.monotonic()
+            for request in requests:
+                if request.deadline <= now:
+                    self._fail(request, PollingTimeoutError(
+                        message="Inference could still be running",
+                        output_path=request.output_path,
+                        seconds=request.timeout,
+                    ))
+            try:
+                existing = self._existing_paths(paths)
+            except Exception as e:
+                logger.warning(f"failed to poll async inference results: {e}")
+                existing = []
+            for path in existing:
+                self._resolve(path)
+
+            if existing:
+                interval = self.min_poll_interval
+            else:
+                interval = min(interval * 2, self.max_poll_interval)
+            time.sleep(interval)
+
+    # sns/sqs notifications
+
+    def _handle_notification(self, body: str) -> bool:
+        """Resolve the request of one notification, returns True if it was tracked by us."""
+        from .sagemaker_client import AsyncInferenceModelError
+        message = json.loads(body)
+        if "Message" in message and "TopicArn" in message:
+            # sns envelope, raw message delivery is disabled
+            message = json.loads(message["Message"])
+        response_parameters = message.get("responseParameters") or {}
+        output_location = response_parameters.get("outputLocation")
+        failure_location = response_parameters.get("failureLocation")
+        with self._lock:
+            request = self._pending.get(output_location) or self._pending.get(failure_location)
+            if request is None:
+                return output_location in self._recent or failure_location in self._recent
+        if message.get("invocationStatus") == "Completed" and output_location:
+            self._resolve(request.output_path)
+        elif failure_location and failure_location in self._pending:
+            self._resolve(failure_location)
+        else:
+            self._fail(request, AsyncInferenceModelError(message=message.get("failureReason", message)))
+        return True
+
+    def _listen_loop(self):
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._listener = None
+                    return
+            try:
+                response = self.sqs_client.receive_message(
+                    QueueUrl=self.notification_queue_url,
+                    MaxNumberOfMessages=10,
+                    WaitTimeSeconds=20,
+                )
+            except Exception as e:
+                logger.warning(f"failed to receive async inference notifications: {e}")
+                time.sleep(self.max_poll_interval)
+                continue
+            handled = []
+            for sqs_message in response.get("Messages", []):
+                try:
+                    if self._handle_notification(sqs_message["Body"]):
+                        handled.append(sqs_message)
+                except ValueError:
+                    logger.warning(f"skip invalid async inference notification: {sqs_message['Body'][:200]}")
+            # messages of other consumers become visible again after the visibility timeout
+            if handled:
+                self.sqs_client.delete_message_batch(
+                    QueueUrl=self.notification_queue_url,
+                    Entries=[
+                        {"Id": str(i), "ReceiptHandle": sqs_message["ReceiptHandle"]}
+                        for i, sqs_message in enumerate(handled)
+                    ]
+                )
@@ -1,6 +1,17 @@
-from pydantic import BaseModel,Field
-from typing import Optional
+from pydantic import BaseModel,Field,PrivateAttr
+from typing import Optional,Any,AsyncIterator,Callable
 import os
+import random
+import asyncio
+from emd.utils.logger_utils import get_logger
+
+logger = get_logger(__name__)
+
+RETRYABLE_STATUS_CODES = (429, 502, 503, 504)
+
+# strong references of the tasks closing stale http clients until they are done
+_closing_tasks = set()
+
 
 class ClientBase(BaseModel):
     model_id: Optional[str] = None
@@ -12,6 +23,24 @@ class ClientBase(BaseModel):
     model_stack_name: Optional[str] = None
     """The name of the model stack deployed by emd."""
 
+    max_concurrency: int = 64
+    """Max number of in-flight requests of `ainvoke`/`astream`, also the size of the connection pool."""
+
+    max_retries: int = 5
+    """Max number of retries of `ainvoke`/`astream` on throttling."""
+
+    retry_base_delay: float = 0.5
+    """Base delay in seconds of the jittered exponential backoff."""
+
+    retry_max_delay: float = 20
+    """Max delay in seconds between two retries."""
+
+    timeout: float = 600
+    """Timeout in seconds of `ainvoke`/`astream` requests."""
+
+    # event loop -> (httpx.AsyncClient, asyncio.Semaphore), both are bound to a loop
+    _async_resources: Any = PrivateAttr(default=None)
+
     class Config:
         """Configuration for this pydantic object."""
         extra = "allow"
@@ -23,3 +52,99 @@ class ClientBase(BaseModel):
 
     def invoke_async(self, pyload:dict):
         raise NotADirectoryError
+
+    async def ainvoke(self, pyload:dict):
+        """asyncio version of `invoke`, streaming requests return the async iterator of `astream`."""
+        raise NotImplementedError
+
+    def astream(self, pyload:dict) -> AsyncIterator[dict]:
+        raise NotImplementedError
+
+    def _get_async_resources(self):
+        loop = asyncio.get_running_loop()
+        if self._async_resources is None or self._async_resources[0] is not loop:
+            try:
+                import httpx
+            except ImportError:
+                raise ImportError(
+                    "Could not import httpx python package. "
+                    "Please install it with `pip install httpx`."
+                )
+            if self._async_resources is not None:
+                self._close_stale_http_client(*self._async_resources[:2])
+            http_client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency
+                )
+            )
+            self._async_resources = (loop, http_client, asyncio.Semaphore(self.max_concurrency))
+        return self._async_resources[1:]
+
+    @staticmethod
+    def _close_stale_http_client(stale_loop, http_client):
+        """Close the http client created for a previous event loop, its connections are bound to that loop."""
+        if stale_loop.is_running():
+            asyncio.run_coroutine_threadsafe(http_client.aclose(), stale_loop)
+            return
+
+        async def aclose():
+            try:
+                await http_client.aclose()
+            except RuntimeError:
+                # the connections can not be shut down without their closed loop,
+                # they are already dropped from the pool and their sockets released
+                pass
+        task = asyncio.get_running_loop().create_task(aclose())
+        _closing_tasks.add(task)
+        task.add_done_callback(_closing_tasks.discard)
+
+    @property
+    def async_http_client(self):
+        return self._get_async_resources()[0]
+
+    @property
+    def async_semaphore(self) -> asyncio.Semaphore:
+        return self._get_async_resources()[1]
+
+    async def aclose(self):
+        if self._async_resources is not None:
+            await self._async_resources[1].aclose()
+            self._async_resources = None
+
+    def _is_retryable(self, response) -> bool:
+        return response.status_code in RETRYABLE_STATUS_CODES
+
+    def _get_retry_delay(self, attempt: int, response=None) -> float:
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                # jitter, so clients told the same Retry-After do not come back together
+                return min(float(retry_after) + random.uniform(0, self.retry_base_delay), self.retry_max_delay)
+            except ValueError:
+                pass
+        # full jitter, spreads the retries of concurrent requests
+        return random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+
+    async def _asend_with_retry(self, build_request: Callable[[], Any], stream: bool = False):
+        """
+        Send the request built by `build_request` (called again for every
+        attempt, e.g. to refresh a signature), retrying throttled requests.
+        Raises RuntimeError for other error responses.
+        """
+        http_client = self.async_http_client
+        attempt = 0
+        while True:
+            response = await http_client.send(build_request(), stream=stream)
+            if response.status_code < 400:
+                return response
+            if stream:
+                await response.aread()
+                await response.aclose()
+            if attempt >= self.max_retries or not self._is_retryable(response):
+                raise RuntimeError(f"Error {response.status_code}, {response.text}")
+            delay = self._get_retry_delay(attempt, response)
+            logger.warning(f"request throttled with status {response.status_code}, retry in {delay:.2f}s")
+            attempt += 1
+            await asyncio.sleep(delay)
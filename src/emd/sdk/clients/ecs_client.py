@@ -19,65 +19,13 @@ from emd.models import Model
 from emd.constants import MODEL_DEFAULT_TAG
 from emd.utils.logger_utils import get_logger
 from emd.utils.framework_utils import get_model_specific_path
+from .stream_utils import iter_stream_chunks, aiter_stream_chunks
 import requests
 
 
 logger = get_logger(__name__)
 
 
-class LineIterator:
-    """
-    A helper class for parsing the byte stream input.
-
-    The output of the model will be in the following format:
-
-    b'{"outputs": [" a"]}\n'
-    b'{"outputs": [" challenging"]}\n'
-    b'{"outputs": [" problem"]}\n'
-    ...
-
-
-    This class accounts for this by concatenating bytes written via the 'write' function
-    and then exposing a method which will return lines (ending with a '\n' character)
-    within the buffer via the 'scan_lines' function.
-    It maintains the position of the last read position to ensure
-    that previous bytes are not exposed again.
-
-    For more details see:
-    https://aws.amazon.com/blogs/machine-learning/elevating-the-generative-ai-experience-introducing-streaming-support-in-amazon-sagemaker-hosting/
-    """
-
-    def __init__(self, stream: Any) -> None:
-        self.byte_iterator = iter(stream)
-        self.buffer = io.BytesIO()
-        self.read_pos = 0
-
-    def __iter__(self) -> "LineIterator":
-        return self
-
-    def __next__(self) -> Any:
-        while True:
-            self.buffer.seek(self.read_pos)
-            line = self.buffer.readline()
-            if line and line[-1] == ord("\n"):
-                self.read_pos += len(line)
-                return line[:-1]
-            try:
-                chunk = next(self.byte_iterator)
-                # print('chunk: ',chunk)
-            except StopIteration:
-                if self.read_pos < self.buffer.getbuffer().nbytes:
-                    # print('continue condition',self.read_pos,self.buffer.getbuffer().nbytes)
-                    continue
-                raise
-            # if "PayloadPart" not in chunk:
-            #     # Unknown Event Type
-            #     continue
-            self.buffer.seek(0, io.SEEK_END)
-            self.buffer.write(chunk)#["PayloadPart"]["Bytes"])
-
-
-
 class ECSClient(ClientBase):
     base_url:str = ""
 
@@ -124,23 +72,39 @@ class ECSClient(ClientBase):
             )
             if response.status_code != 200:
                 raise RuntimeError(f"Error {response.status_code}, {response.text}")
-            def _ret_iterator_helper():
-                interator = LineIterator(response)
-                for line in interator:
-                    try:
-                        decoded_line = line.decode('utf-8').strip()
-                        if decoded_line.startswith('data: '):
-                            json_data = decoded_line[len('data: '):]
-                            chunk_dict = json.loads(json_data)
-                            if not chunk_dict:
-                                continue
-                            yield chunk_dict
-                    except Exception as e:
-                        print(e)
-
-            return _ret_iterator_helper()
+            return iter_stream_chunks(response)
         else:
             return requests.post(
                 url,
                 json=pyload
             ).json()
+
+    def _build_async_request(self, pyload:dict):
+        return self.async_http_client.build_request(
+            "POST",
+            f"{self.base_url}/invocations",
+            json=pyload
+        )
+
+    async def ainvoke(self, pyload:dict):
+        if pyload.get('stream', False):
+            return self.astream(pyload)
+        async with self.async_semaphore:
+            response = await self._asend_with_retry(
+                lambda: self._build_async_request(pyload)
+            )
+        return response.json()
+
+    async def astream(self, pyload:dict):
+        pyload = {**pyload, "stream": True}
+        # the slot is held until the stream is consumed
+        async with self.async_semaphore:
+            response = await self._asend_with_retry(
+                lambda: self._build_async_request(pyload),
+                stream=True
+            )
+            try:
+                async for chunk in aiter_stream_chunks(response):
+                    yield chunk
+            finally:
+                await response.aclose()
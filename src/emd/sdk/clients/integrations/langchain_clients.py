@@ -5,11 +5,13 @@ from typing import (
     Callable,
     Dict,
     Iterator,
+    AsyncIterator,
     List,
     Literal,
     Mapping,
     Optional,
     Sequence,
+    Tuple,
     Type
 )
 
@@ -19,6 +21,7 @@ import json
 from operator import itemgetter
 import asyncio
 from copy import deepcopy
+from concurrent.futures import ThreadPoolExecutor
 
 from langchain_core.callbacks import (
     AsyncCallbackManagerForLLMRun,
@@ -337,6 +340,25 @@ class SageMakerVllmChatModelBase(SageMakerVllmModelBase,BaseChatModel):
         input_body = self.prepare_input_body(_model_kwargs,messages)
         input_body['stream'] = False
         response_dict = self.sagemaker_client.invoke(input_body)
+        return self._create_chat_result(response_dict)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        """Native asyncio version of `_generate`, no executor thread is used."""
+        _model_kwargs = self.model_kwargs or {}
+        _model_kwargs = {**_model_kwargs, **kwargs}
+
+        input_body = self.prepare_input_body(_model_kwargs,messages)
+        input_body['stream'] = False
+        response_dict = await self.sagemaker_client.ainvoke(input_body)
+        return self._create_chat_result(response_dict)
+
+    def _create_chat_result(self, response_dict: dict) -> ChatResult:
         generations = []
         generation_info = None
         token_usage = response_dict.get("usage")
@@ -377,30 +399,54 @@ class SageMakerVllmChatModelBase(SageMakerVllmModelBase,BaseChatModel):
         iterator = self.sagemaker_client.invoke(input_body)
 
         for chunk_dict in iterator:
-            if not chunk_dict:
-                continue
-            if len(chunk_dict["choices"]) == 0:
-                continue
-            choice = chunk_dict["choices"][0]
-            if choice["delta"] is None:
+            cg_chunk = self._convert_chunk(chunk_dict)
+            if cg_chunk is None:
                 continue
-
-            default_chunk_class = AIMessageChunk
-            chunk = _convert_delta_to_message_chunk(
-                choice["delta"], default_chunk_class
-            )
-            finish_reason = choice.get("finish_reason")
-            generation_info = (
-                dict(finish_reason=finish_reason) if finish_reason is not None else None
-            )
-            default_chunk_class = chunk.__class__
-            cg_chunk = ChatGenerationChunk(
-                message=chunk, generation_info=generation_info
-            )
             if run_manager:
                 run_manager.on_llm_new_token(cg_chunk.text, chunk=cg_chunk)
             yield cg_chunk
 
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        """Native asyncio version of `_stream`."""
+        _model_kwargs = self.model_kwargs or {}
+        _model_kwargs = {**_model_kwargs, **kwargs}
+        input_body = self.prepare_input_body(_model_kwargs,messages)
+        input_body['stream'] = True
+
+        async for chunk_dict in self.sagemaker_client.astream(input_body):
+            cg_chunk = self._convert_chunk(chunk_dict)
+            if cg_chunk is None:
+                continue
+            if run_manager:
+                await run_manager.on_llm_new_token(cg_chunk.text, chunk=cg_chunk)
+            yield cg_chunk
+
+    def _convert_chunk(self, chunk_dict: dict) -> Optional[ChatGenerationChunk]:
+        if not chunk_dict:
+            return None
+        if len(chunk_dict["choices"]) == 0:
+            return None
+        choice = chunk_dict["choices"][0]
+        if choice["delta"] is None:
+            return None
+
+        chunk = _convert_delta_to_message_chunk(
+            choice["delta"], AIMessageChunk
+        )
+        finish_reason = choice.get("finish_reason")
+        generation_info = (
+            dict(finish_reason=finish_reason) if finish_reason is not None else None
+        )
+        return ChatGenerationChunk(
+            message=chunk, generation_info=generation_info
+        )
+
 
     @property
     def _llm_type(self) -> str:
@@ -570,52 +616,107 @@ class SageMakerVllmChatModel(SageMakerVllmChatModelBase):
 
 class SageMakerVllmEmbeddings(SageMakerVllmModelBase,Embeddings):
     normalize: bool = False
-
-    def _embedding_func(self, text: str) -> List[float]:
+    """Normalize the embeddings to unit vectors, vectorized with numpy."""
+
+    batch_size: int = 32
+    """Max number of texts sent in one request."""
+
+    max_batch_tokens: int = 8192
+    """Max estimated number of tokens sent in one request."""
+
+    max_concurrent_batches: int = 8
+    """Max number of requests in flight in `embed_documents`/`aembed_documents`."""
+
+    token_counter: Optional[Callable[[str], int]] = None
+    """Count the tokens of a text for `max_batch_tokens`, defaults to ~4 characters per token."""
+
+    def _count_tokens(self, text: str) -> int:
+        if self.token_counter is not None:
+            return self.token_counter(text)
+        return len(text) // 4 + 1
+
+    def _split_into_batches(self, texts: List[str]) -> List[List[str]]:
+        """Split texts into consecutive batches bounded by `batch_size` and `max_batch_tokens`."""
+        batches = []
+        batch = []
+        batch_tokens = 0
+        for text in texts:
+            num_tokens = self._count_tokens(text)
+            if batch and (len(batch) >= self.batch_size or batch_tokens + num_tokens > self.max_batch_tokens):
+                batches.append(batch)
+                batch = []
+                batch_tokens = 0
+            batch.append(text)
+            batch_tokens += num_tokens
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _parse_embeddings(self, response_dict: dict, num_texts: int) -> List[List[float]]:
+        data = sorted(response_dict['data'], key=lambda item: item.get('index', 0))
+        assert len(data) == num_texts, (len(data), num_texts)
+        return [item['embedding'] for item in data]
+
+    def _embedding_func(self, texts: List[str]) -> List[List[float]]:
         """Call out to SageMaker embedding endpoint."""
 
         input_body: Dict[str, Any] = {
-            "input": [text],
+            "input": texts,
         }
 
         try:
             response_dict = self.sagemaker_client.invoke(input_body)
-            return response_dict['data'][0]['embedding']
+            return self._parse_embeddings(response_dict, len(texts))
+
+        except Exception as e:
+            logger.error(f"Error raised by inference endpoint: {e}")
+            raise e
 
+    async def _aembedding_func(self, texts: List[str]) -> List[List[float]]:
+        try:
+            response_dict = await self.sagemaker_client.ainvoke({"input": texts})
+            return self._parse_embeddings(response_dict, len(texts))
         except Exception as e:
             logger.error(f"Error raised by inference endpoint: {e}")
             raise e
 
+    def _normalize_vectors(self, embeddings: List[List[float]]) -> List[List[float]]:
+        """Normalize the embeddings to unit vectors."""
+        import numpy as np
+        emb = np.asarray(embeddings, dtype=np.float64)
+        norm = np.linalg.norm(emb, axis=1, keepdims=True)
+        norm[norm == 0] = 1
+        return (emb / norm).tolist()
+
     def _normalize_vector(self, embeddings: List[float]) -> List[float]:
         """Normalize the embedding to a unit vector."""
-        import numpy as np
-        emb = np.array(embeddings)
-        norm_emb = emb / np.linalg.norm(emb)
-        return norm_emb.tolist()
+        return self._normalize_vectors([embeddings])[0]
 
+    def _post_process(self, embeddings: List[List[float]]) -> List[List[float]]:
+        if self.normalize and embeddings:
+            return self._normalize_vectors(embeddings)
+        return embeddings
 
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
         """Compute doc embeddings using a SageMaker model.
 
+        Texts are sent in batches, see `batch_size` and `max_batch_tokens`.
+
         Args:
             texts: The list of texts to embed
 
         Returns:
             List of embeddings, one for each text.
         """
-        tasks = [
-            {
-                'func':self.embed_query,
-                "args":[text]
-            }
-            for text in texts
-        ]
-        return asyncio.run(
-            self.run_tasks_in_executor(tasks)
-        )
+        batches = self._split_into_batches(texts)
+        if not batches:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrent_batches, len(batches))) as executor:
+            results = list(executor.map(self._embedding_func, batches))
+        return self._post_process([embedding for result in results for embedding in result])
 
     def embed_query(self, text: str) -> List[float]:
-        """Compute query embeddings using a Bedrock model.
+        """Compute query embeddings using a SageMaker model.
 
         Args:
             text: The text to embed.
@@ -623,15 +724,10 @@ class SageMakerVllmEmbeddings(SageMakerVllmModelBase,Embeddings):
         Returns:
             Embeddings for the text.
         """
-        embedding = self._embedding_func(text)
-
-        if self.normalize:
-            return self._normalize_vector(embedding)
-
-        return embedding
+        return self._post_process(self._embedding_func([text]))[0]
 
     async def aembed_query(self, text: str) -> List[float]:
-        """Asynchronous compute query embeddings using a Bedrock model.
+        """Asynchronous compute query embeddings using a SageMaker model.
 
         Args:
             text: The text to embed.
@@ -639,11 +735,10 @@ class SageMakerVllmEmbeddings(SageMakerVllmModelBase,Embeddings):
         Returns:
             Embeddings for the text.
         """
-
-        return await run_in_executor(None, self.embed_query, text)
+        return self._post_process(await self._aembedding_func([text]))[0]
 
     async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
-        """Asynchronous compute doc embeddings using a Bedrock model.
+        """Asynchronous compute doc embeddings using a SageMaker model.
 
         Args:
             texts: The list of texts to embed
@@ -651,15 +746,54 @@ class SageMakerVllmEmbeddings(SageMakerVllmModelBase,Embeddings):
         Returns:
             List of embeddings, one for each text.
         """
+        semaphore = asyncio.Semaphore(self.max_concurrent_batches)
 
-        result = await asyncio.gather(*[self.aembed_query(text) for text in texts])
+        async def _aembed_batch(batch: List[str]) -> List[List[float]]:
+            async with semaphore:
+                return await self._aembedding_func(batch)
 
-        return list(result)
+        results = await asyncio.gather(*[
+            _aembed_batch(batch) for batch in self._split_into_batches(texts)
+        ])
+        return self._post_process([embedding for result in results for embedding in result])
 
 
 class SageMakerVllmRerank(SageMakerVllmModelBase,BaseDocumentCompressor):
     top_n: Optional[int] = sys.maxsize
 
+    rerank_mode: Literal["rerank", "score"] = "score"
+    """`score` sends one text_1/text_2 request per document, `rerank` sends the query with a list of documents per request."""
+
+    max_documents_per_request: int = 256
+    """Max number of documents sent in one request in `rerank` mode."""
+
+    max_concurrent_requests: int = 8
+    """Max number of requests in flight."""
+
+    def _build_requests(self, documents: List[str], query: str) -> List[Tuple[int, dict]]:
+        """Return (offset of the first document, request body) pairs."""
+        if self.rerank_mode == "score":
+            return [
+                (i, {"encoding_format": "float", "text_1": query, "text_2": doc})
+                for i, doc in enumerate(documents)
+            ]
+        return [
+            (offset, {"query": query, "documents": documents[offset:offset + self.max_documents_per_request]})
+            for offset in range(0, len(documents), self.max_documents_per_request)
+        ]
+
+    def _parse_results(self, offset: int, response_dict: dict) -> List[Dict[str, Any]]:
+        if self.rerank_mode == "score":
+            return [{"index": offset, "relevance_score": response_dict["data"][0]["score"]}]
+        return [
+            {"index": offset + ret["index"], "relevance_score": ret["relevance_score"]}
+            for ret in response_dict["results"]
+        ]
+
+    def _sort_results(self, results: List[Dict[str, Any]], top_n: Optional[int]) -> List[Dict[str, Any]]:
+        top_n = self.top_n if top_n is None else top_n
+        return sorted(results, key=lambda ret: ret["relevance_score"], reverse=True)[:top_n]
+
     def rerank(
         self,
         documents: Sequence[Union[str, Document]],
@@ -685,28 +819,45 @@ class SageMakerVllmRerank(SageMakerVllmModelBase,BaseDocumentCompressor):
             else doc
             for doc in documents
         ]
-        tasks = [
-            {
-                "func":self.sagemaker_client.invoke,
-                "args":[{
-                    "encoding_format": "float",
-                    "text_1": query,
-                    "text_2": doc
-                }]
-            }
+        rerank_requests = self._build_requests(serialized_documents, query)
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrent_requests, len(rerank_requests))) as executor:
+            responses = list(executor.map(
+                lambda request: self.sagemaker_client.invoke(request[1]),
+                rerank_requests
+            ))
+        results = []
+        for (offset, _), response_dict in zip(rerank_requests, responses):
+            results.extend(self._parse_results(offset, response_dict))
+        return self._sort_results(results, top_n)
+
+    async def arerank(
+        self,
+        documents: Sequence[Union[str, Document]],
+        query: str,
+        top_n: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Asynchronous version of `rerank`."""
+        if len(documents) == 0:
+            return []
+
+        serialized_documents = [
+            doc.page_content
+            if isinstance(doc,Document)
+            else doc
             for doc in documents
         ]
-        rets = asyncio.run(self.run_tasks_in_executor(tasks))
-
-        rets = [
-            {
-                "index": i,
-                "relevance_score": ret["data"][0]["score"]
-            }
-            for i,ret in enumerate(rets)
-        ]
+        semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+
+        async def _ainvoke(offset: int, request: dict) -> List[Dict[str, Any]]:
+            async with semaphore:
+                response_dict = await self.sagemaker_client.ainvoke(request)
+            return self._parse_results(offset, response_dict)
 
-        return rets
+        rets = await asyncio.gather(*[
+            _ainvoke(offset, request)
+            for offset, request in self._build_requests(serialized_documents, query)
+        ])
+        return self._sort_results([ret for results in rets for ret in results], top_n)
 
     def compress_documents(
         self,
@@ -732,3 +883,18 @@ class SageMakerVllmRerank(SageMakerVllmModelBase,BaseDocumentCompressor):
             doc_copy.metadata["relevance_score"] = res["relevance_score"]
             compressed.append(doc_copy)
         return compressed
+
+    async def acompress_documents(
+        self,
+        documents: Sequence[Document],
+        query: str,
+        callbacks: Optional[Callbacks] = None,
+    ) -> Sequence[Document]:
+        """Asynchronous version of `compress_documents`."""
+        compressed = []
+        for res in await self.arerank(documents, query):
+            doc = documents[res["index"]]
+            doc_copy = Document(doc.page_content, metadata=deepcopy(doc.metadata))
+            doc_copy.metadata["relevance_score"] = res["relevance_score"]
+            compressed.append(doc_copy)
+        return compressed
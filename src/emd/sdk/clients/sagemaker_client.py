@@ -1,27 +1,34 @@
 import json
 import os
-from typing import Optional,Dict,Any,Union
+from typing import Optional,Dict,Any,Union,List,Iterator,Tuple
 import io
 from urllib.parse import urlparse
-from pydantic import model_validator
+from pydantic import model_validator,PrivateAttr
 import uuid
 import codecs
 import time
 from functools import reduce
+import asyncio
 import botocore
+import botocore.config
 import threading
-from botocore.exceptions import WaiterError
 from botocore.exceptions import ClientError
 
-from .client_base import ClientBase
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from .client_base import ClientBase, RETRYABLE_STATUS_CODES
 from emd.utils.aws_service_utils import check_stack_exists,get_model_stack_info
 from emd.models import Model
 from emd.constants import MODEL_DEFAULT_TAG
 from emd.utils.logger_utils import get_logger
+from .stream_utils import iter_stream_chunks, aiter_stream_chunks
+from .async_inference_tracker import AsyncInferenceTracker
 # from sagemaker.async_inference
 
 logger = get_logger(__name__)
 
+_async_tracker_lock = threading.Lock()
+
 
 class AsyncInferenceError(Exception):
     """The base exception class for Async Inference exceptions."""
@@ -70,65 +77,6 @@ class ObjectNotExistedError(AsyncInferenceError):
 
 
 
-class LineIterator:
-    """
-    A helper class for parsing the byte stream input.
-
-    The output of the model will be in the following format:
-
-    b'{"outputs": [" a"]}\n'
-    b'{"outputs": [" challenging"]}\n'
-    b'{"outputs": [" problem"]}\n'
-    ...
-
-    While usually each PayloadPart event from the event stream will
-    contain a byte array with a full json, this is not guaranteed
-    and some of the json objects may be split acrossPayloadPart events.
-
-    For example:
-
-    {'PayloadPart': {'Bytes': b'{"outputs": '}}
-    {'PayloadPart': {'Bytes': b'[" problem"]}\n'}}
-
-
-    This class accounts for this by concatenating bytes written via the 'write' function
-    and then exposing a method which will return lines (ending with a '\n' character)
-    within the buffer via the 'scan_lines' function.
-    It maintains the position of the last read position to ensure
-    that previous bytes are not exposed again.
-
-    For more details see:
-    https://aws.amazon.com/blogs/machine-learning/elevating-the-generative-ai-experience-introducing-streaming-support-in-amazon-sagemaker-hosting/
-    """
-
-    def __init__(self, stream: Any) -> None:
-        self.byte_iterator = iter(stream)
-        self.buffer = io.BytesIO()
-        self.read_pos = 0
-
-    def __iter__(self) -> "LineIterator":
-        return self
-
-    def __next__(self) -> Any:
-        while True:
-            self.buffer.seek(self.read_pos)
-            line = self.buffer.readline()
-            if line and line[-1] == ord("\n"):
-                self.read_pos += len(line)
-                return line[:-1]
-            try:
-                chunk = next(self.byte_iterator)
-            except StopIteration:
-                if self.read_pos < self.buffer.getbuffer().nbytes:
-                    continue
-                raise
-            if "PayloadPart" not in chunk:
-                # Unknown Event Type
-                continue
-            self.buffer.seek(0, io.SEEK_END)
-            self.buffer.write(chunk["PayloadPart"]["Bytes"])
-
-
 class WaiterConfig(object):
     """Configuration object passed in when using async inference and wait for the result."""
 
@@ -190,6 +138,22 @@ class AsyncInferenceResponse(object):
         self.output_path = output_path
         self._result = None
         self.failure_path = failure_path
+        self._future = None
+
+    def future(self, timeout=15 * 60):
+        """Return a ``concurrent.futures.Future`` resolved as soon as the result lands.
+
+        The request is registered in the shared completion tracker of the client, so any
+        number of outstanding requests are checked by one poller.
+
+        Args:
+            timeout (float): Seconds until the future fails with ``PollingTimeoutError``.
+        """
+        if self._future is None:
+            self._future = self.predictor_async.get_async_tracker().track(
+                self.output_path, self.failure_path, timeout=timeout
+            )
+        return self._future
 
     def get_result(
         self,
@@ -270,6 +234,66 @@ class AsyncInferenceResponse(object):
             raise UnexpectedClientError(message=e.response["Error"]["Message"])
 
 
+def _copy_future_state(source: Future, destination: Future):
+    if source.cancelled():
+        destination.cancel()
+    elif source.exception() is not None:
+        destination.set_exception(source.exception())
+    else:
+        destination.set_result(source.result())
+
+
+class AsyncInferenceBatch(object):
+    """Futures of the requests submitted by ``SageMakerClient.invoke_async_many``.
+
+    Index it or iterate it to get the future of each payload in submission order, use
+    ``as_completed`` to handle the results as they land, or ``await`` it from asyncio
+    code to get all results.
+    """
+
+    def __init__(self, futures: List[Future]):
+        self.futures = futures
+
+    def __len__(self):
+        return len(self.futures)
+
+    def __getitem__(self, index) -> Future:
+        return self.futures[index]
+
+    def __iter__(self) -> Iterator[Future]:
+        return iter(self.futures)
+
+    def as_completed(self, timeout=None) -> Iterator[Tuple[int, Future]]:
+        """Yield ``(index, future)`` pairs as the requests complete."""
+        indexes = {id(future): index for index, future in enumerate(self.futures)}
+        for future in as_completed(self.futures, timeout=timeout):
+            yield indexes[id(future)], future
+
+    def results(self, timeout=None, return_exceptions=False) -> List[Any]:
+        """Wait for all requests and return their results in submission order.
+
+        Args:
+            timeout (float): Seconds to wait for all requests.
+            return_exceptions (bool): Return the exception of a failed request in place of
+                its result instead of raising it.
+        """
+        results = []
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for future in self.futures:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                results.append(future.result(timeout=remaining))
+            except FutureTimeoutError:
+                raise
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                results.append(e)
+        return results
+
+    def __await__(self):
+        return asyncio.gather(*[asyncio.wrap_future(future) for future in self.futures]).__await__()
+
 
 def parse_s3_url(url):
     """Returns an (s3 bucket, key name/prefix) tuple from a url with an s3 scheme.
@@ -487,6 +511,21 @@ class SageMakerClient(ClientBase):
     s3_client: Any = None
     """Boto3 client for s3"""
 
+    notification_queue_url: Union[str,None] = None
+    """SQS queue subscribed to the SNS success and error topics of an async endpoint.
+    If set, async results are resolved by their notifications and S3 is only polled as a fallback."""
+
+    async_min_poll_interval: float = 0.2
+    """Delay in seconds between polls of async results right after a result landed."""
+
+    async_max_poll_interval: float = 5.0
+    """Max delay in seconds between polls of async results."""
+
+    _credentials: Any = PrivateAttr(default=None)
+    _async_tracker: Any = PrivateAttr(default=None)
+    # max_pool_connections -> s3 client
+    _upload_s3_clients: Dict[int, Any] = PrivateAttr(default_factory=dict)
+
     @model_validator(mode='before')
     def validate_environment(cls, values: Dict) -> Dict:
         """Dont do anything if client provided externally"""
@@ -587,19 +626,93 @@ class SageMakerClient(ClientBase):
             resp = self.client.invoke_endpoint_with_response_stream(
                 **request_options
             )
-            def _ret_iterator_helper():
-                iterator = LineIterator(resp["Body"])
-                for line in iterator:
-                    chunk_dict = json.loads(line)
-                    if not chunk_dict:
-                        continue
-                    yield chunk_dict
-            return _ret_iterator_helper()
+            return iter_stream_chunks(resp["Body"])
         else:
             output = self.client.invoke_endpoint(**request_options)['Body']
             response_dict = json.loads(output.read().decode("utf-8"))
             return response_dict
 
+    def _get_credentials(self):
+        if self._credentials is None:
+            import boto3
+            self._credentials = (self.boto_session or boto3.Session()).get_credentials()
+        return self._credentials
+
+    def _build_async_request(self, pyload:dict, stream:bool):
+        """Build the signed http request of invoke_endpoint(_with_response_stream), sent by httpx."""
+        from urllib.parse import quote
+        from botocore.auth import SigV4Auth
+        from botocore.awsrequest import AWSRequest
+
+        request_options = self._prepare_input_body(pyload)
+        operation_name = "InvokeEndpointWithResponseStream" if stream else "InvokeEndpoint"
+        operation_model = self.client.meta.service_model.operation_model(operation_name)
+        body = request_options.pop("Body").encode("utf-8")
+        url = "{}{}".format(
+            self.client.meta.endpoint_url,
+            operation_model.http["requestUri"].format(
+                EndpointName=quote(request_options.pop("EndpointName"), safe="")
+            )
+        )
+        headers = {}
+        # map parameters like CustomAttributes to their http headers as boto3 does
+        for name, value in request_options.items():
+            shape = operation_model.input_shape.members.get(name)
+            if shape is None or shape.serialization.get("location") != "header":
+                raise ValueError(f"{name} is not supported by {operation_name}")
+            headers[shape.serialization["name"]] = str(value)
+
+        def build_request():
+            # sign for every attempt, the signature includes the request time
+            aws_request = AWSRequest(method="POST", url=url, data=body, headers=headers)
+            SigV4Auth(
+                self._get_credentials(),
+                self.client.meta.service_model.signing_name,
+                self.client.meta.region_name
+            ).add_auth(aws_request)
+            return self.async_http_client.build_request(
+                "POST",
+                url,
+                content=body,
+                headers=dict(aws_request.headers.items())
+            )
+        return build_request
+
+    def _is_retryable(self, response) -> bool:
+        error_type = response.headers.get("x-amzn-errortype", "")
+        return super()._is_retryable(response) or error_type.startswith("ThrottlingException")
+
+    async def _aiter_payload_parts(self, response):
+        from botocore.eventstream import EventStreamBuffer
+
+        event_stream_buffer = EventStreamBuffer()
+        async for data in response.aiter_bytes():
+            event_stream_buffer.add_data(data)
+            for message in event_stream_buffer:
+                if message.headers.get(":message-type") != "event":
+                    error_type = message.headers.get(":exception-type") or message.headers.get(":error-code")
+                    raise RuntimeError(f"{error_type}: {message.payload.decode('utf-8', errors='replace')}")
+                if message.headers.get(":event-type") == "PayloadPart":
+                    yield message.payload
+
+    async def ainvoke(self, pyload:dict):
+        if pyload.get('stream', False):
+            return self.astream(pyload)
+        build_request = self._build_async_request(pyload, stream=False)
+        async with self.async_semaphore:
+            response = await self._asend_with_retry(build_request)
+        return response.json()
+
+    async def astream(self, pyload:dict):
+        build_request = self._build_async_request({**pyload, "stream": True}, stream=True)
+        # the slot is held until the stream is consumed
+        async with self.async_semaphore:
+            response = await self._asend_with_retry(build_request, stream=True)
+            try:
+                async for chunk in aiter_stream_chunks(self._aiter_payload_parts(response)):
+                    yield chunk
+            finally:
+                await response.aclose()
 
     def account_id(self) -> str:
         """Get the AWS account id of the caller.
@@ -772,6 +885,7 @@ class SageMakerClient(ClientBase):
         self,
         data,
         input_path=None,
+        s3_client=None,
     ):
         """Upload request data to Amazon S3 for users"""
         if input_path:
@@ -789,7 +903,7 @@ class SageMakerClient(ClientBase):
 
         _model_kwargs = self.model_kwargs or {}
         data = json.dumps({**_model_kwargs,**data},ensure_ascii=False,indent=2)
-        self.s3_client.put_object(
+        (s3_client or self.s3_client).put_object(
             Body=data, Bucket=bucket, Key=key, ContentType="application/json"
         )
         input_path = input_path or "s3://{}/{}".format(bucket, key)
@@ -804,126 +918,60 @@ class SageMakerClient(ClientBase):
         finally:
             response_body.close()
 
-    def _check_output_and_failure_paths(self, output_path, failure_path, waiter_config):
-        """Check the Amazon S3 output path for the output.
-
-        This method waits for either the output file or the failure file to be found on the
-        specified S3 output path. Whichever file is found first, its corresponding event is
-        triggered, and the method executes the appropriate action based on the event.
-
-        Args:
-            output_path (str): The S3 path where the output file is expected to be found.
-            failure_path (str): The S3 path where the failure file is expected to be found.
-            waiter_config (boto3.waiter.WaiterConfig): The configuration for the S3 waiter.
-
-        Returns:
-            Any: The deserialized result from the output file, if the output file is found first.
-            Otherwise, raises an exception.
-
-        Raises:
-            AsyncInferenceModelError: If the failure file is found before the output file.
-            PollingTimeoutError: If both files are not found and the S3 waiter
-             has thrown a WaiterError.
-        """
-        output_bucket, output_key = parse_s3_url(output_path)
-        failure_bucket, failure_key = parse_s3_url(failure_path)
-
-        output_file_found = threading.Event()
-        failure_file_found = threading.Event()
-
-        def check_output_file():
-            try:
-                output_file_waiter = self.s3_client.get_waiter("object_exists")
-                output_file_waiter.wait(
-                    Bucket=output_bucket,
-                    Key=output_key,
-                    WaiterConfig=waiter_config._to_request_dict(),
-                )
-                output_file_found.set()
-            except WaiterError:
-                pass
-
-        def check_failure_file():
-            try:
-                failure_file_waiter = self.s3_client.get_waiter("object_exists")
-                failure_file_waiter.wait(
-                    Bucket=failure_bucket,
-                    Key=failure_key,
-                    WaiterConfig=waiter_config._to_request_dict(),
-                )
-                failure_file_found.set()
-            except WaiterError:
-                pass
-
-
-        output_thread = threading.Thread(target=check_output_file)
-        failure_thread = threading.Thread(target=check_failure_file)
-
-        output_thread.start()
-        failure_thread.start()
-
-        while not output_file_found.is_set() and not failure_file_found.is_set():
-            time.sleep(1)
-
-        if output_file_found.is_set():
-            s3_object = self.s3_client.get_object(Bucket=output_bucket, Key=output_key)
-            result = self._handle_response(response=s3_object)
-            return result
-
-        failure_object = self.s3_client.get_object(Bucket=failure_bucket, Key=failure_key)
-        failure_response = self._handle_response(response=failure_object)
+    def get_async_tracker(self) -> AsyncInferenceTracker:
+        """The tracker resolving the outstanding async inference requests of this client."""
+        if self._async_tracker is None:
+            with _async_tracker_lock:
+                if self._async_tracker is None:
+                    sqs_client = None
+                    if self.notification_queue_url is not None:
+                        sqs_client = self.boto_session.client("sqs", region_name=self.region_name)
+                    self._async_tracker = AsyncInferenceTracker(
+                        self.s3_client,
+                        response_handler=self._handle_response,
+                        sqs_client=sqs_client,
+                        notification_queue_url=self.notification_queue_url,
+                        min_poll_interval=self.async_min_poll_interval,
+                        max_poll_interval=self.async_max_poll_interval,
+                    )
+        return self._async_tracker
 
-        raise (
-            AsyncInferenceModelError(message=failure_response)
-            if failure_file_found.is_set()
-            else PollingTimeoutError(
-                message="Inference could still be running",
-                output_path=output_path,
-                seconds=waiter_config.delay * waiter_config.max_attempts,
-            )
+    def _wait_for_output(self, output_path, failure_path, waiter_config):
+        """Wait for the result in the output path, or the error in the failure path."""
+        future = self.get_async_tracker().track(
+            output_path,
+            failure_path,
+            timeout=waiter_config.delay * waiter_config.max_attempts
         )
-
-    def _check_output_path(self, output_path, waiter_config):
-        """Check the Amazon S3 output path for the output.
-
-        Periodically check Amazon S3 output path for async inference result.
-        Timeout automatically after max attempts reached
-        """
-        bucket, key = parse_s3_url(output_path)
-        s3_waiter = self.s3_client.get_waiter("object_exists")
-        try:
-            s3_waiter.wait(Bucket=bucket, Key=key, WaiterConfig=waiter_config._to_request_dict())
-        except WaiterError:
-            raise PollingTimeoutError(
-                message="Inference could still be running",
-                output_path=output_path,
-                seconds=waiter_config.delay * waiter_config.max_attempts,
+        return future.result()
+
+    def _get_upload_s3_client(self, max_concurrency: int):
+        """S3 client with a connection pool sized for `max_concurrency` concurrent uploads of `invoke_async_many`."""
+        if self.boto_session is None:
+            # clients provided externally
+            return self.s3_client
+        if max_concurrency not in self._upload_s3_clients:
+            self._upload_s3_clients[max_concurrency] = self.boto_session.client(
+                "s3",
+                region_name=self.region_name,
+                config=botocore.config.Config(max_pool_connections=max_concurrency)
             )
-        s3_object = self.s3_client.get_object(Bucket=bucket, Key=key)
-        result = self._handle_response(response=s3_object)
-        return result
+        return self._upload_s3_clients[max_concurrency]
 
-    def _wait_for_output(self, output_path, failure_path, waiter_config):
-        """Retrieve output based on the presense of failure_path."""
-        if failure_path is not None:
-            return self._check_output_and_failure_paths(output_path, failure_path, waiter_config)
+    def _is_throttling_error(self, error: ClientError) -> bool:
+        error_code = error.response.get("Error", {}).get("Code", "")
+        status_code = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+        return error_code in ("ThrottlingException", "ServiceUnavailable", "TooManyRequestsException") \
+            or status_code in RETRYABLE_STATUS_CODES
 
-        return self._check_output_path(output_path, waiter_config)
-
-    def invoke_async(
-            self,
-            data:dict=None,
-            input_path=None,
-            inference_id=None,
-            waiter_config=WaiterConfig(delay=0.1,max_attempts=15*60/0.1),
-            async_invoke=False
-        ):
+    def _submit_async(self, data=None, input_path=None, inference_id=None, s3_client=None, max_retries=0):
+        """Upload the payload and submit the request, returns the output and failure locations."""
         if data is None and input_path is None:
             raise ValueError(
                 "Please provide data or input_path Amazon S3 location to use async prediction"
             )
         if data is not None:
-            input_path = self._upload_data_to_s3(data, input_path)
+            input_path = self._upload_data_to_s3(data, input_path, s3_client=s3_client)
 
         request_options = {
             "InputLocation":input_path,
@@ -931,13 +979,33 @@ class SageMakerClient(ClientBase):
             "Accept":"*/*"
         }
         if inference_id:
-            request_options['InferenceId']
+            request_options['InferenceId'] = inference_id
 
-        response = self.client.invoke_endpoint_async(
-            **request_options
-        )
-        output_location = response["OutputLocation"]
-        failure_location = response.get("FailureLocation")
+        attempt = 0
+        while True:
+            try:
+                response = self.client.invoke_endpoint_async(
+                    **request_options
+                )
+                break
+            except ClientError as e:
+                if attempt >= max_retries or not self._is_throttling_error(e):
+                    raise
+                delay = self._get_retry_delay(attempt)
+                logger.warning(f"invoke_endpoint_async throttled, retry in {delay:.2f}s")
+                attempt += 1
+                time.sleep(delay)
+        return response["OutputLocation"], response.get("FailureLocation")
+
+    def invoke_async(
+            self,
+            data:dict=None,
+            input_path=None,
+            inference_id=None,
+            waiter_config=WaiterConfig(delay=0.1,max_attempts=15*60/0.1),
+            async_invoke=False
+        ):
+        output_location, failure_location = self._submit_async(data, input_path, inference_id)
         if async_invoke:
             response_async = AsyncInferenceResponse(
                 predictor_async=self,
@@ -950,3 +1018,53 @@ class SageMakerClient(ClientBase):
                 output_path=output_location, failure_path=failure_location, waiter_config=waiter_config
             )
         return result
+
+    def invoke_async_many(
+            self,
+            payloads,
+            max_concurrency:Optional[int]=None,
+            timeout:float=15*60
+        ) -> "AsyncInferenceBatch":
+        """Submit many async inference requests and return as soon as they are queued.
+
+        Payloads are uploaded to S3 and submitted on a pool of `max_concurrency` threads
+        (defaults to the `max_concurrency` of the client) sharing an S3 connection pool of
+        the same size, throttled submissions are retried up to `max_retries` times with
+        jittered backoff. The results are tracked by the shared completion tracker of the
+        client.
+
+        Args:
+            payloads: Iterable of request payloads (dict).
+            max_concurrency (int): Max number of concurrent uploads and submissions.
+            timeout (float): Seconds each request may take after its submission.
+
+        Returns:
+            AsyncInferenceBatch: One future per payload, in the order of `payloads`.
+        """
+        payloads = list(payloads)
+        max_concurrency = max_concurrency or self.max_concurrency
+        s3_client = self._get_upload_s3_client(max_concurrency)
+        if payloads and self.default_bucket is None:
+            # resolve (and maybe create) the bucket once, not in every upload thread
+            self.get_default_bucket()
+        tracker = self.get_async_tracker()
+        futures = [Future() for _ in payloads]
+
+        def submit(index):
+            future = futures[index]
+            try:
+                output_location, failure_location = self._submit_async(
+                    payloads[index], s3_client=s3_client, max_retries=self.max_retries
+                )
+                tracked = tracker.track(output_location, failure_location, timeout=timeout)
+            except Exception as e:
+                future.set_exception(e)
+                return
+            tracked.add_done_callback(lambda f: _copy_future_state(f, future))
+
+        executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="async-inference-submit")
+        for index in range(len(payloads)):
+            executor.submit(submit, index)
+        # worker threads exit once every payload is submitted
+        executor.shutdown(wait=False)
+        return AsyncInferenceBatch(futures)
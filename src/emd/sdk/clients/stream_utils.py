@@ -0,0 +1,157 @@
+import json
+from typing import Any, AsyncIterable, AsyncIterator, Iterator, List, Union
+
+from emd.utils.logger_utils import get_logger
+
+logger = get_logger(__name__)
+
+SSE_DATA_PREFIX = b"data:"
+SSE_DONE = b"[DONE]"
+
+
+class LineDecoder:
+    """
+    Incremental line splitter for byte streams.
+
+    Bytes are appended to a buffer and complete lines (without the trailing
+    newline) are returned. Consumed bytes are dropped from the buffer, so the
+    memory used is bounded by the longest line instead of the whole stream.
+    """
+    def __init__(self) -> None:
+        self.buffer = bytearray()
+
+    def feed(self, data: bytes) -> List[bytes]:
+        self.buffer += data
+        if b"\n" not in data:
+            return []
+        *lines, rest = self.buffer.split(b"\n")
+        self.buffer = rest
+        return [bytes(line[:-1] if line.endswith(b"\r") else line) for line in lines]
+
+    def flush(self) -> List[bytes]:
+        if not self.buffer:
+            return []
+        line = bytes(self.buffer).rstrip(b"\r")
+        self.buffer = bytearray()
+        return [line]
+
+
+def _event_bytes(event: Any) -> Union[bytes, None]:
+    # sagemaker event stream yields {"PayloadPart": {"Bytes": ...}}, http clients yield raw bytes
+    if isinstance(event, (bytes, bytearray)):
+        return event
+    if isinstance(event, dict):
+        if "PayloadPart" in event:
+            return event["PayloadPart"]["Bytes"]
+        # unknown event type
+        return None
+    return event
+
+
+class LineIterator:
+    """
+    Iterate the lines of a byte stream.
+
+    `stream` may be a `requests.Response` opened with `stream=True`, in which
+    case it is read with `iter_content`, a SageMaker response event stream, or
+    any iterable of bytes.
+    """
+    def __init__(self, stream: Any, chunk_size: Union[int, None] = None) -> None:
+        if hasattr(stream, "iter_content"):
+            # chunk_size=None yields data as soon as it arrives
+            stream = stream.iter_content(chunk_size=chunk_size)
+        self.byte_iterator = iter(stream)
+        self.decoder = LineDecoder()
+        self.lines: List[bytes] = []
+        self.line_pos = 0
+        self.finished = False
+
+    def __iter__(self) -> "LineIterator":
+        return self
+
+    def __next__(self) -> bytes:
+        while self.line_pos >= len(self.lines):
+            if self.finished:
+                raise StopIteration
+            try:
+                data = _event_bytes(next(self.byte_iterator))
+            except StopIteration:
+                self.finished = True
+                self.lines, self.line_pos = self.decoder.flush(), 0
+                continue
+            if data is not None:
+                self.lines, self.line_pos = self.decoder.feed(data), 0
+        line = self.lines[self.line_pos]
+        self.line_pos += 1
+        return line
+
+
+class AsyncLineIterator:
+    """
+    Async variant of `LineIterator`. `stream` is an async iterable of bytes,
+    e.g. `httpx.Response.aiter_bytes()`, or of SageMaker payload events.
+    """
+    def __init__(self, stream: AsyncIterable) -> None:
+        if hasattr(stream, "aiter_bytes"):
+            stream = stream.aiter_bytes()
+        self.byte_iterator = stream.__aiter__()
+        self.decoder = LineDecoder()
+        self.lines: List[bytes] = []
+        self.line_pos = 0
+        self.finished = False
+
+    def __aiter__(self) -> "AsyncLineIterator":
+        return self
+
+    async def __anext__(self) -> bytes:
+        while self.line_pos >= len(self.lines):
+            if self.finished:
+                raise StopAsyncIteration
+            try:
+                data = _event_bytes(await self.byte_iterator.__anext__())
+            except StopAsyncIteration:
+                self.finished = True
+                self.lines, self.line_pos = self.decoder.flush(), 0
+                continue
+            if data is not None:
+                self.lines, self.line_pos = self.decoder.feed(data), 0
+        line = self.lines[self.line_pos]
+        self.line_pos += 1
+        return line
+
+
+def parse_stream_line(line: bytes) -> Union[dict, None]:
+    """
+    Parse one line of an SSE (`data: {...}`) or NDJSON (`{...}`) stream.
+    Returns None for blank lines, comments, other SSE fields, `[DONE]` and empty payloads.
+    """
+    line = line.strip()
+    if not line or line.startswith(b":"):
+        return None
+    if line.startswith(SSE_DATA_PREFIX):
+        line = line[len(SSE_DATA_PREFIX):].lstrip()
+    elif not line.startswith((b"{", b"[")):
+        # event:, id:, retry: fields
+        return None
+    if line == SSE_DONE:
+        return None
+    try:
+        chunk = json.loads(line)
+    except ValueError:
+        logger.warning(f"skip invalid stream line: {line[:200]!r}")
+        return None
+    return chunk or None
+
+
+def iter_stream_chunks(stream: Any, chunk_size: Union[int, None] = None) -> Iterator[dict]:
+    for line in LineIterator(stream, chunk_size=chunk_size):
+        chunk = parse_stream_line(line)
+        if chunk is not None:
+            yield chunk
+
+
+async def aiter_stream_chunks(stream: AsyncIterable) -> AsyncIterator[dict]:
+    async for line in AsyncLineIterator(stream):
+        chunk = parse_stream_line(line)
+        if chunk is not None:
+            yield chunk
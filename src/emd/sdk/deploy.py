@@ -34,7 +34,11 @@ from emd.utils.upload_pipeline import ziped_pipeline
 from emd.utils.aws_service_utils import get_current_region
 
 from .bootstrap import create_env_stack, get_bucket_name
-from .status import get_pipeline_execution_status, get_pipeline_execution_status_with_retry
+from .status import (
+    get_pipeline_execution_status,
+    get_pipeline_execution_status_with_retry,
+    wait_for_pipeline_execution,
+)
 from emd.models.utils.constants import ServiceType
 
 from rich.console import Console
@@ -280,52 +284,16 @@ def deploy(
     is_succeeded = False
     if waiting_until_deploy_complete:
         logger.info(f"Monitoring deployment stack {model_stack_name}")
-        client = boto3.client("codepipeline", region_name=region)
-
-        while True:
-            try:
-                # Get robust status information
-                status_info = _get_robust_status_info(execution_id, region)
-
-                # Extract status information with safe defaults
-                status = status_info["status"]
-                status_code = status_info["status_code"]
-                is_succeeded = status_info["is_succeeded"]
-                stage_name = status_info.get("stage_name")
-                status_summary = status_info.get("status_summary")
-
-                # Build user-friendly log message (same format as original)
-                log_info = f"Waiting for deployment to complete: model {model_id} (tag: {model_tag}, service: {service_type}, instance: {InstanceType.convert_instance_type(instance_type,service_type)}). Current status: {status}"
-
-                # Add optional information if available
-                if stage_name:
-                    log_info += f"({stage_name})"
-                if status_summary:
-                    log_info += f", {status_summary}"
-
-
-                # Add duration
-                log_info += f". Duration: {int(time.time() - start_deploy_time)} seconds"
-
-                # Display status to user
-                logger.info(log_info)
-
-                # Check if deployment is complete
-                if status_code == 0:
-                    break
-
-                time.sleep(10)
 
-            except client.exceptions.PipelineExecutionNotFoundException:
-                logger.info("Waiting for pipeline execution to start...")
-                time.sleep(10)
-                continue
+        def log_status(event):
+            # Build user-friendly log message (same format as original)
+            log_info = f"Waiting for deployment to complete: model {model_id} (tag: {model_tag}, service: {service_type}, instance: {InstanceType.convert_instance_type(instance_type,service_type)}). Current status: {event['status']}"
+            log_info += f". Duration: {int(time.time() - start_deploy_time)} seconds"
+            logger.info(log_info)
 
-            except Exception as e:
-                # Robust error handling - continue monitoring with basic status
-                logger.info(f"waiting for model: {model_id} (tag: {model_tag}, service: {service_type}, instance: {InstanceType.convert_instance_type(instance_type,service_type)}) deployment pipeline execution to complete. Current status: InProgress, Duration time: {int(time.time() - start_deploy_time)}s")
-                time.sleep(10)
-                continue
+        # polled by the shared status poller instead of a loop of our own
+        if wait_for_pipeline_execution(execution_id, on_event=log_status) is None:
+            logger.warning(f"Timed out waiting for the deployment pipeline execution {execution_id} to complete")
 
         deploy_time = time.time() - start_deploy_time
         ret["model_deploy_elasped_time"] = deploy_time
@@ -56,6 +56,15 @@ class InvokerBase:
     def _invoke(self,pyload:dict):
         return InvokerBase.invoke(self,pyload)
 
+    def invoke_async_many(self, pyloads, **kwargs):
+        """Submit many requests to an async endpoint, see `SageMakerClient.invoke_async_many`."""
+        if self.service_type != ServiceType.SAGEMAKER_ASYNC:
+            raise ValueError(
+                f"Bulk async invocation requires service type {ServiceType.SAGEMAKER_ASYNC}, "
+                f"model stack {self.model_stack_name} is deployed with {self.service_type}"
+            )
+        return self.service_client.invoke_async_many(pyloads, **kwargs)
+
     def invoke(self,pyload:dict):
         if self.service_type == ServiceType.SAGEMAKER_ASYNC:
             return self.service_client.invoke_async(pyload)
@@ -1,6 +1,8 @@
 import boto3
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 import concurrent.futures
+import queue
+import threading
 import time
 from functools import lru_cache
 
@@ -25,6 +27,13 @@ PIPELINE_EXECUTION_RETRY_INITIAL_DELAY = 2.0  # seconds
 PIPELINE_EXECUTION_RETRY_MAX_DELAY = 30.0     # seconds
 PIPELINE_EXECUTION_RETRY_BACKOFF_FACTOR = 2.0
 
+# Watch mode polling configuration
+WATCH_MIN_INTERVAL = 5.0    # seconds, while a deployment is in progress
+WATCH_MAX_INTERVAL = 60.0   # seconds, when nothing is in progress
+WATCH_BACKOFF_FACTOR = 2.0
+IN_PROGRESS_EXECUTION_STATUS_LIST = ['InProgress', 'Stopping']
+WAIT_TIMEOUT = 6 * 3600.0   # seconds, default timeout of wait_for_pipeline_execution/wait_for_stack
+
 logger = get_logger(__name__)
 
 
@@ -518,6 +527,302 @@ def validate_parallel_execution_limit(
         raise StatusError(f"Failed to validate execution limit: {e}")
 
 
+class StatusPoller:
+    """
+    One poller shared by all watchers of the process.
+
+    The poller thread fetches the status of all models with `get_model_status`,
+    plus the stacks registered with `track_stack` (e.g. the env stack), diffs
+    it with the previous snapshot and publishes the changes to every
+    subscriber. It polls every `min_interval` seconds while a deployment is in
+    progress and backs off to `max_interval` when nothing changes, so any
+    number of watched deployments costs one set of API calls per interval.
+    The thread exits once the last subscriber is gone.
+    """
+    def __init__(
+        self,
+        min_interval: float = WATCH_MIN_INTERVAL,
+        max_interval: float = WATCH_MAX_INTERVAL,
+        backoff_factor: float = WATCH_BACKOFF_FACTOR
+    ):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff_factor = backoff_factor
+        self.snapshot: Optional[Dict[str, Dict]] = None
+        self._subscribers: List[queue.Queue] = []
+        # stack name -> number of trackers
+        self._tracked_stacks: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self) -> queue.Queue:
+        """
+        Returns a queue receiving lists of change events. The current snapshot
+        is delivered first, as `added` events.
+        """
+        subscriber = queue.Queue()
+        with self._lock:
+            if self.snapshot is not None:
+                subscriber.put(_diff_status_snapshots({}, self.snapshot))
+            self._subscribers.append(subscriber)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="emd-status-poller", daemon=True)
+                self._thread.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber: queue.Queue):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+            if not self._subscribers:
+                self._wakeup.set()
+
+    def poll_now(self):
+        """Skip the current wait, e.g. right after a deployment was started."""
+        self._wakeup.set()
+
+    def track_stack(self, stack_name: str):
+        """Also poll a stack that is not a model stack, it is published as `stack:<stack_name>`."""
+        with self._lock:
+            self._tracked_stacks[stack_name] = self._tracked_stacks.get(stack_name, 0) + 1
+
+    def untrack_stack(self, stack_name: str):
+        with self._lock:
+            count = self._tracked_stacks.get(stack_name, 0) - 1
+            if count > 0:
+                self._tracked_stacks[stack_name] = count
+            else:
+                self._tracked_stacks.pop(stack_name, None)
+
+    def _poll(self) -> Dict[str, Dict]:
+        with self._lock:
+            tracked_stacks = list(self._tracked_stacks)
+        try:
+            snapshot = _status_snapshot(get_model_status())
+        except Exception as e:
+            if not tracked_stacks:
+                raise
+            # e.g. no env stack yet while it is being created, keep the last known model entries
+            logger.debug(f"Failed to poll model status: {e}")
+            snapshot = {
+                key: entry for key, entry in (self.snapshot or {}).items()
+                if entry['model_id'] is not None
+            }
+        for stack_name in tracked_stacks:
+            snapshot.update(_tracked_stack_snapshot(stack_name))
+        return snapshot
+
+    def _run(self):
+        interval = self.min_interval
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    return
+            try:
+                snapshot = self._poll()
+            except Exception as e:
+                logger.warning(f"Failed to poll model status, retry in {self.max_interval}s: {e}")
+                interval = self.max_interval
+            else:
+                with self._lock:
+                    is_first_snapshot = self.snapshot is None
+                    events = _diff_status_snapshots(self.snapshot or {}, snapshot)
+                    self.snapshot = snapshot
+                    # the first snapshot is delivered even when empty, watchers wait for it
+                    if events or is_first_snapshot:
+                        for subscriber in self._subscribers:
+                            subscriber.put(events)
+                if events or any(entry["in_progress"] for entry in snapshot.values()):
+                    interval = self.min_interval
+                else:
+                    interval = min(interval * self.backoff_factor, self.max_interval)
+            self._wakeup.wait(interval)
+            self._wakeup.clear()
+
+
+_status_poller: Optional[StatusPoller] = None
+_status_poller_lock = threading.Lock()
+
+
+def get_status_poller() -> StatusPoller:
+    global _status_poller
+    with _status_poller_lock:
+        if _status_poller is None:
+            _status_poller = StatusPoller()
+        return _status_poller
+
+
+def watch_status(
+    model_id: Optional[str] = None,
+    model_tag: str = MODEL_DEFAULT_TAG,
+    timeout: Optional[float] = None,
+    until_complete: bool = False,
+    poller: Optional[StatusPoller] = None
+) -> Iterator[Dict]:
+    """
+    Watch the status of model deployments and yield only what changed.
+
+    The first events describe the current deployments (`added`), followed by
+    `changed` events when the status of a deployment changes and `removed`
+    events when a deployment disappears. All watchers of the process share one
+    poller, see `StatusPoller`.
+
+    Args:
+        model_id: Specific model ID to watch. If None, watches all models
+        model_tag: Model tag to filter by
+        timeout: Stop watching after this many seconds. If None, watch forever
+        until_complete: Stop once no watched deployment is in progress. With
+            `model_id`, only after a deployment of the model has appeared
+        poller: Poller to subscribe to, defaults to the shared one
+
+    Yields:
+        Dict with 'event' ('added', 'changed' or 'removed'), 'key', 'model_id',
+        'model_tag', 'source' ('pipeline' or 'stack'), 'status',
+        'previous_status', 'in_progress' and 'time'
+    """
+    poller = poller or get_status_poller()
+    subscriber = poller.subscribe()
+    deadline = None if timeout is None else time.time() + timeout
+    watched: Dict[str, bool] = {}
+    seen = False
+    try:
+        while True:
+            wait_time = None if deadline is None else deadline - time.time()
+            if wait_time is not None and wait_time <= 0:
+                return
+            try:
+                events = subscriber.get(timeout=wait_time)
+            except queue.Empty:
+                return
+            for event in events:
+                if model_id is not None and (
+                    event["model_id"] != model_id or event["model_tag"] != model_tag
+                ):
+                    continue
+                if event["event"] == "removed":
+                    watched.pop(event["key"], None)
+                else:
+                    watched[event["key"]] = event["in_progress"]
+                seen = True
+                yield event
+            if until_complete and (model_id is None or seen) and not any(watched.values()):
+                return
+    finally:
+        poller.unsubscribe(subscriber)
+
+
+def _wait_until_done(
+    key: str,
+    on_event: Optional[Callable[[Dict], None]] = None,
+    timeout: Optional[float] = WAIT_TIMEOUT,
+    poller: Optional[StatusPoller] = None,
+    check: Optional[Callable[[], Optional[Dict]]] = None
+) -> Optional[Dict]:
+    """
+    Wait on the shared poller until the entry `key` has appeared and is no
+    longer in progress (or was removed). Returns its last event, None on timeout.
+
+    While the poller does not list `key` (e.g. an execution filtered out of the
+    model status or already finished before the first poll), `check` is called
+    about once per poll interval to get its snapshot entry directly.
+    """
+    poller = poller or get_status_poller()
+    subscriber = poller.subscribe()
+    poller.poll_now()
+    deadline = None if timeout is None else time.time() + timeout
+    last_status = None
+
+    def deliver(event):
+        nonlocal last_status
+        if on_event is not None and event["status"] != last_status:
+            on_event(event)
+        last_status = event["status"]
+
+    try:
+        while True:
+            wait_time = poller.max_interval
+            if deadline is not None:
+                if deadline - time.time() <= 0:
+                    return None
+                wait_time = min(wait_time, deadline - time.time())
+            try:
+                events = subscriber.get(timeout=wait_time)
+            except queue.Empty:
+                events = []
+            for event in events:
+                if event["key"] != key:
+                    continue
+                deliver(event)
+                if not event["in_progress"]:
+                    return event
+            snapshot = poller.snapshot
+            if check is None or (snapshot is not None and key in snapshot):
+                continue
+            try:
+                entry = check()
+            except Exception as e:
+                logger.debug(f"Failed to check the status of {key}: {e}")
+                continue
+            if entry is None:
+                continue
+            event = {
+                'event': 'added' if last_status is None else 'changed', 'key': key, **entry,
+                'previous_status': last_status, 'time': time.time()
+            }
+            deliver(event)
+            if not event["in_progress"]:
+                return event
+    finally:
+        poller.unsubscribe(subscriber)
+
+
+def wait_for_pipeline_execution(
+    pipeline_execution_id: str,
+    on_event: Optional[Callable[[Dict], None]] = None,
+    timeout: Optional[float] = WAIT_TIMEOUT,
+    poller: Optional[StatusPoller] = None
+) -> Optional[Dict]:
+    """
+    Block until a deployment pipeline execution has finished, polled by the
+    shared `StatusPoller`. Returns its last event, None after `timeout` seconds
+    (None waits forever).
+    """
+    return _wait_until_done(
+        f"pipeline:{pipeline_execution_id}",
+        on_event=on_event,
+        timeout=timeout,
+        poller=poller,
+        check=lambda: _pipeline_execution_entry(pipeline_execution_id)
+    )
+
+
+def wait_for_stack(
+    stack_name: str,
+    on_event: Optional[Callable[[Dict], None]] = None,
+    timeout: Optional[float] = WAIT_TIMEOUT,
+    poller: Optional[StatusPoller] = None
+) -> Optional[Dict]:
+    """
+    Block until no operation is in progress on a stack, polled by the shared
+    `StatusPoller`. Returns its last event, None after `timeout` seconds
+    (None waits forever).
+    """
+    poller = poller or get_status_poller()
+    poller.track_stack(stack_name)
+    try:
+        return _wait_until_done(
+            f"stack:{stack_name}",
+            on_event=on_event,
+            timeout=timeout,
+            poller=poller,
+            check=lambda: _tracked_stack_snapshot(stack_name).get(f"stack:{stack_name}")
+        )
+    finally:
+        poller.untrack_stack(stack_name)
+
+
 # Private helper functions
 
 def _is_execution_over_24_hours(create_time_str: str) -> bool:
@@ -671,6 +976,89 @@ def _filter_valid_executions(executions: List[Dict]) -> List[Dict]:
     return filtered_executions
 
 
+def _status_snapshot(status: Dict) -> Dict[str, Dict]:
+    """Flatten the result of `get_model_status` into entries keyed by execution or stack"""
+    snapshot = {}
+    for execution_info in status['inprogress']:
+        if execution_info.get('enhanced_status'):
+            display_status = execution_info['enhanced_status']
+        elif execution_info.get('stage_name'):
+            display_status = f"{execution_info['status']} ({execution_info['stage_name']})"
+        else:
+            display_status = execution_info['status']
+        snapshot[f"pipeline:{execution_info['pipeline_execution_id']}"] = {
+            'model_id': execution_info['model_id'],
+            'model_tag': execution_info['model_tag'],
+            'source': 'pipeline',
+            'status': display_status,
+            'in_progress': execution_info['status'] in IN_PROGRESS_EXECUTION_STATUS_LIST,
+        }
+    for stack_info in status['completed']:
+        snapshot[f"stack:{stack_info['stack_name']}"] = {
+            'model_id': stack_info['model_id'],
+            'model_tag': stack_info['model_tag'],
+            'source': 'stack',
+            'status': stack_info['stack_status'],
+            'in_progress': stack_info['stack_status'].endswith('_IN_PROGRESS'),
+        }
+    return snapshot
+
+
+def _tracked_stack_snapshot(stack_name: str) -> Dict[str, Dict]:
+    """Snapshot entry of a stack registered with `StatusPoller.track_stack`, empty if it does not exist"""
+    stack_status = check_stack_status(stack_name)
+    if not stack_status.is_stack_exist:
+        return {}
+    status = stack_status.status
+    return {
+        f"stack:{stack_name}": {
+            'model_id': None,
+            'model_tag': None,
+            'source': 'stack',
+            'status': status,
+            'in_progress': status.endswith('_IN_PROGRESS'),
+        }
+    }
+
+
+def _pipeline_execution_entry(pipeline_execution_id: str) -> Dict:
+    """Snapshot entry of a pipeline execution fetched directly with `get_pipeline_execution_status`"""
+    execution_info = get_pipeline_execution_status(pipeline_execution_id)
+    if execution_info.get('stage_name'):
+        display_status = f"{execution_info['status']} ({execution_info['stage_name']})"
+    else:
+        display_status = execution_info['status']
+    return {
+        'model_id': execution_info.get('model_id'),
+        'model_tag': execution_info.get('model_tag'),
+        'source': 'pipeline',
+        'status': display_status,
+        'in_progress': execution_info['status_code'] == 1,
+    }
+
+
+def _diff_status_snapshots(previous: Dict[str, Dict], current: Dict[str, Dict]) -> List[Dict]:
+    """Change events between two snapshots"""
+    now = time.time()
+    events = []
+    for key, entry in current.items():
+        previous_entry = previous.get(key)
+        if previous_entry is None:
+            events.append({'event': 'added', 'key': key, **entry, 'previous_status': None, 'time': now})
+        elif previous_entry['status'] != entry['status']:
+            events.append({
+                'event': 'changed', 'key': key, **entry,
+                'previous_status': previous_entry['status'], 'time': now
+            })
+    for key, previous_entry in previous.items():
+        if key not in current:
+            events.append({
+                'event': 'removed', 'key': key, **previous_entry,
+                'in_progress': False, 'previous_status': previous_entry['status'], 'time': now
+            })
+    return events
+
+
 def _filter_executions_by_model(
     executions: List[Dict],
     model_id: str,
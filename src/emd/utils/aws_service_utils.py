@@ -2,10 +2,13 @@ import datetime
 import hashlib
 import json
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timezone
 
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError, NoCredentialsError
 
 from emd.constants import (
@@ -23,11 +26,19 @@ from emd.models.utils.constants import (
     ServiceQuotaCode,
 )
 from emd.utils.exceptions import EnvStackNotExistError
+from emd.utils.status_cache import get_status_cache, to_timestamp
 
 from .logger_utils import get_logger
 
 logger = get_logger(__name__)
 
+# max number of concurrent describe calls of `emd status`
+STATUS_MAX_WORKERS = int(os.environ.get("EMD_STATUS_MAX_WORKERS", 16))
+STATUS_CLIENT_CONFIG = Config(
+    max_pool_connections=STATUS_MAX_WORKERS,
+    retries={"max_attempts": 10, "mode": "adaptive"}
+)
+
 
 class StackStatus:
     def __init__(self, is_stack_exist: bool, stack_info: dict):
@@ -289,144 +300,228 @@ def _find_stage_for_execution_via_actions_utils(pipeline_name: str, execution_id
         return "Unknown"
 
 
+def _find_stage_via_pipeline_state(execution_id: str, stage_states: list) -> str:
+    for stage_state in stage_states:
+        # Check if this execution is in this stage
+        stage_execution_ids = []
+
+        # Check inbound executions
+        stage_execution_ids.extend([
+            d["pipelineExecutionId"] for d in stage_state.get("inboundExecutions", [])
+        ])
+
+        # Check latest execution
+        latest_execution = stage_state.get("latestExecution", {})
+        if latest_execution and latest_execution.get("pipelineExecutionId"):
+            stage_execution_ids.append(latest_execution["pipelineExecutionId"])
+
+        # Check action states for parallel executions
+        for action_state in stage_state.get("actionStates", []):
+            latest_action = action_state.get("latestExecution", {})
+            if latest_action and latest_action.get("pipelineExecutionId"):
+                stage_execution_ids.append(latest_action["pipelineExecutionId"])
+
+        if execution_id in stage_execution_ids:
+            logger.debug(f"Found stage via pipeline state: {stage_state['stageName']}")
+            return stage_state["stageName"]
+    return "Unknown"
+
+
+def _get_execution_details(
+    pipeline_name: str,
+    execution_id: str,
+    execution_status: str,
+    client,
+    get_stage_states,
+):
+    """
+    Fetch and convert the details of one pipeline execution, returns None
+    if the execution is not an emd model deployment.
+    """
+    # Get detailed execution info
+    execution_info = get_pipeline_execution_info(
+        pipeline_name=pipeline_name,
+        pipeline_execution_id=execution_id,
+        client=client,
+    )
+
+    # Extract variables
+    variables = execution_info.get("variables", [])
+    variables_d = {
+        variable["name"]: variable["resolvedValue"]
+        for variable in variables
+    }
+
+    # Skip if missing required variables
+    if "ModelId" not in variables_d or "CreateTime" not in variables_d:
+        return None
+
+    create_timestamp = float(variables_d["CreateTime"])
+    create_time = (
+        datetime.datetime.fromtimestamp(create_timestamp)
+        .replace(tzinfo=timezone.utc)
+        .strftime("%Y-%m-%d %H:%M:%S %Z")
+    )
+
+    # Find current stage for this execution - IMPROVED APPROACH
+    # First try the action-based approach (works for all execution states)
+    current_stage = _find_stage_for_execution_via_actions_utils(
+        pipeline_name, execution_id, client
+    )
+
+    # If action-based approach fails, fall back to pipeline state approach
+    if current_stage == "Unknown":
+        logger.debug(f"Action-based stage detection failed for {execution_id}, trying pipeline state")
+        current_stage = _find_stage_via_pipeline_state(execution_id, get_stage_states())
+
+    return {
+        "stage_name": current_stage,
+        "status": execution_status,
+        "pipeline_execution_id": execution_id,
+        "model_id": variables_d["ModelId"],
+        "model_tag": variables_d["ModelTag"],
+        "region": variables_d.get("Region", ""),
+        "create_time": create_time,
+        "execution_info": execution_info,
+        "instance_type": InstanceType.convert_instance_type(
+            variables_d["InstanceType"], variables_d["ServiceType"]
+        ),
+        "engine_type": variables_d["EngineType"],
+        "service_type": Service.get_service_from_service_type(
+            variables_d["ServiceType"]
+        ).name,
+        "framework_type": variables_d["FrameworkType"],
+        "outputs": "",
+        "deploy_version": variables_d.get("DeployVersion", ""),
+    }
+
+
+def _list_pipeline_execution_summaries(pipeline_name: str, client, status_cache=None) -> list[dict]:
+    """
+    List the executions of the pipeline, newest first. With a status cache,
+    listing stops at the executions that were already terminal at the last
+    refresh and their summaries are taken from the cache.
+    """
+    running_since = status_cache.get_running_since(pipeline_name) if status_cache else None
+    summaries = []
+    kwargs = {"pipelineName": pipeline_name}
+    while True:
+        # Use list_pipeline_executions to get ALL executions (better for PARALLEL mode)
+        response = client.list_pipeline_executions(**kwargs)
+        reached_cached = False
+        for summary in response.get("pipelineExecutionSummaries", []):
+            start_time = to_timestamp(summary.get("startTime")) or 0
+            if running_since is not None and start_time < running_since:
+                reached_cached = True
+                break
+            summaries.append({**summary, "startTime": start_time})
+        # Get additional pages if needed
+        if reached_cached or "nextToken" not in response:
+            break
+        kwargs["nextToken"] = response["nextToken"]
+
+    if status_cache is not None:
+        status_cache.update_summaries(pipeline_name, summaries)
+        if running_since is not None:
+            fetched_ids = {summary["pipelineExecutionId"] for summary in summaries}
+            summaries.extend(
+                summary for summary in status_cache.get_terminal_summaries(pipeline_name, running_since)
+                if summary["pipelineExecutionId"] not in fetched_ids
+            )
+    return summaries
+
+
 def get_pipeline_active_executions(
     pipeline_name: str,
     client=None,
     return_dict=False,
     filter_stoped=True,
     filter_failed=True,
+    use_cache=True,
 ) -> list[dict]:
-    client = client or boto3.client("codepipeline", region_name=get_current_region())
-
-    try:
-        # Use list_pipeline_executions to get ALL executions (better for PARALLEL mode)
-        response = client.list_pipeline_executions(pipelineName=pipeline_name)
-        all_executions = response.get("pipelineExecutionSummaries", [])
+    """
+    Get the emd deployments of the pipeline executions in the selected states.
 
-        # Get additional pages if needed
-        while "nextToken" in response:
-            response = client.list_pipeline_executions(
-                pipelineName=pipeline_name,
-                nextToken=response["nextToken"]
-            )
-            all_executions.extend(response.get("pipelineExecutionSummaries", []))
+    The details of the executions are fetched concurrently on a bounded thread
+    pool. Unless `use_cache` is False, executions in a terminal state are kept
+    in the local status cache and are not fetched again.
+    """
+    client = client or boto3.client(
+        "codepipeline",
+        region_name=get_current_region(),
+        config=STATUS_CLIENT_CONFIG
+    )
+    status_cache = get_status_cache(client.meta.region_name) if use_cache else None
 
+    try:
+        all_executions = _list_pipeline_execution_summaries(pipeline_name, client, status_cache)
     except client.exceptions.PipelineNotFoundException:
         raise EnvStackNotExistError
 
     # Filter for active executions
-    active_executuion_infos = []
     status_filter = ["Stopping", "InProgress", "Stopped", "Failed"]
     if filter_stoped:
         status_filter.remove("Stopped")
     if filter_failed:
         status_filter.remove("Failed")
 
-    # Get pipeline state for stage information (fallback method)
-    try:
-        pipeline_state = client.get_pipeline_state(name=pipeline_name)
-        stage_states = pipeline_state["stageStates"]
-    except Exception as e:
-        logger.warning(f"Could not get pipeline state: {e}")
-        stage_states = []
-
-    # Process each execution
-    for execution_summary in all_executions:
+    # Get pipeline state for stage information (fallback method), fetched at most once
+    stage_states_lock = threading.Lock()
+    stage_states_holder = []
+
+    def get_stage_states():
+        with stage_states_lock:
+            if not stage_states_holder:
+                try:
+                    pipeline_state = client.get_pipeline_state(name=pipeline_name)
+                    stage_states_holder.append(pipeline_state["stageStates"])
+                except Exception as e:
+                    logger.warning(f"Could not get pipeline state: {e}")
+                    stage_states_holder.append([])
+            return stage_states_holder[0]
+
+    def process_execution(execution_summary):
         execution_status = execution_summary["status"]
         execution_id = execution_summary["pipelineExecutionId"]
-
-        # Skip if not in our status filter
-        if execution_status not in status_filter:
-            continue
-
         try:
-            # Get detailed execution info
-            execution_info = get_pipeline_execution_info(
-                pipeline_name=pipeline_name,
-                pipeline_execution_id=execution_id,
-                client=client,
-            )
-
-            # Extract variables
-            variables = execution_info.get("variables", [])
-            variables_d = {
-                variable["name"]: variable["resolvedValue"]
-                for variable in variables
-            }
-
-            # Skip if missing required variables
-            if "ModelId" not in variables_d or "CreateTime" not in variables_d:
-                continue
-
-            create_timestamp = float(variables_d["CreateTime"])
-            create_time = (
-                datetime.datetime.fromtimestamp(create_timestamp)
-                .replace(tzinfo=timezone.utc)
-                .strftime("%Y-%m-%d %H:%M:%S %Z")
-            )
-
-            # Find current stage for this execution - IMPROVED APPROACH
-            # First try the action-based approach (works for all execution states)
-            current_stage = _find_stage_for_execution_via_actions_utils(
-                pipeline_name, execution_id, client
+            info = _get_execution_details(
+                pipeline_name, execution_id, execution_status, client, get_stage_states
             )
-
-            # If action-based approach fails, fall back to pipeline state approach
-            if current_stage == "Unknown":
-                logger.debug(f"Action-based stage detection failed for {execution_id}, trying pipeline state")
-
-                for stage_state in stage_states:
-                    # Check if this execution is in this stage
-                    stage_execution_ids = []
-
-                    # Check inbound executions
-                    stage_execution_ids.extend([
-                        d["pipelineExecutionId"] for d in stage_state.get("inboundExecutions", [])
-                    ])
-
-                    # Check latest execution
-                    latest_execution = stage_state.get("latestExecution", {})
-                    if latest_execution and latest_execution.get("pipelineExecutionId"):
-                        stage_execution_ids.append(latest_execution["pipelineExecutionId"])
-
-                    # Check action states for parallel executions
-                    for action_state in stage_state.get("actionStates", []):
-                        latest_action = action_state.get("latestExecution", {})
-                        if latest_action and latest_action.get("pipelineExecutionId"):
-                            stage_execution_ids.append(latest_action["pipelineExecutionId"])
-
-                    if execution_id in stage_execution_ids:
-                        current_stage = stage_state["stageName"]
-                        logger.debug(f"Found stage via pipeline state: {current_stage}")
-                        break
-
-            active_executuion_infos.append(
-                {
-                    "stage_name": current_stage,
-                    "status": execution_status,
-                    "pipeline_execution_id": execution_id,
-                    "model_id": variables_d["ModelId"],
-                    "model_tag": variables_d["ModelTag"],
-                    "region": variables_d.get("Region", ""),
-                    "create_time": create_time,
-                    "execution_info": execution_info,
-                    "instance_type": InstanceType.convert_instance_type(
-                        variables_d["InstanceType"], variables_d["ServiceType"]
-                    ),
-                    "engine_type": variables_d["EngineType"],
-                    "service_type": Service.get_service_from_service_type(
-                        variables_d["ServiceType"]
-                    ).name,
-                    "framework_type": variables_d["FrameworkType"],
-                    "outputs": "",
-                    "deploy_version": variables_d.get("DeployVersion", ""),
-                }
-            )
-
         except Exception as e:
             logger.warning(f"Error processing execution {execution_id}: {e}")
+            return None
+        if status_cache is not None:
+            status_cache.put_execution(pipeline_name, execution_id, execution_status, info)
+        return info
+
+    # Process each execution, cached ones first, the rest fanned out on the pool
+    active_executuion_infos = [None] * len(all_executions)
+    pending = []
+    for index, execution_summary in enumerate(all_executions):
+        # Skip if not in our status filter
+        if execution_summary["status"] not in status_filter:
             continue
+        record = status_cache.get_execution(
+            pipeline_name, execution_summary["pipelineExecutionId"], execution_summary["status"]
+        ) if status_cache else None
+        if record is not None:
+            active_executuion_infos[index] = record["info"]
+        else:
+            pending.append(index)
+
+    if pending:
+        logger.debug(f"Fetching details of {len(pending)} pipeline executions")
+        with ThreadPoolExecutor(max_workers=min(STATUS_MAX_WORKERS, len(pending))) as executor:
+            for index, info in zip(
+                pending,
+                executor.map(process_execution, [all_executions[index] for index in pending])
+            ):
+                active_executuion_infos[index] = info
 
+    if status_cache is not None:
+        status_cache.save()
+
+    active_executuion_infos = [info for info in active_executuion_infos if info is not None]
     if return_dict:
         return {
             active_executuion_info[
@@ -437,61 +532,104 @@ def get_pipeline_active_executions(
     return active_executuion_infos
 
 
-def get_model_stacks():
-    cf = boto3.client("cloudformation", region_name=get_current_region())
-    stacks = cf.list_stacks(
-        StackStatusFilter=[
-            "CREATE_COMPLETE",
-            "UPDATE_COMPLETE",
-            "ROLLBACK_COMPLETE",
-            "DELETE_IN_PROGRESS",
-        ]
-    )["StackSummaries"]
-    model_stacks = []
-    for stack in stacks:
-        stack_name = stack["StackName"]
-        if stack_name.startswith(MODEL_STACK_NAME_PREFIX):
-            status_info = cf.describe_stacks(StackName=stack_name)["Stacks"][0]
-            outputs = status_info["Parameters"]
-            outputs_d = {
-                output["ParameterKey"]: output["ParameterValue"]
-                for output in outputs
-            }
+def _get_model_stack_details(stack_name: str, cf) -> dict:
+    status_info = cf.describe_stacks(StackName=stack_name)["Stacks"][0]
+    outputs = status_info["Parameters"]
+    outputs_d = {
+        output["ParameterKey"]: output["ParameterValue"]
+        for output in outputs
+    }
 
-            outputs_d["model_id"] = outputs_d.pop("ModelId")
-            outputs_d["model_tag"] = outputs_d.pop("ModelTag")
-            outputs_d["stack_name"] = stack_name
-            outputs_d["stack_status"] = status_info["StackStatus"]
-            outputs_d["region"] = outputs_d.get("Region", "")
-            aware_dt = (
-                status_info["CreationTime"]
-                .replace(tzinfo=timezone.utc)
-                .strftime("%Y-%m-%d %H:%M:%S %Z")
-            )
-            outputs_d["create_time"] = aware_dt
-            outputs_d["instance_type"] = outputs_d["InstanceType"]
-            outputs_d["framework_type"] = outputs_d["FrameWorkType"]
-            outputs_d["service_type"] = Service.get_service_from_service_type(
-                outputs_d["ServiceType"]
-            ).name
-            outputs_d["engine_type"] = outputs_d["EngineType"]
-            stack_output_d = {
-                output["OutputKey"]: output["OutputValue"]
-                for output in status_info.get("Outputs", [])
-            }
-            outputs_d["outputs"] = str(stack_output_d)
-
-            if outputs_d["stack_status"] == "ROLLBACK_COMPLETE":
-                # find failed event
-                response = cf.describe_stack_events(StackName=stack_name)
-                stack_events = response["StackEvents"]
-                for event in stack_events:
-                    if event["ResourceStatus"] == "CREATE_FAILED":
-                        resource_status_reason = event["ResourceStatusReason"]
-                        outputs_d["stack_status"] = (
-                            f"{outputs_d['stack_status']}\n{resource_status_reason}"
-                        )
-            model_stacks.append(outputs_d)
+    outputs_d["model_id"] = outputs_d.pop("ModelId")
+    outputs_d["model_tag"] = outputs_d.pop("ModelTag")
+    outputs_d["stack_name"] = stack_name
+    outputs_d["stack_status"] = status_info["StackStatus"]
+    outputs_d["region"] = outputs_d.get("Region", "")
+    aware_dt = (
+        status_info["CreationTime"]
+        .replace(tzinfo=timezone.utc)
+        .strftime("%Y-%m-%d %H:%M:%S %Z")
+    )
+    outputs_d["create_time"] = aware_dt
+    outputs_d["instance_type"] = outputs_d["InstanceType"]
+    outputs_d["framework_type"] = outputs_d["FrameWorkType"]
+    outputs_d["service_type"] = Service.get_service_from_service_type(
+        outputs_d["ServiceType"]
+    ).name
+    outputs_d["engine_type"] = outputs_d["EngineType"]
+    stack_output_d = {
+        output["OutputKey"]: output["OutputValue"]
+        for output in status_info.get("Outputs", [])
+    }
+    outputs_d["outputs"] = str(stack_output_d)
+
+    if outputs_d["stack_status"] == "ROLLBACK_COMPLETE":
+        # find failed event
+        response = cf.describe_stack_events(StackName=stack_name)
+        stack_events = response["StackEvents"]
+        for event in stack_events:
+            if event["ResourceStatus"] == "CREATE_FAILED":
+                resource_status_reason = event["ResourceStatusReason"]
+                outputs_d["stack_status"] = (
+                    f"{outputs_d['stack_status']}\n{resource_status_reason}"
+                )
+    return outputs_d
+
+
+def get_model_stacks(use_cache=True):
+    """
+    Get the details of all model stacks. Stacks are described concurrently on
+    a bounded thread pool, stacks in a terminal state that did not change since
+    the last call are served from the local status cache.
+    """
+    cf = boto3.client(
+        "cloudformation",
+        region_name=get_current_region(),
+        config=STATUS_CLIENT_CONFIG
+    )
+    status_cache = get_status_cache(cf.meta.region_name) if use_cache else None
+    paginator = cf.get_paginator("list_stacks")
+    stack_summaries = [
+        stack
+        for page in paginator.paginate(
+            StackStatusFilter=[
+                "CREATE_COMPLETE",
+                "UPDATE_COMPLETE",
+                "ROLLBACK_COMPLETE",
+                "DELETE_IN_PROGRESS",
+            ]
+        )
+        for stack in page["StackSummaries"]
+        if stack["StackName"].startswith(MODEL_STACK_NAME_PREFIX)
+    ]
+
+    model_stacks = [None] * len(stack_summaries)
+    pending = []
+    for index, stack in enumerate(stack_summaries):
+        cached = status_cache.get_stack(stack) if status_cache else None
+        if cached is not None:
+            model_stacks[index] = cached
+        else:
+            pending.append(index)
+
+    def describe(stack):
+        outputs_d = _get_model_stack_details(stack["StackName"], cf)
+        if status_cache is not None:
+            status_cache.put_stack(stack, outputs_d)
+        return outputs_d
+
+    if pending:
+        logger.debug(f"Describing {len(pending)} model stacks")
+        with ThreadPoolExecutor(max_workers=min(STATUS_MAX_WORKERS, len(pending))) as executor:
+            for index, outputs_d in zip(
+                pending,
+                executor.map(describe, [stack_summaries[index] for index in pending])
+            ):
+                model_stacks[index] = outputs_d
+
+    if status_cache is not None:
+        status_cache.prune_stacks([stack["StackId"] for stack in stack_summaries])
+        status_cache.save()
     return model_stacks
 
 
@@ -524,9 +662,13 @@ def check_stack_exist_and_complete(stack_name: str):
 
 def monitor_stack(stack_name):
     """
+    Wait for the operation in progress on a stack and log its resource events.
+
+    The stack is polled directly rather than by the shared status poller, which
+    needs the env stack this is usually waiting for (e.g. in bootstrap).
 
     Args:
-        stack_name (_type_): _description_
+        stack_name (str): name of the stack
     """
     response = get_stack_info(stack_name=stack_name)
     stack_id = response["StackId"]
@@ -572,22 +714,16 @@ def monitor_stack(stack_name):
 
 
 def monitor_pipeline(pipeline_name, pipeline_execution_id):
-    client = boto3.client("codepipeline", region_name=get_current_region())
-    while True:
-        response = client.get_pipeline_state(name=pipeline_name)
-        for stage in response["stageStates"]:
-            stage_name = stage["stageName"]
-            status = stage["actionStates"][0]["latestExecution"]["status"]
-            logger.info(f"{stage_name}: {status}")
-        if (
-            response["stageStates"][-1]["actionStates"][0]["latestExecution"][
-                "status"
-            ]
-            == "Succeeded"
-        ):
-            break
-        time.sleep(2)
-    logger.info(f"pipeline: {pipeline_name} compleated with status:  {status}")
+    # imported here, emd.sdk.status imports this module
+    from emd.sdk.status import wait_for_pipeline_execution
+
+    def log_status(event):
+        logger.info(f"pipeline: {pipeline_name} status: {event['status']}")
+
+    event = wait_for_pipeline_execution(pipeline_execution_id, on_event=log_status)
+    if event is None:
+        raise TimeoutError(f"pipeline: {pipeline_name} execution {pipeline_execution_id} did not complete in time")
+    logger.info(f"pipeline: {pipeline_name} compleated with status:  {event['status']}")
 
 
 def check_env_stack_exist_and_complete():
@@ -0,0 +1,197 @@
+"""
+Local on-disk cache of deployment status.
+
+Pipeline executions and model stacks in a terminal state do not change any
+more, so `emd status` keeps their processed records in a json file under
+`~/.emd-local` and never fetches their details again. For every pipeline the
+cache also records the start time of the oldest execution that was still
+running at the last refresh: executions started before it are all terminal,
+so listing can stop there and only newer executions are refreshed.
+"""
+import datetime
+import json
+import os
+import threading
+from typing import Dict, List, Union
+
+from emd.constants import LOCAL_DEPLOY_PIPELINE_ZIP_DIR
+from emd.utils.logger_utils import get_logger
+
+logger = get_logger(__name__)
+
+STATUS_CACHE_DIR = os.environ.get(
+    "EMD_STATUS_CACHE_DIR",
+    os.path.join(LOCAL_DEPLOY_PIPELINE_ZIP_DIR, "status_cache")
+)
+STATUS_CACHE_ENABLED = os.environ.get("EMD_STATUS_CACHE", "1") == "1"
+STATUS_CACHE_VERSION = 1
+
+TERMINAL_EXECUTION_STATUS_LIST = ["Succeeded", "Failed", "Stopped", "Superseded", "Cancelled"]
+TERMINAL_STACK_STATUS_LIST = ["CREATE_COMPLETE", "UPDATE_COMPLETE", "ROLLBACK_COMPLETE"]
+
+
+def to_timestamp(value: Union[datetime.datetime, float, int, None]) -> Union[float, None]:
+    if value is None:
+        return None
+    if isinstance(value, datetime.datetime):
+        return value.timestamp()
+    return float(value)
+
+
+class StatusCache:
+    """
+    Thread-safe json cache of one account and region. Call `save` once the
+    refresh is done, the file is replaced atomically.
+    """
+    def __init__(self, account_id: str, region: str, cache_dir: str = STATUS_CACHE_DIR):
+        self.path = os.path.join(cache_dir, f"{account_id}-{region}.json")
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._data = self._load()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            if data.get("version") == STATUS_CACHE_VERSION:
+                return data
+        except (OSError, ValueError):
+            pass
+        return {"version": STATUS_CACHE_VERSION, "pipelines": {}, "stacks": {}}
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(self._data, f, default=str)
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+            except OSError as e:
+                # the cache is an optimization, never fail the status query
+                logger.debug(f"failed to write status cache {self.path}: {e}")
+
+    def _pipeline(self, pipeline_name: str) -> dict:
+        return self._data["pipelines"].setdefault(
+            pipeline_name, {"running_since": None, "summaries": {}, "executions": {}}
+        )
+
+    # pipeline executions
+
+    def get_running_since(self, pipeline_name: str) -> Union[float, None]:
+        with self._lock:
+            return self._pipeline(pipeline_name)["running_since"]
+
+    def get_terminal_summaries(self, pipeline_name: str, before: float) -> List[dict]:
+        """Cached terminal execution summaries started before `before`, newest first."""
+        with self._lock:
+            summaries = [
+                summary for summary in self._pipeline(pipeline_name)["summaries"].values()
+                if summary["startTime"] < before
+            ]
+        return sorted(summaries, key=lambda summary: summary["startTime"], reverse=True)
+
+    def update_summaries(self, pipeline_name: str, summaries: List[dict]):
+        """
+        Record the listed summaries (newest first, `startTime` as timestamp)
+        and move the boundary to the oldest execution that is still running.
+        """
+        with self._lock:
+            pipeline = self._pipeline(pipeline_name)
+            running_since = None
+            for summary in summaries:
+                if summary["status"] in TERMINAL_EXECUTION_STATUS_LIST:
+                    pipeline["summaries"][summary["pipelineExecutionId"]] = {
+                        "pipelineExecutionId": summary["pipelineExecutionId"],
+                        "status": summary["status"],
+                        "startTime": summary["startTime"],
+                    }
+                else:
+                    running_since = summary["startTime"]
+            if running_since is None and summaries:
+                running_since = summaries[0]["startTime"]
+            if running_since is not None:
+                pipeline["running_since"] = running_since
+            self._dirty = True
+
+    def get_execution(self, pipeline_name: str, execution_id: str, status: str) -> Union[dict, None]:
+        """
+        Returns the cached record of a terminal execution, the record is
+        `{"info": None}` for executions that are not emd deployments.
+        """
+        with self._lock:
+            record = self._pipeline(pipeline_name)["executions"].get(execution_id)
+        if record is None or record["status"] != status:
+            return None
+        return record
+
+    def put_execution(self, pipeline_name: str, execution_id: str, status: str, info: Union[dict, None]):
+        if status not in TERMINAL_EXECUTION_STATUS_LIST:
+            return
+        with self._lock:
+            self._pipeline(pipeline_name)["executions"][execution_id] = {"status": status, "info": info}
+            self._dirty = True
+
+    # model stacks
+
+    def get_stack(self, stack_summary: dict) -> Union[dict, None]:
+        with self._lock:
+            record = self._data["stacks"].get(stack_summary["StackId"])
+        if record is None or record["version"] != self._stack_version(stack_summary):
+            return None
+        return record["info"]
+
+    def put_stack(self, stack_summary: dict, info: dict):
+        if stack_summary["StackStatus"] not in TERMINAL_STACK_STATUS_LIST:
+            return
+        with self._lock:
+            self._data["stacks"][stack_summary["StackId"]] = {
+                "version": self._stack_version(stack_summary),
+                "info": info
+            }
+            self._dirty = True
+
+    def prune_stacks(self, stack_ids: List[str]):
+        """Drop stacks that are no longer listed, e.g. deleted ones."""
+        stack_ids = set(stack_ids)
+        with self._lock:
+            stale = [stack_id for stack_id in self._data["stacks"] if stack_id not in stack_ids]
+            for stack_id in stale:
+                self._data["stacks"].pop(stack_id)
+            self._dirty = self._dirty or bool(stale)
+
+    @staticmethod
+    def _stack_version(stack_summary: dict) -> list:
+        return [
+            stack_summary["StackStatus"],
+            to_timestamp(stack_summary.get("LastUpdatedTime") or stack_summary.get("CreationTime")),
+        ]
+
+
+_status_caches: Dict[tuple, StatusCache] = {}
+# (region, profile) -> account id, saves a sts call per status query
+_account_ids: Dict[tuple, str] = {}
+_status_caches_lock = threading.Lock()
+
+
+def get_status_cache(region: str) -> Union[StatusCache, None]:
+    """Returns the cache of the current account and region, None if the cache is disabled."""
+    if not STATUS_CACHE_ENABLED:
+        return None
+    from emd.utils.aws_service_utils import get_account_id
+    profile_key = (region, os.environ.get("AWS_PROFILE"))
+    account_id = _account_ids.get(profile_key)
+    if account_id is None:
+        try:
+            account_id = _account_ids[profile_key] = get_account_id()
+        except Exception as e:
+            logger.debug(f"status cache disabled, failed to get account id: {e}")
+            return None
+    key = (account_id, region)
+    with _status_caches_lock:
+        if key not in _status_caches:
+            _status_caches[key] = StatusCache(account_id, region)
+        return _status_caches[key]
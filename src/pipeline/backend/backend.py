@@ -11,25 +11,147 @@ import traceback
 import json
 import socket
 import threading
-from fastapi.concurrency import run_in_threadpool
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from fastapi.concurrency import iterate_in_threadpool
 
 
-# import httpx
+import httpx
 from emd.models.utils.constants import ModelType,ServiceType
 from emd.models import Engine
 from emd.utils.accelerator_utils import get_gpu_num,get_neuron_core_num,get_cpu_num
 
 
-from utils.common import download_dir_from_s3_by_s5cmd
+from utils.model_fetch import download_model_dir_from_s3
+from utils.metrics import (
+    REQUESTS_TOTAL,
+    REQUEST_LATENCY,
+    TIME_TO_FIRST_TOKEN,
+    INTER_TOKEN_LATENCY,
+    PROMPT_TOKENS,
+    COMPLETION_TOKENS,
+    STREAM_CHUNKS,
+    REQUESTS_IN_FLIGHT,
+    QUEUE_DEPTH
+)
+from utils.response_cache import ResponseCache, make_cache_key, estimate_size
 # import torch
 from emd.constants import EMD_MODELS_S3_KEY_TEMPLATE
 from emd.utils.logger_utils import get_logger
 
 logger = get_logger(__name__)
 
+
+class InferenceOverloadedError(Exception):
+    def __init__(self, pending_num, capacity, status_code=503):
+        self.status_code = status_code
+        super().__init__(f"inference queue is full, pending: {pending_num}, capacity: {capacity}")
+
+
+class _StreamEventSplitter:
+    """
+    Splits the chunks of a streaming response into its SSE (`data: {...}`) or
+    NDJSON events. Passthrough streams send raw upstream bytes, so a chunk may
+    hold several events or a part of one.
+    """
+    def __init__(self):
+        self.buffer = b""
+
+    def feed(self, chunk) -> List[bytes]:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        elif not isinstance(chunk, (bytes, bytearray)):
+            return []
+        *lines, self.buffer = (self.buffer + chunk).split(b"\n")
+        events = []
+        for line in lines:
+            line = line.strip()
+            if line.startswith(b"data:"):
+                line = line[5:].strip()
+            if line.startswith(b"{"):
+                events.append(line)
+        return events
+
+    def flush(self) -> List[bytes]:
+        """The last event, if the stream did not end with a newline."""
+        return self.feed(b"\n")
+
+
+class InferenceExecutor(ThreadPoolExecutor):
+    """
+    Thread pool that runs blocking inference calls off the event loop.
+    At most `max_workers` calls run at the same time and at most `max_queue_size`
+    wait for a worker, further submissions raise `InferenceOverloadedError`.
+    """
+    def __init__(self, max_workers=8, max_queue_size=512, overload_status_code=503):
+        super().__init__(max_workers=max_workers, thread_name_prefix="inference")
+        self.max_workers = max_workers
+        self.capacity = max_workers + max_queue_size
+        self.overload_status_code = overload_status_code
+        self._pending_num = 0
+        self._pending_lock = threading.Lock()
+
+    @property
+    def pending_num(self):
+        return self._pending_num
+
+    @property
+    def queued_num(self):
+        return max(self._pending_num - self.max_workers, 0)
+
+    def _release(self, _):
+        with self._pending_lock:
+            self._pending_num -= 1
+
+    def submit(self, fn, /, *args, **kwargs):
+        with self._pending_lock:
+            if self._pending_num >= self.capacity:
+                raise InferenceOverloadedError(
+                    self._pending_num,
+                    self.capacity,
+                    status_code=self.overload_status_code
+                )
+            self._pending_num += 1
+        try:
+            future = super().submit(fn, *args, **kwargs)
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    async def run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self, fn, *args)
+
+
+def _to_dict(response):
+    if hasattr(response, "model_dump"):
+        return response.model_dump()
+    return response
+
+
 class BackendBase(ABC):
+    # shared by all backends in the serving process
+    inference_executor: InferenceExecutor = None
+    response_cache: ResponseCache = None
+
     def __init__(self,model:Model):
         self.execute_model: Model = model
+        if BackendBase.inference_executor is None:
+            framework = model.executable_config.current_framework
+            BackendBase.inference_executor = InferenceExecutor(
+                max_workers=getattr(framework, "inference_max_workers", 8),
+                max_queue_size=getattr(framework, "inference_max_queue_size", 512),
+                overload_status_code=getattr(framework, "inference_overload_status_code", 503)
+            )
+            executor = BackendBase.inference_executor
+            QUEUE_DEPTH.add_function(lambda: {("inference", ""): executor.queued_num})
+            response_cache_max_bytes = getattr(framework, "response_cache_max_bytes", 0)
+            if response_cache_max_bytes > 0:
+                BackendBase.response_cache = ResponseCache(
+                    max_bytes=response_cache_max_bytes,
+                    ttl=getattr(framework, "response_cache_ttl", 3600)
+                )
 
     @abstractmethod
     def start(self):
@@ -40,7 +162,178 @@ class BackendBase(ABC):
         ...
 
     async def ainvoke(self, request):
-        return await run_in_threadpool(self.invoke, request)
+        return await self.inference_executor.run(self.invoke, request)
+
+    def _is_cacheable(self, request):
+        if self.response_cache is None or request.get("stream", False):
+            return False
+        model_type = self.execute_model.model_type
+        if model_type in (ModelType.EMBEDDING, ModelType.RERANK):
+            return True
+        # only greedy decoding is deterministic
+        return model_type in (ModelType.LLM, ModelType.VLM) \
+            and request.get("temperature") == 0 and request.get("n", 1) == 1
+
+    async def ainvoke_with_cache(self, request, use_cache=True):
+        """
+        Serve deterministic requests (embedding, rerank, temperature 0 chat) from the
+        shared response cache. Embeddings are cached per input string, so only the
+        inputs missing from the cache are sent to the engine.
+        """
+        response, _ = await self._ainvoke_with_cache(request, use_cache=use_cache)
+        return response
+
+    async def _ainvoke_with_cache(self, request, use_cache=True):
+        """Return the response and whether it was served from the cache."""
+        if not use_cache or not self._is_cacheable(request):
+            return await self.ainvoke(request), False
+        inputs = request.get("input")
+        if self.execute_model.model_type == ModelType.EMBEDDING and \
+                (isinstance(inputs, str) or (isinstance(inputs, list) and inputs and all(isinstance(i, str) for i in inputs))):
+            # the usage only counts the inputs sent to the engine
+            return await self._ainvoke_embedding_with_cache(request), False
+
+        key = make_cache_key(self.execute_model.model_id, request)
+        response = self.response_cache.get(key)
+        if response is not None:
+            # callers may modify the response, the cached one must stay intact
+            return dict(response), True
+        response = _to_dict(await self.ainvoke(request))
+        self.response_cache.put(key, response)
+        return response, False
+
+    async def _ainvoke_embedding_with_cache(self, request):
+        inputs = request["input"]
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        params = {k: v for k, v in request.items() if k != "input"}
+        keys = [make_cache_key(self.execute_model.model_id, params, text) for text in inputs]
+        embeddings = [self.response_cache.get(key) for key in keys]
+        miss_indexes = [i for i, embedding in enumerate(embeddings) if embedding is None]
+
+        response = None
+        if miss_indexes:
+            # one engine call for the distinct missing inputs
+            miss_texts = list(dict.fromkeys(inputs[i] for i in miss_indexes))
+            response = _to_dict(await self.ainvoke({**params, "input": miss_texts}))
+            miss_embeddings = {
+                miss_texts[item["index"]]: item["embedding"]
+                for item in response["data"]
+            }
+            for i in miss_indexes:
+                embeddings[i] = miss_embeddings[inputs[i]]
+                self.response_cache.put(keys[i], embeddings[i], size=estimate_size(embeddings[i]))
+
+        return {
+            "object": "list",
+            "data": [
+                {"object": "embedding", "index": i, "embedding": embedding}
+                for i, embedding in enumerate(embeddings)
+            ],
+            "model": (response or {}).get("model") or self.execute_model.model_id,
+            "usage": (response or {}).get("usage") or {"prompt_tokens": 0, "total_tokens": 0}
+        }
+
+    async def ainvoke_with_metrics(self, request, route="/invocations", use_cache=True):
+        """
+        Call `ainvoke` (through the response cache) and report the shared serving
+        metrics (see utils/metrics.py). Streaming responses are measured until their
+        last chunk is sent.
+        """
+        t0 = time.perf_counter()
+        REQUESTS_IN_FLIGHT.inc(route=route)
+        try:
+            response, cache_hit = await self._ainvoke_with_cache(request, use_cache=use_cache)
+        except BaseException as e:
+            status = "rejected" if isinstance(e, InferenceOverloadedError) else "error"
+            self._finish_request_metrics(route, t0, status)
+            raise
+        if request.get("stream", False):
+            return self._instrument_streaming_response(response, route, t0)
+        # token counters only count tokens processed by the engine
+        if not cache_hit:
+            self.record_usage(response, route)
+        self._finish_request_metrics(route, t0, "ok")
+        return response
+
+    def _finish_request_metrics(self, route, t0, status):
+        REQUESTS_IN_FLIGHT.dec(route=route)
+        REQUESTS_TOTAL.inc(route=route, status=status)
+        REQUEST_LATENCY.observe(time.perf_counter() - t0, route=route)
+
+    async def _instrument_streaming_response(self, response, route, t0):
+        status = "ok"
+        event_num = 0
+        last_event_time = None
+        usage = None
+        # used as completion tokens if the engine does not send a usage
+        content_event_num = 0
+        # count events, not chunks, so the metrics do not depend on streaming_passthrough
+        splitter = _StreamEventSplitter()
+        if not hasattr(response, "__aiter__"):
+            response = iterate_in_threadpool(response)
+        try:
+            async for chunk in response:
+                now = time.perf_counter()
+                for event in splitter.feed(chunk):
+                    event_usage, has_content = self._parse_stream_event(event)
+                    usage = event_usage or usage
+                    content_event_num += has_content
+                    if last_event_time is None:
+                        TIME_TO_FIRST_TOKEN.observe(now - t0, route=route)
+                    else:
+                        # events arriving in the same chunk have no gap
+                        INTER_TOKEN_LATENCY.observe(now - last_event_time, route=route)
+                    last_event_time = now
+                    event_num += 1
+                yield chunk
+        except (GeneratorExit, asyncio.CancelledError):
+            status = "cancelled"
+            raise
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            for event in splitter.flush():
+                event_usage, has_content = self._parse_stream_event(event)
+                usage = event_usage or usage
+                content_event_num += has_content
+            STREAM_CHUNKS.inc(event_num, route=route)
+            if usage is not None:
+                self.record_usage({"usage": usage}, route)
+            else:
+                self.record_usage(None, route, completion_tokens=content_event_num)
+            self._finish_request_metrics(route, t0, status)
+
+    @staticmethod
+    def _parse_stream_event(event: bytes):
+        """Return the `usage` of a streamed openai chunk and whether it carries generated text."""
+        try:
+            chunk = json.loads(event)
+        except ValueError:
+            return None, False
+        if not isinstance(chunk, dict):
+            return None, False
+        has_content = any(
+            (choice.get("delta") or {}).get("content") or choice.get("text")
+            for choice in chunk.get("choices") or [] if isinstance(choice, dict)
+        )
+        return chunk.get("usage") or None, bool(has_content)
+
+    def record_usage(self, response, route="/invocations", prompt_tokens=None, completion_tokens=None):
+        """Count tokens from the `usage` of an openai style response, or from explicit numbers."""
+        usage = response.get("usage") if isinstance(response, dict) else getattr(response, "usage", None)
+        if usage is not None:
+            if isinstance(usage, dict):
+                prompt_tokens = usage.get("prompt_tokens", prompt_tokens)
+                completion_tokens = usage.get("completion_tokens", completion_tokens)
+            else:
+                prompt_tokens = getattr(usage, "prompt_tokens", prompt_tokens)
+                completion_tokens = getattr(usage, "completion_tokens", completion_tokens)
+        if prompt_tokens:
+            PROMPT_TOKENS.inc(prompt_tokens, route=route)
+        if completion_tokens:
+            COMPLETION_TOKENS.inc(completion_tokens, route=route)
 
 
 class OpenAICompitableProxyBackendBase(BackendBase):
@@ -81,6 +374,21 @@ class OpenAICompitableProxyBackendBase(BackendBase):
         self.model_type = self.execute_model.model_type
         self.proc = None
 
+        # long-lived clients for the routes not covered by the openai sdk (e.g. rerank)
+        current_engine = self.execute_model.executable_config.current_engine
+        http_client_kwargs = dict(
+            base_url=self.base_url,
+            limits=httpx.Limits(
+                max_connections=current_engine.http_max_connections,
+                max_keepalive_connections=current_engine.http_max_keepalive_connections,
+                keepalive_expiry=current_engine.http_keepalive_expiry
+            ),
+            timeout=current_engine.http_timeout
+        )
+        self.http_client = httpx.Client(**http_client_kwargs)
+        self.async_http_client = httpx.AsyncClient(**http_client_kwargs)
+        self.streaming_passthrough = current_engine.streaming_passthrough
+
 
     @property
     def gpu_num(self):
@@ -156,7 +464,7 @@ class OpenAICompitableProxyBackendBase(BackendBase):
         if self.service_type != ServiceType.LOCAL:
             if self.execute_model.need_prepare_model or self.model_files_s3_path:
                 logger.info(f"Downloading model from s3, model_dir: {model_dir}, bucket_name: {self.model_s3_bucket}")
-                download_dir_from_s3_by_s5cmd(
+                download_model_dir_from_s3(
                     model_dir,
                     bucket_name = self.model_s3_bucket,
                     s3_key = model_dir,
@@ -192,6 +500,89 @@ class OpenAICompitableProxyBackendBase(BackendBase):
         return
 
 
+    def post_json(self, path, payload, headers=None):
+        response = self.http_client.post(path, json=payload, headers=headers)
+        return response.json()
+
+    async def apost_json(self, path, payload, headers=None):
+        response = await self.async_http_client.post(path, json=payload, headers=headers)
+        return response.json()
+
+    async def ainvoke(self, request):
+        if self._use_streaming_passthrough(request):
+            request = self._transform_request(request)
+            return self._apassthrough_streaming_response(
+                self._streaming_passthrough_path(request),
+                request
+            )
+        return await super().ainvoke(request)
+
+    def _use_streaming_passthrough(self, request):
+        return self.streaming_passthrough and request.get("stream", False)
+
+    def _streaming_passthrough_path(self, request):
+        # legacy completions requests carry a `prompt` instead of `messages`
+        if "messages" not in request and "prompt" in request:
+            return "completions"
+        return "chat/completions"
+
+    def _prepare_raw_request(self, request):
+        # mirror what the openai sdk sends for `extra_body` and `extra_headers`
+        body = dict(request)
+        headers = body.pop("extra_headers", None) or {}
+        body.update(body.pop("extra_body", None) or {})
+        return body, headers
+
+    @staticmethod
+    def _sse_event_data(event: bytes) -> Iterable[bytes]:
+        for line in event.split(b"\n"):
+            if not line.startswith(b"data:"):
+                continue
+            data = line[5:].strip()
+            if data and data != b"[DONE]":
+                yield data + b"\n"
+
+    async def _apassthrough_streaming_response(self, path, request) -> AsyncGenerator[bytes, None]:
+        """
+        Proxy the engine server's SSE stream without decoding the chunks.
+        For SageMaker the `data: ...` frames are rewritten to newline-delimited JSON,
+        other services get the upstream bytes as they are.
+        """
+        body, headers = self._prepare_raw_request(request)
+        try:
+            async with self.async_http_client.stream("POST", path, json=body, headers=headers) as response:
+                if response.status_code != 200:
+                    error = (await response.aread()).decode("utf-8", errors="replace")
+                    logger.error(f"streaming request failed, status: {response.status_code}, error: {error}")
+                    yield self._format_streaming_response(json.dumps({"error": error}))
+                    return
+
+                # aiter_bytes undoes a content-encoding of the upstream response
+                if self.service_type != ServiceType.SAGEMAKER:
+                    async for chunk in response.aiter_bytes():
+                        yield chunk
+                    return
+
+                buffer = bytearray()
+                async for chunk in response.aiter_bytes():
+                    buffer += chunk
+                    # a "\r" at the end of the buffer is joined with its "\n" on the next chunk
+                    buffer = buffer.replace(b"\r\n", b"\n")
+                    while True:
+                        end = buffer.find(b"\n\n")
+                        if end == -1:
+                            break
+                        event = bytes(buffer[:end])
+                        del buffer[:end+2]
+                        for data in self._sse_event_data(event):
+                            yield data
+                # the last event may end without a blank line
+                for data in self._sse_event_data(bytes(buffer)):
+                    yield data
+        except Exception as e:
+            logger.error(traceback.format_exc())
+            yield self._format_streaming_response(json.dumps({"error": str(e)}))
+
     def _transform_request(self, request):
         # Transform request to docker format
         request['model'] = request.pop('model',self.model_id) or self.model_id
@@ -217,7 +608,7 @@ class OpenAICompitableProxyBackendBase(BackendBase):
         if self.service_type == ServiceType.SAGEMAKER:
             return response +  "\n"
         else:
-            logger.info(f"data: {response}")
+            logger.debug(f"data: {response}")
             return f"data: {response}\n\n"
 
     def _get_streaming_response(self, response) -> Iterable[List[str]]:
@@ -232,7 +623,7 @@ class OpenAICompitableProxyBackendBase(BackendBase):
     async def _aget_streaming_response(self, response) -> AsyncGenerator[str, None]:
         try:
             async for chunk in response:
-                logger.info(f"chunk: {chunk}")
+                logger.debug(f"chunk: {chunk}")
                 yield self._format_streaming_response(chunk.model_dump_json())
         except Exception as e:
             logger.error(traceback.format_exc())
@@ -6,13 +6,14 @@ import io
 
 from emd.models.utils.constants import ModelType,ServiceType
 
-from backend.backend import BackendBase
-from utils.common import download_dir_from_s3_by_s5cmd
+from backend.backend import BackendBase, InferenceExecutor
+from utils.model_fetch import download_model_dir_from_s3
 import torch
 from emd.constants import EMD_MODELS_LOCAL_DIR_TEMPLATE
 from emd.utils.logger_utils import get_logger
 from threading import Thread
 import json
+from utils.micro_batcher import MicroBatcher
 from transformers import AutoModel
 from PIL import Image
 
@@ -36,13 +37,27 @@ class TransformerEmbeddingBackend(BackendBase):
         self.model = None
         self.pretrained_model_init_kwargs = self.execute_model.executable_config.current_engine.pretrained_model_init_kwargs or {}
         self.is_bge_vl = "bge-vl" in self.model_id.lower()
+        current_engine = self.execute_model.executable_config.current_engine
+        # one worker runs the batches against the model one at a time, with
+        # the queue limit and overload status of the shared executor
+        self.batch_executor = InferenceExecutor(
+            max_workers=1,
+            max_queue_size=self.inference_executor.capacity - 1,
+            overload_status_code=self.inference_executor.overload_status_code
+        )
+        self.batcher = MicroBatcher(
+            self._encode_batch,
+            max_batch_size=current_engine.max_batch_size,
+            max_wait_ms=current_engine.max_batch_wait_ms,
+            executor=self.batch_executor
+        )
 
 
     def start(self):
         model_dir = os.environ.get("MODEL_DIR") or EMD_MODELS_LOCAL_DIR_TEMPLATE.format(model_id=self.model_id)
         if self.service_type != ServiceType.LOCAL:
             logger.info(f"Downloading model from s3")
-            download_dir_from_s3_by_s5cmd(
+            download_model_dir_from_s3(
                 local_dir=model_dir,
                 bucket_name = self.model_s3_bucket,
                 s3_key = model_dir,
@@ -212,6 +227,11 @@ class TransformerEmbeddingBackend(BackendBase):
 
         return all_embeddings
 
+    def _encode_batch(self, key, inputs:list):
+        task, truncate_dim = key
+        embeddings = self.model.encode(inputs, task=task, truncate_dim=truncate_dim)
+        return embeddings.tolist()
+
     def invoke(self, request:dict):
         inputs = request['input']
         if not inputs:
@@ -234,5 +254,18 @@ class TransformerEmbeddingBackend(BackendBase):
         return self.format_openai_response(embeddings_list)
 
     async def ainvoke(self, request: dict):
-        """Async version of invoke method"""
-        return self.invoke(request)
+        """Async version of invoke method, concurrent text requests are merged into one encode call"""
+        if self.is_bge_vl:
+            return await super().ainvoke(request)
+
+        inputs = request['input']
+        if not inputs:
+            return []
+        if isinstance(inputs, str):
+            inputs = [inputs]
+
+        t0 = time.time()
+        key = (request.get('task', 'text-matching'), request.get('truncate_dim', None))
+        embeddings_list = await self.batcher.submit(key, inputs)
+        logger.info(f'embeddings generated, count: {len(embeddings_list)}, elapsed time: {time.time()-t0}')
+        return self.format_openai_response(embeddings_list)
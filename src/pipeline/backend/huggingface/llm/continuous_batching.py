@@ -0,0 +1,275 @@
+import asyncio
+import queue
+import threading
+import traceback
+from typing import AsyncGenerator, List, Tuple, Union
+
+import torch
+from emd.utils.logger_utils import get_logger
+
+logger = get_logger(__name__)
+
+
+def _to_legacy_cache(past_key_values):
+    if hasattr(past_key_values, "to_legacy_cache"):
+        return past_key_values.to_legacy_cache()
+    return past_key_values
+
+
+def _left_pad(tensor: torch.Tensor, length: int, dim: int) -> torch.Tensor:
+    pad_len = length - tensor.shape[dim]
+    if pad_len <= 0:
+        return tensor
+    pad_shape = list(tensor.shape)
+    pad_shape[dim] = pad_len
+    pad = torch.zeros(pad_shape, dtype=tensor.dtype, device=tensor.device)
+    return torch.cat([pad, tensor], dim=dim)
+
+
+class _Sequence:
+    def __init__(self, prompt_ids: List[int], generate_kwargs: dict, loop: asyncio.AbstractEventLoop):
+        self.prompt_ids = prompt_ids
+        self.max_new_tokens = generate_kwargs.get("max_new_tokens", 512)
+        self.do_sample = generate_kwargs.get("do_sample", False)
+        self.temperature = generate_kwargs.get("temperature", 1.0) or 0
+        self.top_p = generate_kwargs.get("top_p", 1.0)
+        self.loop = loop
+        self.queue = asyncio.Queue()
+        self.generated_ids: List[int] = []
+        # incremental detokenization window: generated_ids[prefix_offset:read_offset]
+        # is already emitted and only decoded as context for the next tokens
+        self.prefix_offset = 0
+        self.read_offset = 0
+        self.finished = False
+        self.cancelled = False
+
+    @property
+    def last_token_id(self):
+        return self.generated_ids[-1]
+
+    def put(self, item):
+        try:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, item)
+        except RuntimeError:
+            # event loop of the caller is closed
+            self.cancelled = True
+
+
+class ContinuousBatchingScheduler:
+    """
+    In-process continuous batching for HuggingFace causal LMs.
+
+    A background thread owns the model. Each step it prefills newly admitted
+    sequences, merges their kv cache into the running batch (left padded) and
+    runs one decode forward for all running sequences. Finished sequences leave
+    the batch at step boundaries, so new requests never wait for the longest
+    one in flight. Text deltas are pushed to an asyncio queue per request.
+    """
+    def __init__(self, model, tokenizer, max_num_seqs: int = 16):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_num_seqs = max_num_seqs
+        self.device = model.device
+        self.stop_token_ids = self._get_stop_token_ids()
+
+        self._waiting: "queue.Queue[_Sequence]" = queue.Queue()
+        self._running: List[_Sequence] = []
+        # batched kv cache: per layer (key, value) of shape [batch, heads, seq_len, head_dim]
+        self._cache = None
+        self._cache_cls = None
+        self._attention_mask: Union[torch.Tensor, None] = None
+        self._thread = threading.Thread(
+            target=self._loop,
+            daemon=True,
+            name="continuous-batching"
+        )
+
+    def _get_stop_token_ids(self) -> set:
+        stop_token_ids = set()
+        eos_token_ids = [self.tokenizer.eos_token_id]
+        generation_config = getattr(self.model, "generation_config", None)
+        if generation_config is not None:
+            eos_token_ids.append(generation_config.eos_token_id)
+        for eos_token_id in eos_token_ids:
+            if eos_token_id is None:
+                continue
+            if isinstance(eos_token_id, int):
+                stop_token_ids.add(eos_token_id)
+            else:
+                stop_token_ids.update(eos_token_id)
+        return stop_token_ids
+
+    def start(self):
+        self._thread.start()
+
+    async def generate(self, prompt_ids: List[int], generate_kwargs: dict) -> AsyncGenerator[Tuple[str, Union[str, None], int], None]:
+        """
+        Yield (text_delta, finish_reason, num_generated_tokens) tuples,
+        finish_reason is only set on the last one.
+        """
+        seq = _Sequence(prompt_ids, generate_kwargs, asyncio.get_running_loop())
+        self._waiting.put(seq)
+        try:
+            while True:
+                item = await seq.queue.get()
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+                if item[1] is not None:
+                    break
+        finally:
+            # client went away, drop the sequence at the next step
+            seq.cancelled = True
+
+    def _loop(self):
+        while True:
+            try:
+                if not self._running:
+                    self._admit(self._waiting.get())
+                while len(self._running) < self.max_num_seqs:
+                    try:
+                        self._admit(self._waiting.get_nowait())
+                    except queue.Empty:
+                        break
+                if self._running:
+                    self._decode_step()
+            except Exception as e:
+                logger.error(traceback.format_exc())
+                for seq in self._running:
+                    seq.put(e)
+                self._running = []
+                self._cache = None
+                self._attention_mask = None
+
+    @torch.no_grad()
+    def _admit(self, seq: _Sequence):
+        if seq.cancelled:
+            return
+        input_ids = torch.tensor([seq.prompt_ids], device=self.device)
+        try:
+            outputs = self.model(input_ids=input_ids, use_cache=True)
+        except Exception as e:
+            logger.error(traceback.format_exc())
+            seq.put(e)
+            return
+        if self._cache_cls is None and hasattr(outputs.past_key_values, "to_legacy_cache"):
+            self._cache_cls = type(outputs.past_key_values)
+        cache = _to_legacy_cache(outputs.past_key_values)
+        attention_mask = torch.ones((1, len(seq.prompt_ids)), dtype=torch.long, device=self.device)
+        self._add_to_batch(seq, cache, attention_mask)
+        next_token_id = self._sample(outputs.logits[:, -1, :], [seq])[0]
+        self._emit(seq, next_token_id)
+        self._remove_finished()
+
+    def _add_to_batch(self, seq: _Sequence, cache, attention_mask: torch.Tensor):
+        self._running.append(seq)
+        if self._cache is None:
+            self._cache = cache
+            self._attention_mask = attention_mask
+            return
+        length = max(self._attention_mask.shape[1], attention_mask.shape[1])
+        self._cache = tuple(
+            tuple(
+                torch.cat([_left_pad(batch_tensor, length, 2), _left_pad(new_tensor, length, 2)], dim=0)
+                for batch_tensor, new_tensor in zip(batch_layer, new_layer)
+            )
+            for batch_layer, new_layer in zip(self._cache, cache)
+        )
+        self._attention_mask = torch.cat(
+            [_left_pad(self._attention_mask, length, 1), _left_pad(attention_mask, length, 1)],
+            dim=0
+        )
+
+    @torch.no_grad()
+    def _decode_step(self):
+        input_ids = torch.tensor(
+            [[seq.last_token_id] for seq in self._running],
+            device=self.device
+        )
+        attention_mask = torch.cat(
+            [
+                self._attention_mask,
+                torch.ones((len(self._running), 1), dtype=torch.long, device=self.device)
+            ],
+            dim=1
+        )
+        position_ids = attention_mask.sum(dim=-1, keepdim=True) - 1
+        past_key_values = self._cache
+        if self._cache_cls is not None:
+            past_key_values = self._cache_cls.from_legacy_cache(past_key_values)
+        outputs = self.model(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            position_ids=position_ids,
+            past_key_values=past_key_values,
+            use_cache=True
+        )
+        self._cache = _to_legacy_cache(outputs.past_key_values)
+        self._attention_mask = attention_mask
+        next_token_ids = self._sample(outputs.logits[:, -1, :], self._running)
+        for seq, next_token_id in zip(self._running, next_token_ids):
+            self._emit(seq, next_token_id)
+        self._remove_finished()
+
+    def _sample(self, logits: torch.Tensor, seqs: List[_Sequence]) -> List[int]:
+        token_ids = logits.argmax(dim=-1).tolist()
+        for i, seq in enumerate(seqs):
+            if not seq.do_sample or seq.temperature <= 0:
+                continue
+            probs = torch.softmax(logits[i].float() / seq.temperature, dim=-1)
+            if seq.top_p < 1.0:
+                sorted_probs, sorted_ids = torch.sort(probs, descending=True)
+                # keep the smallest prefix whose cumulative probability reaches top_p
+                drop = torch.cumsum(sorted_probs, dim=-1) - sorted_probs > seq.top_p
+                sorted_probs[drop] = 0
+                probs = torch.zeros_like(probs).scatter_(0, sorted_ids, sorted_probs)
+            token_ids[i] = torch.multinomial(probs, 1).item()
+        return token_ids
+
+    def _emit(self, seq: _Sequence, token_id: int):
+        seq.generated_ids.append(token_id)
+        finish_reason = None
+        if token_id in self.stop_token_ids:
+            finish_reason = "stop"
+        elif len(seq.generated_ids) >= seq.max_new_tokens:
+            finish_reason = "length"
+
+        delta = self._detokenize_incrementally(seq, flush=finish_reason is not None)
+        if delta or finish_reason is not None:
+            seq.put((delta, finish_reason, len(seq.generated_ids)))
+        seq.finished = finish_reason is not None or seq.cancelled
+
+    def _detokenize_incrementally(self, seq: _Sequence, flush: bool = False) -> str:
+        # decode only the tokens after prefix_offset instead of the whole sequence,
+        # the already emitted prefix keeps spacing of the new tokens consistent
+        prefix_text = self.tokenizer.decode(
+            seq.generated_ids[seq.prefix_offset:seq.read_offset], skip_special_tokens=True
+        )
+        new_text = self.tokenizer.decode(
+            seq.generated_ids[seq.prefix_offset:], skip_special_tokens=True
+        )
+        # hold back incomplete multi-byte characters until the next token
+        if len(new_text) <= len(prefix_text) or (new_text.endswith("\ufffd") and not flush):
+            return ""
+        seq.prefix_offset = seq.read_offset
+        seq.read_offset = len(seq.generated_ids)
+        return new_text[len(prefix_text):]
+
+    def _remove_finished(self):
+        keep = [i for i, seq in enumerate(self._running) if not (seq.finished or seq.cancelled)]
+        if len(keep) == len(self._running):
+            return
+        self._running = [self._running[i] for i in keep]
+        if not keep:
+            self._cache = None
+            self._attention_mask = None
+            return
+        index = torch.tensor(keep, device=self.device)
+        attention_mask = self._attention_mask.index_select(0, index)
+        # drop leading columns that are padding for every remaining sequence
+        start = int(attention_mask.any(dim=0).nonzero()[0])
+        self._attention_mask = attention_mask[:, start:]
+        self._cache = tuple(
+            tuple(tensor.index_select(0, index)[:, :, start:] for tensor in layer)
+            for layer in self._cache
+        )
@@ -5,7 +5,7 @@ import time
 from emd.models.utils.constants import ModelType,ServiceType
 
 from backend.backend import BackendBase
-from utils.common import download_dir_from_s3_by_s5cmd
+from utils.model_fetch import download_model_dir_from_s3
 import torch
 from emd.constants import EMD_MODELS_LOCAL_DIR_TEMPLATE
 from emd.utils.logger_utils import get_logger
@@ -13,6 +13,7 @@ from transformers import AutoModelForCausalLM, AutoTokenizer
 from transformers import TextIteratorStreamer
 from threading import Thread
 import json
+from backend.huggingface.llm.continuous_batching import ContinuousBatchingScheduler
 
 
 logger = get_logger(__name__)
@@ -35,13 +36,16 @@ class TransformerLLMBackend(BackendBase):
         self.tokenizer = None
         self.pretrained_model_init_kwargs = self.execute_model.executable_config.current_engine.pretrained_model_init_kwargs or {}
         self.pretrained_tokenizer_init_kwargs = self.execute_model.executable_config.current_engine.pretrained_tokenizer_init_kwargs or {}
+        self.continuous_batching = self.execute_model.executable_config.current_engine.continuous_batching
+        self.max_num_seqs = self.execute_model.executable_config.current_engine.max_num_seqs
+        self.scheduler = None
 
 
     def start(self):
         model_dir = os.environ.get("MODEL_DIR") or EMD_MODELS_LOCAL_DIR_TEMPLATE.format(model_id=self.model_id)
         if self.service_type != ServiceType.LOCAL:
             logger.info(f"Downloading model from s3")
-            download_dir_from_s3_by_s5cmd(
+            download_model_dir_from_s3(
                 local_dir=model_dir,
                 bucket_name = self.model_s3_bucket,
                 s3_key = model_dir,
@@ -63,10 +67,18 @@ class TransformerLLMBackend(BackendBase):
             model_abs_path,
             **self.pretrained_tokenizer_init_kwargs
         )
+        if self.continuous_batching:
+            self.scheduler = ContinuousBatchingScheduler(
+                self.model,
+                self.tokenizer,
+                max_num_seqs=self.max_num_seqs
+            )
+            self.scheduler.start()
+            logger.info(f"continuous batching enabled, max_num_seqs: {self.max_num_seqs}")
 
 
-    def format_response_as_openai(self,response:str):
-        return {
+    def format_response_as_openai(self,response:str,finish_reason="stop",prompt_tokens=None,completion_tokens=None):
+        response = {
             # "id": "chatcmpl-123",
             "object": "chat.completion",
             "created": time.time(),
@@ -79,23 +91,20 @@ class TransformerLLMBackend(BackendBase):
                 "content": response,
                 },
                 "logprobs": None,
-                "finish_reason": "stop"
+                "finish_reason": finish_reason
             }],
             # "service_tier": "default",
-            # "usage": {
-            #     "prompt_tokens": 9,
-            #     "completion_tokens": 12,
-            #     "total_tokens": 21,
-            #     "completion_tokens_details": {
-            #     "reasoning_tokens": 0,
-            #     "accepted_prediction_tokens": 0,
-            #     "rejected_prediction_tokens": 0
-            #     }
-            # }
         }
-
-    def format_stream_response_as_openai(self, chunk_response:str,is_last=False):
-        finish_reason = "stop" if is_last else None
+        if prompt_tokens is not None and completion_tokens is not None:
+            response["usage"] = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        return response
+
+    def format_stream_response_as_openai(self, chunk_response:str,is_last=False,finish_reason="stop"):
+        finish_reason = finish_reason if is_last else None
         return {
             # "id":"chatcmpl-123",
             "object":"chat.completion.chunk",
@@ -113,8 +122,12 @@ class TransformerLLMBackend(BackendBase):
         }
 
 
+    def _format_stream_chunk(self, chunk:dict):
+        if self.service_type == ServiceType.SAGEMAKER:
+            return json.dumps(chunk) + "\n"
+        return f"data: {json.dumps(chunk)}\n\n"
 
-    def invoke(self, request:dict):
+    def _build_prompt(self, request:dict):
         generate_kwargs = {
             "max_new_tokens":512,
             "temperature":0.01
@@ -133,6 +146,10 @@ class TransformerLLMBackend(BackendBase):
             add_generation_prompt=True,
             **tokenize_kwargs
         )
+        return text, generate_kwargs
+
+    def invoke(self, request:dict):
+        text, generate_kwargs = self._build_prompt(request)
         model_inputs = self.tokenizer([text], return_tensors="pt").to(self.model.device)
         logger.info(f'request: {request}')
         logger.info(f"model_inputs: {model_inputs}, generate_kwargs: {generate_kwargs}")
@@ -147,7 +164,11 @@ class TransformerLLMBackend(BackendBase):
             ]
 
             response = "".join(self.tokenizer.batch_decode(generated_ids, skip_special_tokens=True)[0])
-            response = self.format_response_as_openai(response)
+            response = self.format_response_as_openai(
+                response,
+                prompt_tokens=len(model_inputs.input_ids[0]),
+                completion_tokens=len(generated_ids[0])
+            )
             logger.info(f'response: {response}')
             return response
 
@@ -164,17 +185,38 @@ class TransformerLLMBackend(BackendBase):
             history_response = ""
             for new_text in streamer:
                 history_response += new_text
-                new_text = self.format_stream_response_as_openai(new_text)
-                if self.service_type == ServiceType.SAGEMAKER:
-                    yield json.dumps(new_text) + "\n"
-                else:
-                    yield new_text
-
-            new_text = self.format_stream_response_as_openai("",is_last=True)
-            if self.service_type == ServiceType.SAGEMAKER:
-                yield json.dumps(new_text) + "\n"
-            else:
-                yield new_text
+                yield self._format_stream_chunk(self.format_stream_response_as_openai(new_text))
+
+            yield self._format_stream_chunk(self.format_stream_response_as_openai("",is_last=True))
             logger.info(f'response: {self.format_response_as_openai(history_response)}')
 
         return streamer_return_helper()
+
+    async def ainvoke(self, request:dict):
+        if self.scheduler is None:
+            return await super().ainvoke(request)
+
+        text, generate_kwargs = self._build_prompt(request)
+        prompt_ids = self.tokenizer(text)["input_ids"]
+        generator = self.scheduler.generate(prompt_ids, generate_kwargs)
+        if not request.get('stream',False):
+            response = ""
+            async for delta,finish_reason,completion_tokens in generator:
+                response += delta
+            return self.format_response_as_openai(
+                response,
+                finish_reason=finish_reason,
+                prompt_tokens=len(prompt_ids),
+                completion_tokens=completion_tokens
+            )
+
+        async def astreamer_return_helper():
+            async for delta,finish_reason,_ in generator:
+                if delta:
+                    yield self._format_stream_chunk(self.format_stream_response_as_openai(delta))
+                if finish_reason is not None:
+                    yield self._format_stream_chunk(
+                        self.format_stream_response_as_openai("",is_last=True,finish_reason=finish_reason)
+                    )
+
+        return astreamer_return_helper()
@@ -5,13 +5,13 @@ import time
 from emd.models.utils.constants import ModelType,ServiceType
 
 from backend.backend import BackendBase
-from utils.common import download_dir_from_s3_by_s5cmd
+from utils.model_fetch import download_model_dir_from_s3
 import torch
 from emd.constants import EMD_MODELS_LOCAL_DIR_TEMPLATE
 from emd.utils.logger_utils import get_logger
 from threading import Thread
 import json
-from transformers import AutoModelForSequenceClassification
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
 
 
 logger = get_logger(__name__)
@@ -32,13 +32,17 @@ class TransformerRerankBackend(BackendBase):
         self.proc = None
         self.model = None
         self.pretrained_model_init_kwargs = self.execute_model.executable_config.current_engine.pretrained_model_init_kwargs or {}
+        self.pretrained_tokenizer_init_kwargs = self.execute_model.executable_config.current_engine.pretrained_tokenizer_init_kwargs or {}
+        self.max_tokens_per_batch = self.execute_model.executable_config.current_engine.max_tokens_per_batch
+        self.max_length = self.execute_model.executable_config.current_engine.max_length
+        self.tokenizer = None
 
 
     def start(self):
         model_dir = os.environ.get("MODEL_DIR") or EMD_MODELS_LOCAL_DIR_TEMPLATE.format(model_id=self.model_id)
         if self.service_type != ServiceType.LOCAL:
             logger.info(f"Downloading model from s3")
-            download_dir_from_s3_by_s5cmd(
+            download_model_dir_from_s3(
                 local_dir=model_dir,
                 bucket_name = self.model_s3_bucket,
                 s3_key = model_dir,
@@ -62,42 +66,88 @@ class TransformerRerankBackend(BackendBase):
                 **self.pretrained_model_init_kwargs
         )
         logger.info(f"model: {self.model}")
-        # TODO add tokenizer init args from model's definition
-        # self.tokenizer =  AutoTokenizer.from_pretrained(
-        #     model_abs_path,
-        #     **self.pretrained_tokenizer_init_kwargs
-        # )
+        if self.max_tokens_per_batch:
+            # only used to estimate pair lengths for length-bucketed batching
+            self.tokenizer = AutoTokenizer.from_pretrained(
+                model_abs_path,
+                **{"trust_remote_code": True, **self.pretrained_tokenizer_init_kwargs}
+            )
 
 
-    def format_vllm_response(self,documents:list[str],scores:list[float]):
+    def format_vllm_response(self,documents:list[str],scores:list[float],top_n:int=None):
+        results = [
+            {
+            "index": index,
+            "document": {
+                "text": doc
+            },
+            "relevance_score": score
+            }
+            for index,(doc,score) in enumerate(zip(documents,scores))
+        ]
+        if top_n is not None:
+            results = sorted(results,key=lambda x: x["relevance_score"],reverse=True)[:top_n]
         return {
             "id": None,
             "model": self.model_id,
             "usage": {
                 "total_tokens": None
             },
-            "results": [
-                {
-                "index": index,
-                "document": {
-                    "text": doc
-                },
-                "relevance_score": score
-                }
-                for index,(doc,score) in enumerate(zip(documents,scores))
-            ]
+            "results": results
         }
 
+    def _compute_score(self, sentence_pairs:list, **kwargs):
+        scores = self.model.compute_score(sentence_pairs, **kwargs)
+        if not isinstance(scores,list):
+            scores = [scores]
+        return scores
+
+    def _split_into_length_buckets(self, query:str, documents:list[str]):
+        """
+        Sort pairs by token length (longest first) and greedily pack them so that
+        padded length * pair num of each batch stays within max_tokens_per_batch.
+        """
+        encoded = self.tokenizer(
+            [query] * len(documents),
+            documents,
+            truncation=True,
+            max_length=self.max_length
+        )
+        lengths = [len(input_ids) for input_ids in encoded["input_ids"]]
+        order = sorted(range(len(documents)), key=lambda i: lengths[i], reverse=True)
+        batches = []
+        batch = []
+        for index in order:
+            # the first pair of a batch is its longest one
+            if batch and lengths[batch[0]] * (len(batch) + 1) > self.max_tokens_per_batch:
+                batches.append(batch)
+                batch = []
+            batch.append(index)
+        if batch:
+            batches.append(batch)
+        return batches
+
     def invoke(self, request:dict):
         query:list = request['query']
         documents:list[str] = request['documents']
+        top_n = request.get('top_n')
         assert isinstance(query, str) and isinstance(documents, list) \
             and query and documents,(query,documents)
 
-        sentence_pairs = [[query, doc] for doc in documents]
         t0 = time.time()
-        scores = self.model.compute_score(sentence_pairs)
-        if not isinstance(scores,list):
-            scores = [scores]
+        if not self.max_tokens_per_batch or len(documents) == 1:
+            scores = self._compute_score([[query, doc] for doc in documents])
+        else:
+            batches = self._split_into_length_buckets(query, documents)
+            scores = [None] * len(documents)
+            for batch in batches:
+                batch_scores = self._compute_score(
+                    [[query, documents[i]] for i in batch],
+                    batch_size=len(batch),
+                    max_length=self.max_length
+                )
+                for i,score in zip(batch,batch_scores):
+                    scores[i] = score
+            logger.info(f'rerank batches: {len(batches)}, pairs: {len(documents)}')
         logger.info(f'rerank res: {scores},\nelapsed time: {time.time()-t0}')
-        return self.format_vllm_response(documents, scores)
+        return self.format_vllm_response(documents, scores, top_n=top_n)
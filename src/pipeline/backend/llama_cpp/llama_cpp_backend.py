@@ -90,6 +90,11 @@ class LlamaCppBackend(OpenAICompitableProxyBackendBase):
     async def ainvoke(self, request):
         # Transform input to lmdeploy format
         request = self._transform_request(request)
+        if self._use_streaming_passthrough(request):
+            return self._apassthrough_streaming_response(
+                self._streaming_passthrough_path(request),
+                request
+            )
         # Invoke lmdeploy
         logger.info(f"Chat request:{request}")
         response = await self.async_client.chat.completions.create(**request)
@@ -0,0 +1,34 @@
+import os
+import sys
+from backend.vllm.vllm_backend import VLLMBackend
+from emd.utils.logger_utils import get_logger
+
+logger = get_logger(__name__)
+
+STUB_SERVER_PATH = os.environ.get(
+    "EMD_STUB_SERVER_PATH",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../benchmark/stub_server.py"))
+)
+
+
+class MockBackend(VLLMBackend):
+    """
+    Serve through the vllm proxy code path, but against the OpenAI-compatible
+    stub server of src/benchmark instead of a real engine. No model files are
+    downloaded and no accelerator is needed, so the serving stack can be
+    load-tested on a CPU box. The stub delays and error rate are passed with
+    the engine `cli_args` of the fast_api.py `--extra_params`, e.g.
+
+        {"engine_params": {"engine_cls": "mock.mock_backend.MockBackend", "cli_args": "--ttft 0.2 --itl 0.02"}}
+    """
+
+    def before_start(self, model_dir=None):
+        return None
+
+    def create_proxy_server_start_command(self, model_path):
+        if not os.path.exists(STUB_SERVER_PATH):
+            raise RuntimeError(f"stub server not found at {STUB_SERVER_PATH}, set EMD_STUB_SERVER_PATH")
+        serve_command = f'{sys.executable} {STUB_SERVER_PATH} --port {self.server_port} {self.cli_args}'
+        if self.environment_variables:
+            serve_command = f'{self.environment_variables} && {serve_command}'
+        return serve_command
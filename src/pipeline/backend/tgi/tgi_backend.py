@@ -112,6 +112,11 @@ class TgiBackend(OpenAICompitableProxyBackendBase):
         # Transform input to tgi format
         request = self._transform_request(request)
         request['model'] = 'tgi'
+        if self._use_streaming_passthrough(request):
+            return self._apassthrough_streaming_response(
+                self._streaming_passthrough_path(request),
+                request
+            )
         # Invoke tgi
         logger.info(f"Chat request:{request}")
         response = await self.async_client.chat.completions.create(**request)
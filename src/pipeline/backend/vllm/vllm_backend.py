@@ -1,4 +1,3 @@
-import httpx
 import sys
 import os
 from emd.models.utils.constants import ModelType
@@ -44,11 +43,7 @@ class VLLMBackend(OpenAICompitableProxyBackendBase):
                 "accept": "application/json",
                 "Accept-Type": "application/json",
             }
-            response = httpx.post(
-                f'{self.base_url}/rerank',
-                json=request,
-                headers=headers
-            ).json()
+            response = self.post_json('rerank', request, headers=headers)
         else:
             # response = self.client.chat.completions.create(**request)
             response = self.openai_create_helper(self.client.chat.completions.create,request)
@@ -62,6 +57,12 @@ class VLLMBackend(OpenAICompitableProxyBackendBase):
     async def ainvoke(self, request):
         # Transform input to vllm format
         request = self._transform_request(request)
+        if self.model_type not in (ModelType.EMBEDDING, ModelType.RERANK) \
+                and self._use_streaming_passthrough(request):
+            return self._apassthrough_streaming_response(
+                self._streaming_passthrough_path(request),
+                request
+            )
         # Invoke vllm
         logger.info(f"Chat request:{request}")
         if self.model_type == ModelType.EMBEDDING:
@@ -73,11 +74,7 @@ class VLLMBackend(OpenAICompitableProxyBackendBase):
                 "accept": "application/json",
                 "Accept-Type": "application/json",
             }
-            response = httpx.post(
-                f'{self.base_url}/rerank',
-                json=request,
-                headers=headers
-            ).json()
+            response = await self.apost_json('rerank', request, headers=headers)
         else:
             response = await self.openai_create_helper(
                 self.async_client.chat.completions.create,
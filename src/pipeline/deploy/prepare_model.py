@@ -8,7 +8,8 @@ from emd.models import Model
 from emd.models.utils.constants import ServiceType,EngineType,ModelFilesDownloadSource
 from emd.utils.aws_service_utils import check_cn_region
 from emd.utils.logger_utils import get_logger
-from utils.common import upload_dir_to_s3_by_s5cmd,download_dir_from_s3_by_s5cmd
+from utils.common import upload_dir_to_s3_by_s5cmd
+from utils.model_fetch import download_model_dir_from_s3, write_manifest
 from emd.constants import EMD_MODELS_LOCAL_DIR_TEMPLATE,EMD_MODELS_S3_KEY_TEMPLATE
 from emd.utils.network_check import check_website_urllib
 
@@ -102,6 +103,8 @@ def download_comfyui_model(model,model_dir=None):
 def upload_model_to_s3(model:Model, model_s3_bucket):
     model_id = model.model_id
     model_dir =  EMD_MODELS_S3_KEY_TEMPLATE.format(model_id=model_id)  #f"emd_models/{model_id}"
+    # the serving container verifies the downloaded files against this manifest
+    write_manifest(model_dir)
     logger.info(f"Uploading {model_id} model to S3")
     upload_dir_to_s3_by_s5cmd(model_s3_bucket, model_dir)
 
@@ -154,7 +157,7 @@ def run(model:Model):#, model_s3_bucket, backend_type, service_type, region,args
             # donwload model files from s3 to local
             model_dir = EMD_MODELS_LOCAL_DIR_TEMPLATE.format(model_id=model.model_id)
             os.makedirs(model_dir, exist_ok=True)
-            download_dir_from_s3_by_s5cmd(
+            download_model_dir_from_s3(
                 local_dir=model_dir,
                 model_files_s3_path=model_files_s3_path
             )
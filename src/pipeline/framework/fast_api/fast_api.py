@@ -11,6 +11,10 @@ from fastapi.responses import JSONResponse, Response, StreamingResponse
 from emd.utils.logger_utils import get_logger
 from fastapi.concurrency import run_in_threadpool
 from emd.utils.framework_utils import get_model_specific_path
+from backend.backend import InferenceOverloadedError
+from utils.admission import AdmissionController, AdmissionRejectedError
+from utils.metrics import REGISTRY, REQUESTS_TOTAL
+from utils.response_cache import CACHE_BYPASS_HEADER
 
 model_id = os.environ.get("model_id")
 model_tag = os.environ.get("model_tag")
@@ -21,7 +25,8 @@ logger.info(f"model_tag: {model_tag}")
 # prevent logging ping
 class HealthCheckFilter(logging.Filter):
     def filter(self, record: logging.LogRecord) -> bool:
-        return record.getMessage().find("GET /ping") == -1 and record.getMessage().find("GET /health") == -1
+        return record.getMessage().find("GET /ping") == -1 and record.getMessage().find("GET /health") == -1 \
+            and record.getMessage().find("GET /metrics") == -1
 
 # Remove /credentials/health from application server logs
 logging.getLogger("uvicorn.access").addFilter(HealthCheckFilter())
@@ -48,29 +53,88 @@ def parse_args():
 
 app = FastAPI()
 engine = None
+admission_controller = None
 
 async def get_authorization(authorization: str = Header(None)):
     return authorization
 
-async def invoke(payload):
-    # generator = await run_in_threadpool(engine.invoke, payload)
-    generator = await engine.ainvoke(payload)
+class AdmittedStreamingResponse(StreamingResponse):
+    """
+    Keeps the admission slot until the whole stream is sent. The slot is
+    released when the response finishes, also if the client disconnects
+    before the body generator was ever iterated.
+    """
+    def __init__(self, content, release, **kwargs):
+        super().__init__(content=content, **kwargs)
+        self.release = release
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.release()
+
+async def invoke(payload, request: Request = None):
     stream = payload.get("stream",False)
+    route = request.url.path if request is not None else "/invocations"
+    use_cache = request is None or request.headers.get(CACHE_BYPASS_HEADER, "").lower() != "bypass"
+    if admission_controller is None or request is None:
+        # generator = await run_in_threadpool(engine.invoke, payload)
+        generator = await engine.ainvoke_with_metrics(payload, route, use_cache=use_cache)
+        if stream:
+            return StreamingResponse(content=generator,
+                                    media_type="text/event-stream")
+        return generator
+
+    await admission_controller.acquire(
+        route,
+        priority=admission_controller.parse_priority(request.headers),
+        max_queue_wait=admission_controller.parse_max_queue_wait(request.headers)
+    )
+    try:
+        generator = await engine.ainvoke_with_metrics(payload, route, use_cache=use_cache)
+    except BaseException:
+        admission_controller.release()
+        raise
     if stream:
-        return StreamingResponse(content=generator,
+        return AdmittedStreamingResponse(content=generator, release=admission_controller.release,
                                 media_type="text/event-stream")
-    else:
-        return generator
+    admission_controller.release()
+    return generator
+
+@app.exception_handler(InferenceOverloadedError)
+@app.exception_handler(AdmissionRejectedError)
+async def inference_overloaded_handler(request: Request, exc: Exception):
+    logger.warning(f"reject request: {exc}")
+    if isinstance(exc, AdmissionRejectedError):
+        # requests rejected by the engine are counted in BackendBase.ainvoke_with_metrics
+        REQUESTS_TOTAL.inc(route=request.url.path, status="rejected")
+    return JSONResponse(
+        content={"error": str(exc)},
+        status_code=exc.status_code,
+        headers={"Retry-After": "1"}
+    )
 
 # As sagemaker endpoint requires...
+# health checks run on the event loop, so they never wait for the inference thread pool
 @app.get("/ping")
-def ping():
+async def ping():
     return JSONResponse(content={}, status_code=status.HTTP_200_OK)
 
 @app.get("/health")
-def health():
+async def health():
     return "200 OK"
 
+@app.get("/metrics")
+async def metrics():
+    return Response(content=REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/admission")
+async def admission():
+    if admission_controller is None:
+        return {"enabled": False}
+    return {"enabled": True, **admission_controller.get_stats()}
+
 # As sagemaker endpoint requires...
 @app.post("/invocations")
 @app.post("/v1/invocations")
@@ -84,7 +148,7 @@ async def invocations(request: Request, authorization: str = Depends(get_authori
     payload = await request.json()
     # If the request does not have Authorization, invoke the payload
     if authorization is None:
-        return await invoke(payload)
+        return await invoke(payload, request)
     # If the request has extra_headers, add Authorization to it
     if "extra_headers" in payload and "Authorization" not in payload["extra_headers"]:
         payload["extra_headers"]["Authorization"] = authorization
@@ -92,11 +156,12 @@ async def invocations(request: Request, authorization: str = Depends(get_authori
     elif "extra_headers" not in payload:
         payload["extra_headers"] = { "Authorization": authorization }
 
-    return await invoke(payload)
+    return await invoke(payload, request)
 
 endpoints = {
     "ping": {"func": ping, "methods": ["GET"]},
     "health": {"func": health, "methods": ["GET"]},
+    "metrics": {"func": metrics, "methods": ["GET"]},
     # Note: The functions for the POST endpoints all use "invocations".
     "invocations": {"func": invocations, "methods": ["POST"]},
     "v1/invocations": {"func": invocations, "methods": ["POST"]},
@@ -147,6 +212,13 @@ if __name__ == "__main__":
     logger.info(f"executable_config:\n{execute_model.executable_config.model_dump()}")
     engine = execute_model.get_engine()
     framework = execute_model.executable_config.current_framework
+    if framework.admission_max_concurrency > 0:
+        admission_controller = AdmissionController(
+            max_concurrency=framework.admission_max_concurrency,
+            max_queue_size=framework.admission_max_queue_size,
+            max_queue_wait=framework.admission_max_queue_wait,
+            route_max_queue_size=framework.admission_route_max_queue_size
+        )
     engine.start()
     uvicorn.run(
         app,
@@ -0,0 +1,185 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Dict, List, Union
+
+from emd.utils.logger_utils import get_logger
+from utils.metrics import QUEUE_DEPTH, QUEUE_WAIT
+
+logger = get_logger(__name__)
+
+PRIORITY_HEADER = "x-emd-priority"
+MAX_QUEUE_WAIT_HEADER = "x-emd-max-queue-wait"
+SAGEMAKER_CUSTOM_ATTRIBUTES_HEADER = "x-amzn-sagemaker-custom-attributes"
+
+# lower value is served first
+PRIORITY_CLASSES = {
+    "high": 0,
+    "interactive": 0,
+    "normal": 1,
+    "low": 2,
+    "batch": 2,
+}
+DEFAULT_PRIORITY = "normal"
+
+
+class AdmissionRejectedError(Exception):
+    def __init__(self, reason, status_code=503):
+        self.status_code = status_code
+        super().__init__(reason)
+
+
+class _QueueStats:
+    __slots__ = ("admitted", "rejected", "timed_out", "wait_time_sum", "wait_time_max")
+
+    def __init__(self):
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.wait_time_sum = 0.0
+        self.wait_time_max = 0.0
+
+    def to_dict(self):
+        return {
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "wait_time_sum": self.wait_time_sum,
+            "wait_time_max": self.wait_time_max,
+        }
+
+
+class AdmissionController:
+    """
+    Admit at most `max_concurrency` requests to the engine at a time.
+
+    Requests above the limit wait in a priority queue shared by all routes,
+    each route may hold at most `max_queue_size` waiting requests (overridable
+    per route by `route_max_queue_size`). A waiting
+    request is rejected once its queue wait exceeds its budget, so a burst
+    gets fast errors instead of timing out together.
+    """
+    def __init__(
+            self,
+            max_concurrency: int,
+            max_queue_size: int = 100,
+            max_queue_wait: float = 30,
+            route_max_queue_size: Union[Dict[str, int], None] = None
+        ):
+        assert max_concurrency > 0, max_concurrency
+        self.max_concurrency = max_concurrency
+        self.max_queue_size = max_queue_size
+        self.route_max_queue_size = route_max_queue_size or {}
+        self.max_queue_wait = max_queue_wait
+        self.in_flight = 0
+        self._waiters: List[list] = []
+        self._counter = itertools.count()
+        self._queue_depth: Dict[str, int] = defaultdict(int)
+        self._stats: Dict[tuple, _QueueStats] = defaultdict(_QueueStats)
+        QUEUE_DEPTH.add_function(
+            lambda: {("admission", route): depth for route, depth in self._queue_depth.items()}
+        )
+
+    @staticmethod
+    def parse_priority(headers) -> str:
+        priority = headers.get(PRIORITY_HEADER)
+        if priority is None:
+            # sagemaker only forwards custom headers via CustomAttributes, e.g. "priority=high"
+            for attribute in (headers.get(SAGEMAKER_CUSTOM_ATTRIBUTES_HEADER) or "").split(","):
+                key, _, value = attribute.partition("=")
+                if key.strip().lower() == "priority":
+                    priority = value
+                    break
+        priority = (priority or DEFAULT_PRIORITY).strip().lower()
+        return priority if priority in PRIORITY_CLASSES else DEFAULT_PRIORITY
+
+    def parse_max_queue_wait(self, headers) -> float:
+        max_queue_wait = self.max_queue_wait
+        value = headers.get(MAX_QUEUE_WAIT_HEADER)
+        if value:
+            try:
+                # clients may only tighten the budget
+                max_queue_wait = min(max_queue_wait, float(value))
+            except ValueError:
+                pass
+        return max_queue_wait
+
+    @property
+    def queue_depth(self) -> Dict[str, int]:
+        return dict(self._queue_depth)
+
+    def get_stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "queue_depth": self.queue_depth,
+            "routes": [
+                {"route": route, "priority": priority, **stats.to_dict()}
+                for (route, priority), stats in self._stats.items()
+            ]
+        }
+
+    async def acquire(self, route: str, priority: str = DEFAULT_PRIORITY, max_queue_wait: Union[float, None] = None):
+        stats = self._stats[(route, priority)]
+        # a live waiter only exists while every slot is taken
+        if self.in_flight < self.max_concurrency:
+            self.in_flight += 1
+            stats.admitted += 1
+            QUEUE_WAIT.observe(0, route=route, priority=priority)
+            return
+
+        if self._queue_depth[route] >= self.route_max_queue_size.get(route, self.max_queue_size):
+            stats.rejected += 1
+            raise AdmissionRejectedError(
+                f"queue of route {route} is full, queue depth: {self._queue_depth[route]}"
+            )
+
+        max_queue_wait = self.max_queue_wait if max_queue_wait is None else max_queue_wait
+        future = asyncio.get_running_loop().create_future()
+        waiter = [PRIORITY_CLASSES[priority], next(self._counter), future, route]
+        heapq.heappush(self._waiters, waiter)
+        self._queue_depth[route] += 1
+        t0 = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=max_queue_wait)
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                # the slot was handed over right at the deadline, give it back
+                self.release()
+            else:
+                future.cancel()
+            stats.timed_out += 1
+            raise AdmissionRejectedError(f"queue wait exceeded {max_queue_wait}s")
+        except BaseException:
+            if future.done() and not future.cancelled():
+                self.release()
+            else:
+                future.cancel()
+            raise
+        finally:
+            self._queue_depth[route] -= 1
+        wait_time = time.perf_counter() - t0
+        stats.admitted += 1
+        stats.wait_time_sum += wait_time
+        stats.wait_time_max = max(stats.wait_time_max, wait_time)
+        QUEUE_WAIT.observe(wait_time, route=route, priority=priority)
+
+    def release(self):
+        # hand the slot to the highest priority waiter that is still waiting
+        while self._waiters:
+            _, _, future, _ = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.in_flight -= 1
+
+    @asynccontextmanager
+    async def admit(self, route: str, priority: str = DEFAULT_PRIORITY, max_queue_wait: Union[float, None] = None):
+        await self.acquire(route, priority, max_queue_wait)
+        try:
+            yield
+        finally:
+            self.release()
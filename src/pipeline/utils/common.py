@@ -34,14 +34,6 @@ def download_dir_from_s3(bucket_name, remote_dir_name):
             os.makedirs(os.path.dirname(obj.key))
         bucket.download_file(obj.key, obj.key)
 
-def download_dir_from_s3_by_s5cmd(local_dir,bucket_name=None, s3_key=None,model_files_s3_path=None):
-    if model_files_s3_path is None:
-        assert bucket_name and s3_key,(bucket_name,s3_key)
-        model_files_s3_path = f"s3://{bucket_name}/{s3_key}"
-
-    logger.info(f"Downloading model files from {model_files_s3_path}")
-    assert os.system(f"./s5cmd cp {model_files_s3_path}/* {local_dir}") == 0
-
 def download_file_from_s3_by_s5cmd(s3_file_path, local_file_path):
     """
     Download a file from S3 using s5cmd.
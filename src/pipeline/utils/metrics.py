@@ -0,0 +1,191 @@
+"""
+Minimal Prometheus text-format metrics for the serving container.
+All backends share the metrics defined at the bottom of this module, so every
+engine reports the same names.
+"""
+import bisect
+import threading
+from typing import Callable, Dict, List, Tuple, Union
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+TOKEN_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 1, 2.5)
+
+
+def _format_labels(label_names: Tuple[str, ...], label_values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    metric_type = ""
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _label_values(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def collect(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+            *self.collect()
+        ]
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, value: float = 1, **labels):
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Gauge(_Metric):
+    metric_type = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._functions: List[Callable[[], Union[float, Dict[Tuple[str, ...], float]]]] = []
+
+    def set(self, value: float, **labels):
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, value: float = 1, **labels):
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def dec(self, value: float = 1, **labels):
+        self.inc(-value, **labels)
+
+    def add_function(self, fn: Callable[[], Union[float, Dict[Tuple[str, ...], float]]]):
+        """`fn` is called at scrape time, it returns a value or a {label values: value} dict."""
+        self._functions.append(fn)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        for fn in self._functions:
+            result = fn()
+            if isinstance(result, dict):
+                values.update(result)
+            else:
+                values[()] = result
+        return [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+            for key, value in values.items()
+        ]
+
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(self, *args, buckets=DEFAULT_LATENCY_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # label values -> [bucket counts..., sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._label_values(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * len(self.buckets) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(counts)) for key, counts in self._values.items()]
+        lines = []
+        for key, counts in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.label_names, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(counts[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+REQUESTS_TOTAL = REGISTRY.register(Counter(
+    "emd_requests_total", "Number of inference requests.", ("route", "status")
+))
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    "emd_request_latency_seconds", "End-to-end request latency, including the whole stream.", ("route",)
+))
+TIME_TO_FIRST_TOKEN = REGISTRY.register(Histogram(
+    "emd_time_to_first_token_seconds", "Time to the first streamed event.", ("route",)
+))
+INTER_TOKEN_LATENCY = REGISTRY.register(Histogram(
+    "emd_inter_token_latency_seconds", "Time between consecutive streamed events.", ("route",),
+    buckets=TOKEN_LATENCY_BUCKETS
+))
+PROMPT_TOKENS = REGISTRY.register(Counter(
+    "emd_prompt_tokens_total", "Number of input tokens reported by the engine.", ("route",)
+))
+COMPLETION_TOKENS = REGISTRY.register(Counter(
+    "emd_completion_tokens_total", "Number of output tokens reported by the engine.", ("route",)
+))
+STREAM_CHUNKS = REGISTRY.register(Counter(
+    "emd_stream_chunks_total", "Number of streamed events (SSE or NDJSON lines) sent to clients.", ("route",)
+))
+REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "emd_requests_in_flight", "Number of requests being processed by the engine.", ("route",)
+))
+QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "emd_queue_depth", "Number of requests waiting in a serving queue.", ("queue", "route")
+))
+QUEUE_WAIT = REGISTRY.register(Histogram(
+    "emd_queue_wait_seconds", "Time requests spent waiting for admission.", ("route", "priority")
+))
@@ -0,0 +1,114 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from emd.utils.logger_utils import get_logger
+
+logger = get_logger(__name__)
+
+
+class _PendingRequest:
+    __slots__ = ("items", "future", "enqueue_time")
+
+    def __init__(self, items: list, future: asyncio.Future):
+        self.items = items
+        self.future = future
+        self.enqueue_time = time.perf_counter()
+
+
+class _Bucket:
+    __slots__ = ("requests", "size", "timer")
+
+    def __init__(self):
+        self.requests: List[_PendingRequest] = []
+        self.size = 0
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent requests into a single batched call.
+
+    Requests are grouped into buckets by `key` (e.g. the encode kwargs), a bucket
+    is flushed once it holds `max_batch_size` items or its oldest request has
+    waited `max_wait_ms`. `batch_fn(key, items)` runs in `executor` and must
+    return one result per item; results are scattered back to each caller in
+    the order of its own items. Batches run one at a time unless `executor`
+    has several workers, `batch_fn` must then be safe to call from several
+    threads.
+    """
+    def __init__(
+        self,
+        batch_fn: Callable[[Hashable, list], list],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5,
+        executor: Optional[Executor] = None
+    ):
+        assert max_batch_size > 0, max_batch_size
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max(max_wait_ms, 0) / 1000
+        # by default a single worker keeps batches for the same model serialized
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix="micro-batcher"
+        )
+        self._buckets: Dict[Hashable, _Bucket] = {}
+
+    async def submit(self, key: Hashable, items: list) -> list:
+        if not items:
+            return []
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket()
+        bucket.requests.append(_PendingRequest(list(items), future))
+        bucket.size += len(items)
+
+        if bucket.size >= self.max_batch_size:
+            self._flush(key)
+        elif bucket.timer is None:
+            bucket.timer = loop.call_later(self.max_wait, self._flush, key)
+        return await future
+
+    def _flush(self, key: Hashable):
+        bucket = self._buckets.pop(key, None)
+        if bucket is None:
+            return
+        if bucket.timer is not None:
+            bucket.timer.cancel()
+        asyncio.ensure_future(self._run_batch(key, bucket.requests))
+
+    async def _run_batch(self, key: Hashable, requests: List[_PendingRequest]):
+        items = [item for request in requests for item in request.items]
+        loop = asyncio.get_running_loop()
+        t0 = time.perf_counter()
+        try:
+            results = await loop.run_in_executor(
+                self.executor,
+                self.batch_fn,
+                key,
+                items
+            )
+            if len(results) != len(items):
+                raise RuntimeError(
+                    f"batch_fn returned {len(results)} results for {len(items)} items"
+                )
+        except Exception as e:
+            for request in requests:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+
+        logger.info(
+            f"micro batch done, key: {key}, requests: {len(requests)}, items: {len(items)}, "
+            f"max queue wait: {t0 - requests[0].enqueue_time:.4f}s, elapsed time: {time.perf_counter()-t0:.4f}s"
+        )
+        offset = 0
+        for request in requests:
+            n = len(request.items)
+            if not request.future.done():
+                request.future.set_result(results[offset:offset+n])
+            offset += n
@@ -0,0 +1,295 @@
+"""
+Parallel, resumable download of model files from S3.
+
+`upload_model_to_s3` writes a manifest (size and sha256 per file) next to the
+model files. On the serving side `download_model_dir_from_s3` splits every
+object into ranged GETs that run on one bounded thread pool, records finished
+parts so a restarted container only fetches what is missing, skips files that
+are already present and match the manifest, and verifies the sha256 of the
+files it downloaded. The download state is kept in a sibling directory
+(`<local_dir>.emd_download`), so the model directory only holds model files.
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Union
+
+import boto3
+from botocore.config import Config
+from emd.utils.logger_utils import get_logger
+
+logger = get_logger(__name__)
+
+MANIFEST_FILE_NAME = "emd_manifest.json"
+DOWNLOAD_STATE_DIR_SUFFIX = ".emd_download"
+DOWNLOAD_STATE_FILE_NAME = "download_state.json"
+PARTS_FILE_SUFFIX = ".emd_parts"
+
+DEFAULT_MAX_WORKERS = int(os.environ.get("EMD_MODEL_DOWNLOAD_WORKERS", 64))
+DEFAULT_PART_SIZE = int(os.environ.get("EMD_MODEL_DOWNLOAD_PART_SIZE_MB", 64)) * 1024 * 1024
+DEFAULT_VERIFY = os.environ.get("EMD_MODEL_DOWNLOAD_VERIFY", "1") == "1"
+HASH_BLOCK_SIZE = 8 * 1024 * 1024
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+def sha256_file(path: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def _write_json(path: str, data: dict):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: str) -> Union[dict, None]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def build_manifest(local_dir: str, max_workers: int = 8) -> dict:
+    paths = []
+    for root, _, files in os.walk(local_dir):
+        for file in files:
+            path = os.path.join(root, file)
+            rel_path = os.path.relpath(path, local_dir)
+            if rel_path == MANIFEST_FILE_NAME:
+                continue
+            paths.append((rel_path, path))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        digests = pool.map(lambda item: sha256_file(item[1]), paths)
+        files = {
+            rel_path: {"size": os.path.getsize(path), "sha256": digest}
+            for (rel_path, path), digest in zip(paths, digests)
+        }
+    return {"version": 1, "files": files}
+
+
+def write_manifest(local_dir: str) -> str:
+    t0 = time.time()
+    manifest = build_manifest(local_dir)
+    manifest_path = os.path.join(local_dir, MANIFEST_FILE_NAME)
+    _write_json(manifest_path, manifest)
+    logger.info(f"model manifest written to {manifest_path}, files: {len(manifest['files'])}, elapsed time: {time.time()-t0:.1f}s")
+    return manifest_path
+
+
+def get_download_state_dir(local_dir: str) -> str:
+    return os.path.normpath(os.path.abspath(local_dir)) + DOWNLOAD_STATE_DIR_SUFFIX
+
+
+def parse_s3_uri(s3_uri: str):
+    assert s3_uri.startswith("s3://"), s3_uri
+    bucket, _, prefix = s3_uri[len("s3://"):].partition("/")
+    return bucket, prefix.strip("/")
+
+
+class _FileTask:
+    def __init__(self, rel_path, key, size, etag, sha256, local_path, parts_path, part_size):
+        self.rel_path = rel_path
+        self.key = key
+        self.size = size
+        self.etag = etag
+        self.sha256 = sha256
+        self.local_path = local_path
+        self.parts_path = parts_path
+        self.part_size = part_size
+        self.part_num = max((size + part_size - 1) // part_size, 1)
+        self.done_parts = set()
+        self.lock = threading.Lock()
+
+    def part_range(self, index):
+        start = index * self.part_size
+        return start, min(start + self.part_size, self.size) - 1
+
+    def prepare(self):
+        """Resume from the recorded parts if the object did not change, otherwise start over."""
+        os.makedirs(os.path.dirname(self.local_path) or ".", exist_ok=True)
+        os.makedirs(os.path.dirname(self.parts_path), exist_ok=True)
+        parts = _read_json(self.parts_path)
+        if parts and parts.get("etag") == self.etag and parts.get("size") == self.size \
+                and os.path.exists(self.local_path) and os.path.getsize(self.local_path) == self.size:
+            self.done_parts = set(parts.get("done", []))
+            return
+        with open(self.local_path, "wb") as f:
+            f.truncate(self.size)
+        self.done_parts = set()
+        self.save_parts()
+
+    def save_parts(self):
+        _write_json(self.parts_path, {"etag": self.etag, "size": self.size, "done": sorted(self.done_parts)})
+
+    @property
+    def remaining_parts(self):
+        return [i for i in range(self.part_num) if i not in self.done_parts]
+
+
+class ModelFetcher:
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS, part_size: int = DEFAULT_PART_SIZE, verify: bool = DEFAULT_VERIFY):
+        self.max_workers = max_workers
+        self.part_size = part_size
+        self.verify = verify
+        self.s3 = boto3.client(
+            "s3",
+            config=Config(
+                max_pool_connections=max_workers,
+                retries={"max_attempts": 10, "mode": "adaptive"}
+            )
+        )
+        self._state_lock = threading.Lock()
+        self._downloaded_bytes = 0
+
+    def _list_objects(self, bucket: str, prefix: str) -> Dict[str, dict]:
+        objects = {}
+        paginator = self.s3.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=bucket, Prefix=f"{prefix}/" if prefix else ""):
+            for obj in page.get("Contents", []):
+                rel_path = obj["Key"][len(prefix):].lstrip("/") if prefix else obj["Key"]
+                if not rel_path or rel_path.endswith("/"):
+                    continue
+                objects[rel_path] = {"key": obj["Key"], "size": obj["Size"], "etag": obj["ETag"]}
+        return objects
+
+    def _load_manifest(self, bucket: str, prefix: str) -> dict:
+        key = f"{prefix}/{MANIFEST_FILE_NAME}" if prefix else MANIFEST_FILE_NAME
+        try:
+            body = self.s3.get_object(Bucket=bucket, Key=key)["Body"].read()
+        except self.s3.exceptions.NoSuchKey:
+            logger.info(f"no manifest found at s3://{bucket}/{key}, files will not be verified")
+            return {}
+        return json.loads(body).get("files", {})
+
+    def _is_up_to_date(self, task: _FileTask, state: dict) -> bool:
+        if not os.path.exists(task.local_path) or os.path.getsize(task.local_path) != task.size \
+                or os.path.exists(task.parts_path):
+            return False
+        record = state.get(task.rel_path)
+        if record is not None:
+            return record.get("etag") == task.etag
+        # present from an earlier download without state, e.g. by s5cmd
+        return task.sha256 is not None and sha256_file(task.local_path) == task.sha256
+
+    def _download_part(self, bucket: str, task: _FileTask, index: int):
+        start, end = task.part_range(index)
+        response = self.s3.get_object(
+            Bucket=bucket,
+            Key=task.key,
+            Range=f"bytes={start}-{end}",
+            IfMatch=task.etag
+        )
+        with open(task.local_path, "r+b") as f:
+            f.seek(start)
+            for chunk in response["Body"].iter_chunks(READ_CHUNK_SIZE):
+                f.write(chunk)
+                with self._state_lock:
+                    self._downloaded_bytes += len(chunk)
+        with task.lock:
+            task.done_parts.add(index)
+            task.save_parts()
+            return len(task.done_parts) == task.part_num
+
+    def _finish_file(self, task: _FileTask, state: dict, state_path: str):
+        if self.verify and task.sha256 is not None:
+            digest = sha256_file(task.local_path)
+            if digest != task.sha256:
+                os.remove(task.parts_path)
+                raise RuntimeError(
+                    f"sha256 mismatch for {task.rel_path}, expected: {task.sha256}, got: {digest}"
+                )
+        os.remove(task.parts_path)
+        with self._state_lock:
+            state[task.rel_path] = {"etag": task.etag, "size": task.size}
+            _write_json(state_path, state)
+
+    def download(self, s3_uri: str, local_dir: str):
+        t0 = time.time()
+        bucket, prefix = parse_s3_uri(s3_uri)
+        os.makedirs(local_dir, exist_ok=True)
+        objects = self._list_objects(bucket, prefix)
+        if not objects:
+            raise RuntimeError(f"no model files found at {s3_uri}")
+        manifest = self._load_manifest(bucket, prefix)
+        state_dir = get_download_state_dir(local_dir)
+        os.makedirs(state_dir, exist_ok=True)
+        state_path = os.path.join(state_dir, DOWNLOAD_STATE_FILE_NAME)
+        state = _read_json(state_path) or {}
+
+        tasks = []
+        skipped_bytes = 0
+        for rel_path, obj in objects.items():
+            if rel_path == MANIFEST_FILE_NAME:
+                continue
+            expected = manifest.get(rel_path, {})
+            if expected and expected.get("size") != obj["size"]:
+                raise RuntimeError(f"size of {rel_path} does not match the manifest: {obj['size']} != {expected.get('size')}")
+            task = _FileTask(
+                rel_path,
+                obj["key"],
+                obj["size"],
+                obj["etag"],
+                expected.get("sha256"),
+                os.path.join(local_dir, rel_path),
+                os.path.join(state_dir, rel_path + PARTS_FILE_SUFFIX),
+                self.part_size
+            )
+            if self._is_up_to_date(task, state):
+                skipped_bytes += task.size
+                continue
+            task.prepare()
+            tasks.append(task)
+
+        total_bytes = sum(task.size for task in tasks)
+        logger.info(
+            f"downloading {len(tasks)} files ({total_bytes/1024**3:.2f} GiB) from {s3_uri} to {local_dir}, "
+            f"skipped {len(objects)-len(tasks)} files ({skipped_bytes/1024**3:.2f} GiB) already present"
+        )
+        last_report_time = time.time()
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="model-fetch") as pool:
+            futures = {}
+            for task in tasks:
+                if task.size == 0 or not task.remaining_parts:
+                    self._finish_file(task, state, state_path)
+                    continue
+                for index in task.remaining_parts:
+                    futures[pool.submit(self._download_part, bucket, task, index)] = task
+            try:
+                for future in as_completed(futures):
+                    if future.result():
+                        self._finish_file(futures[future], state, state_path)
+                    if time.time() - last_report_time > 10:
+                        last_report_time = time.time()
+                        elapsed = last_report_time - t0
+                        logger.info(
+                            f"downloaded {self._downloaded_bytes/1024**3:.2f} GiB, "
+                            f"{self._downloaded_bytes/1024**2/elapsed:.1f} MiB/s"
+                        )
+            except BaseException:
+                # fail on the first error, parts in flight finish and are recorded for the next attempt
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+
+        elapsed = time.time() - t0
+        logger.info(
+            f"model files downloaded, bytes: {self._downloaded_bytes}, elapsed time: {elapsed:.1f}s, "
+            f"throughput: {self._downloaded_bytes/1024**2/max(elapsed, 1e-6):.1f} MiB/s"
+        )
+
+
+def download_model_dir_from_s3(local_dir, bucket_name=None, s3_key=None, model_files_s3_path=None):
+    if model_files_s3_path is None:
+        assert bucket_name and s3_key, (bucket_name, s3_key)
+        model_files_s3_path = f"s3://{bucket_name}/{s3_key}"
+    logger.info(f"Downloading model files from {model_files_s3_path}")
+    ModelFetcher().download(model_files_s3_path, local_dir)
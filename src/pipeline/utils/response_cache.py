@@ -0,0 +1,74 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Union
+
+from utils.metrics import REGISTRY, Counter, Gauge
+
+CACHE_BYPASS_HEADER = "x-emd-cache"
+
+RESPONSE_CACHE_REQUESTS = REGISTRY.register(Counter(
+    "emd_response_cache_requests_total", "Response cache lookups.", ("result",)
+))
+RESPONSE_CACHE_BYTES = REGISTRY.register(Gauge(
+    "emd_response_cache_bytes", "Estimated size of the response cache."
+))
+
+
+def make_cache_key(*parts) -> str:
+    # canonical json, so the key does not depend on the key order of the payload
+    data = json.dumps(parts, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def estimate_size(value: Any) -> int:
+    if isinstance(value, list) and value and isinstance(value[0], float):
+        # embedding vectors are the common case, skip the json round trip
+        return 8 * len(value) + 64
+    return len(json.dumps(value, separators=(",", ":"), default=str)) + 64
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache with a TTL per entry and a total memory budget in bytes.
+    """
+    def __init__(self, max_bytes: int, ttl: float = 3600):
+        assert max_bytes > 0, max_bytes
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.current_bytes = 0
+        # key -> (expire_at, size, value)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        RESPONSE_CACHE_BYTES.add_function(lambda: self.current_bytes)
+
+    def get(self, key: str) -> Union[Any, None]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                self._pop(key)
+                entry = None
+            if entry is None:
+                RESPONSE_CACHE_REQUESTS.inc(result="miss")
+                return None
+            self._entries.move_to_end(key)
+        RESPONSE_CACHE_REQUESTS.inc(result="hit")
+        return entry[2]
+
+    def put(self, key: str, value: Any, size: Union[int, None] = None):
+        size = estimate_size(value) if size is None else size
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, size, value)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+
+    def _pop(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self.current_bytes -= size
@@ -20,6 +20,8 @@ def extract_models():
     try:
         from emd.models import Model
 
+        # emd.models only imports the model families on demand
+        Model.load_all_models()
         models = {}
         for model_id, model in Model.model_map.items():
             try:
@@ -0,0 +1,38 @@
+import argparse
+import importlib
+import json
+from emd.models import Model
+from emd.models.model import MODEL_INDEX_PATH
+
+
+def generate_model_index():
+    model_index = {}
+    for module_name in Model.iter_model_modules():
+        model_ids = set(Model.model_map)
+        importlib.import_module(module_name)
+        for model_id, model in Model.model_map.items():
+            if model_id in model_ids:
+                continue
+            model_index[model_id] = {
+                "module": module_name,
+                "model_type": model.model_type,
+                "model_series": model.model_series.model_series_name if model.model_series else None,
+            }
+    return model_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate the model index used to load models on demand')
+    parser.add_argument('-o', '--output', default=MODEL_INDEX_PATH,
+                      help='Output file path')
+
+    args = parser.parse_args()
+
+    model_index = generate_model_index()
+    with open(args.output, 'w') as f:
+        json.dump(model_index, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+
+
+if __name__ == '__main__':
+    main()
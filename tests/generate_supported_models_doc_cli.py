@@ -5,6 +5,7 @@ from emd.models.utils.constants import CUSTOM_DOCKER_MODEL_ID
 
 
 def generate_model_table():
+    Model.load_all_models()
     model_infos = []
     for _, model in Model.model_map.items():
         if model.model_id == CUSTOM_DOCKER_MODEL_ID:
@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from utils.admission import AdmissionController, AdmissionRejectedError
+
+
+async def hold(controller, route, priority="normal", max_queue_wait=None, order=None, release=None):
+    async with controller.admit(route, priority, max_queue_wait):
+        if order is not None:
+            order.append(priority)
+        if release is not None:
+            await release.wait()
+
+
+def test_waiters_are_served_by_priority():
+    async def run():
+        controller = AdmissionController(max_concurrency=1)
+        release = asyncio.Event()
+        order = []
+        holder = asyncio.create_task(hold(controller, "chat", release=release))
+        await asyncio.sleep(0)
+        waiters = []
+        for priority in ("low", "normal", "high", "normal"):
+            waiters.append(asyncio.create_task(hold(controller, "chat", priority, order=order)))
+            await asyncio.sleep(0)
+        assert controller.queue_depth == {"chat": 4}
+        release.set()
+        await asyncio.gather(holder, *waiters)
+        assert order == ["high", "normal", "normal", "low"]
+        assert controller.in_flight == 0
+
+    asyncio.run(run())
+
+
+def test_waiter_is_rejected_after_max_queue_wait():
+    async def run():
+        controller = AdmissionController(max_concurrency=1, max_queue_wait=10)
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold(controller, "chat", release=release))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejectedError, match="queue wait exceeded"):
+            await controller.acquire("chat", max_queue_wait=0.05)
+        assert controller.queue_depth == {"chat": 0}
+        release.set()
+        await holder
+        # the expired waiter does not take the released slot
+        assert controller.in_flight == 0
+        stats = {(route["route"], route["priority"]): route for route in controller.get_stats()["routes"]}
+        assert stats[("chat", "normal")]["timed_out"] == 1
+
+    asyncio.run(run())
+
+
+def test_queue_limit_is_per_route():
+    async def run():
+        controller = AdmissionController(max_concurrency=1, max_queue_size=1, route_max_queue_size={"embeddings": 2})
+        release = asyncio.Event()
+        tasks = [asyncio.create_task(hold(controller, "chat", release=release))]
+        await asyncio.sleep(0)
+        for route in ("chat", "embeddings", "embeddings"):
+            tasks.append(asyncio.create_task(hold(controller, route)))
+            await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejectedError) as e:
+            await controller.acquire("chat")
+        assert e.value.status_code == 503
+        with pytest.raises(AdmissionRejectedError):
+            await controller.acquire("embeddings")
+        assert controller.queue_depth == {"chat": 1, "embeddings": 2}
+        release.set()
+        await asyncio.gather(*tasks)
+        assert controller.in_flight == 0
+
+    asyncio.run(run())
+
+
+def test_parse_priority_and_max_queue_wait():
+    controller = AdmissionController(max_concurrency=1, max_queue_wait=30)
+    assert controller.parse_priority({"x-emd-priority": "HIGH"}) == "high"
+    assert controller.parse_priority({"x-amzn-sagemaker-custom-attributes": "a=b, priority=batch"}) == "batch"
+    assert controller.parse_priority({"x-emd-priority": "urgent"}) == "normal"
+    assert controller.parse_max_queue_wait({"x-emd-max-queue-wait": "5"}) == 5
+    # clients may only tighten the budget
+    assert controller.parse_max_queue_wait({"x-emd-max-queue-wait": "60"}) == 30
+    assert controller.parse_max_queue_wait({"x-emd-max-queue-wait": "soon"}) == 30
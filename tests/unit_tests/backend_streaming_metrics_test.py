@@ -0,0 +1,73 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from backend.backend import BackendBase
+from utils.metrics import COMPLETION_TOKENS, INTER_TOKEN_LATENCY, PROMPT_TOKENS, STREAM_CHUNKS, TIME_TO_FIRST_TOKEN
+
+EVENTS = [b'{"choices":[{"delta":{"content":"%d"}}]}' % i for i in range(5)]
+SSE_STREAM = b"".join(b"data: " + event + b"\r\n\r\n" for event in EVENTS) + b"data: [DONE]\r\n\r\n"
+
+
+class Backend(BackendBase):
+    def start(self):
+        pass
+
+    def invoke(self, request):
+        pass
+
+
+def stream_through_metrics(chunks, route):
+    backend = object.__new__(Backend)
+
+    async def generate():
+        for chunk in chunks:
+            yield chunk
+
+    async def read():
+        return [chunk async for chunk in backend._instrument_streaming_response(generate(), route, time.perf_counter())]
+
+    return asyncio.run(read())
+
+
+def histogram_count(histogram, route):
+    return sum(histogram._values[(route,)][:-1])
+
+
+@pytest.mark.parametrize("size", [1, 7, 64, len(SSE_STREAM)])
+def test_passthrough_byte_chunks_are_counted_per_event(size):
+    route = f"/passthrough/{size}"
+    chunks = [SSE_STREAM[i:i + size] for i in range(0, len(SSE_STREAM), size)]
+    assert stream_through_metrics(chunks, route) == chunks
+    assert STREAM_CHUNKS._values[(route,)] == len(EVENTS)
+    assert histogram_count(TIME_TO_FIRST_TOKEN, route) == 1
+    assert histogram_count(INTER_TOKEN_LATENCY, route) == len(EVENTS) - 1
+
+
+def test_formatted_chunks_are_counted_per_event():
+    route = "/formatted"
+    # one event per chunk, as the backends format them for sagemaker (ndjson) and http (sse)
+    chunks = [event.decode() + "\n" for event in EVENTS[:2]] + ["data: " + event.decode() + "\n\n" for event in EVENTS[2:]]
+    stream_through_metrics(chunks, route)
+    assert STREAM_CHUNKS._values[(route,)] == len(EVENTS)
+
+
+def test_stream_usage_is_counted_from_the_last_chunk():
+    route = "/usage"
+    usage = b'{"choices":[],"usage":{"prompt_tokens":11,"completion_tokens":5,"total_tokens":16}}'
+    stream = SSE_STREAM.replace(b"data: [DONE]", b"data: " + usage + b"\r\n\r\ndata: [DONE]")
+    stream_through_metrics([stream[i:i + 10] for i in range(0, len(stream), 10)], route)
+    assert PROMPT_TOKENS._values[(route,)] == 11
+    assert COMPLETION_TOKENS._values[(route,)] == 5
+
+
+def test_stream_without_usage_counts_content_chunks():
+    route = "/no-usage"
+    role = b'data: {"choices":[{"delta":{"role":"assistant","content":""}}]}\n\n'
+    stream_through_metrics([role, SSE_STREAM], route)
+    assert (route,) not in PROMPT_TOKENS._values
+    assert COMPLETION_TOKENS._values[(route,)] == len(EVENTS)
@@ -0,0 +1,22 @@
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from common import LoadStep
+
+
+@pytest.mark.parametrize("start_rate,end_rate", [(0, 10), (10, 0), (4, 4), (2, 8)])
+def test_load_step_time_at_inverts_the_integrated_rate(start_rate, end_rate):
+    step = LoadStep(start_rate, end_rate, duration=10)
+    slope = (end_rate - start_rate) / 10
+    for count in (1, 5, 20):
+        elapsed = step.time_at(count)
+        assert elapsed is not None and 0 <= elapsed < 10
+        assert start_rate * elapsed + slope * elapsed ** 2 / 2 == pytest.approx(count)
+    # the step only holds (start_rate + end_rate) / 2 * duration requests
+    assert step.time_at((start_rate + end_rate) / 2 * 10 + 1) is None
+
+
+def test_load_step_time_at_with_zero_rate():
+    assert LoadStep(0, 0, duration=10).time_at(1) is None
+    assert LoadStep(0, 10, duration=10).time_at(0) == 0
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from metrics import LatencyHistogram, RequestRecords
+
+
+@pytest.mark.parametrize("p", [50, 90, 99, 99.9])
+def test_histogram_percentiles_are_within_precision(p):
+    values = np.random.default_rng(0).lognormal(mean=-3, sigma=1, size=20000)
+    histogram = LatencyHistogram(precision=0.01)
+    histogram.record_many(values)
+    exact = np.sort(values)[int(np.ceil(p / 100 * values.size)) - 1]
+    assert histogram.percentile(p) == pytest.approx(exact, rel=0.01)
+    assert histogram.count == values.size
+    assert histogram.mean == pytest.approx(values.mean())
+
+
+def test_histogram_delta_and_merge():
+    first, second = np.linspace(0.01, 0.1, 100), np.linspace(0.2, 2, 50)
+    histogram = LatencyHistogram()
+    histogram.record_many(first)
+    previous = histogram.copy()
+    histogram.record_many(second)
+
+    delta = histogram.delta(previous)
+    assert delta.count == second.size
+    assert delta.total == pytest.approx(second.sum())
+    assert delta.percentile(50) == pytest.approx(np.median(second), rel=0.02)
+
+    merged = previous.copy().merge(delta)
+    assert np.array_equal(merged.counts, histogram.counts)
+    assert merged.count == histogram.count
+    with pytest.raises(ValueError):
+        histogram.merge(LatencyHistogram(precision=0.05))
+
+
+def test_empty_histogram():
+    histogram = LatencyHistogram()
+    histogram.record_many([])
+    assert histogram.percentile(50) is None
+    assert histogram.summary()["count"] == 0
+
+
+def test_request_records_summary_since():
+    records = RequestRecords(capacity=2)
+    for i in range(5):
+        records.append(start_time=float(i), e2e=float(i), status=200 if i != 3 else 503)
+    summary = records.summary(since=2)
+    assert (summary["requests"], summary["successful"]) == (3, 2)
+    assert summary["e2e"]["mean"] == 3
+
+
+def test_collector_throughput_is_measured_over_the_session_window():
+    pytest.importorskip("aiohttp")
+    from common import MetricsCollector
+
+    collector = MetricsCollector(None, session_time=6, warmup=2)
+    collector.session_start = 1000.0
+    collector.session_end = 1008.0
+    # one request during the warmup, the measured ones all start right after it
+    collector.collect_request(1001.0, 200, ttft=0.1, e2e=0.5, itls=[0.01], output_tokens=10)
+    for i in range(6):
+        collector.collect_request(1002.0 + i / 1000, 200, ttft=0.1, e2e=0.5, itls=[0.02], output_tokens=10)
+    summary = collector.summary()
+    assert summary["duration"] == 6
+    assert summary["requests"] == 6
+    assert summary["request_throughput"] == pytest.approx(1.0)
+    assert summary["output_token_throughput"] == pytest.approx(10.0)
+    # the inter-token latencies of the warmup request are left out too
+    assert summary["itl"]["count"] == 6
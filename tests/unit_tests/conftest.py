@@ -0,0 +1,10 @@
+import os
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "src")
+
+# the serving container and the benchmark tools import their modules by absolute name
+for path in ("", "pipeline", "benchmark"):
+    path = os.path.abspath(os.path.join(SRC_DIR, path))
+    if path not in sys.path:
+        sys.path.insert(0, path)
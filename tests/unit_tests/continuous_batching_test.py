@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from backend.huggingface.llm.continuous_batching import ContinuousBatchingScheduler
+
+EOS_TOKEN_ID = 2
+
+
+class WordTokenizer:
+    eos_token_id = EOS_TOKEN_ID
+
+    def decode(self, token_ids, skip_special_tokens=True):
+        return "".join(f" t{i}" for i in token_ids if not (skip_special_tokens and i == EOS_TOKEN_ID))
+
+
+@pytest.fixture(scope="module")
+def model():
+    torch.manual_seed(0)
+    config = transformers.LlamaConfig(
+        vocab_size=128,
+        hidden_size=32,
+        intermediate_size=64,
+        num_hidden_layers=2,
+        num_attention_heads=4,
+        num_key_value_heads=2,
+        max_position_embeddings=256,
+        eos_token_id=EOS_TOKEN_ID,
+    )
+    # float64 so that padding does not flip an argmax between close logits
+    return transformers.LlamaForCausalLM(config).double().eval()
+
+
+def generate_reference(model, prompt_ids, max_new_tokens):
+    with torch.no_grad():
+        output_ids = model.generate(
+            torch.tensor([prompt_ids]),
+            attention_mask=torch.ones((1, len(prompt_ids)), dtype=torch.long),
+            max_new_tokens=max_new_tokens,
+            do_sample=False,
+            pad_token_id=0,
+        )[0, len(prompt_ids):].tolist()
+    return WordTokenizer().decode(output_ids), len(output_ids)
+
+
+async def generate_batched(scheduler, prompt_ids, max_new_tokens, delay):
+    # later requests join the batch while earlier ones are decoding
+    await asyncio.sleep(delay)
+    text, finish_reason, num_tokens = "", None, 0
+    async for delta, finish_reason, num_tokens in scheduler.generate(
+        prompt_ids, {"max_new_tokens": max_new_tokens, "do_sample": False}
+    ):
+        text += delta
+    return text, num_tokens, finish_reason
+
+
+def test_greedy_output_matches_generate(model):
+    prompts = [
+        ([5, 17, 33, 9], 24),
+        ([12, 40, 7, 7, 91, 3, 64, 21, 8, 100, 45], 8),
+        ([77], 16),
+        ([30, 31, 32, 33, 34, 35], 20),
+    ]
+    scheduler = ContinuousBatchingScheduler(model, WordTokenizer(), max_num_seqs=3)
+    scheduler.start()
+
+    async def run():
+        return await asyncio.gather(*[
+            generate_batched(scheduler, prompt_ids, max_new_tokens, delay=0.01 * i)
+            for i, (prompt_ids, max_new_tokens) in enumerate(prompts)
+        ])
+
+    results = asyncio.run(run())
+    for (prompt_ids, max_new_tokens), (text, num_tokens, finish_reason) in zip(prompts, results):
+        assert (text, num_tokens) == generate_reference(model, prompt_ids, max_new_tokens)
+        assert finish_reason == ("length" if num_tokens == max_new_tokens else "stop")
@@ -0,0 +1,86 @@
+import asyncio
+import math
+import time
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from emd.sdk.clients.integrations.langchain_clients import SageMakerVllmEmbeddings
+
+TEXTS = [f"{i} " + "word " * (i % 4) for i in range(23)]
+
+
+def position(text):
+    return int(text.split()[0])
+
+
+def embedding(text):
+    return [float(len(text)), float(position(text)), 0.0]
+
+
+def unit(vector):
+    norm = math.sqrt(sum(x * x for x in vector))
+    return [x / norm for x in vector]
+
+
+class FakeClient:
+    def __init__(self):
+        self.requests = []
+
+    def _respond(self, texts):
+        self.requests.append(texts)
+        data = [{"index": i, "embedding": embedding(text)} for i, text in enumerate(texts)]
+        return {"data": data[::-1]}
+
+    def _delay(self, texts):
+        # earlier batches finish last, so results complete out of order
+        return 0.02 * (len(TEXTS) - position(texts[0])) / len(TEXTS)
+
+    def invoke(self, request):
+        time.sleep(self._delay(request["input"]))
+        return self._respond(request["input"])
+
+    async def ainvoke(self, request):
+        await asyncio.sleep(self._delay(request["input"]))
+        return self._respond(request["input"])
+
+
+def make_embeddings(**kwargs):
+    client = FakeClient()
+    embeddings = SageMakerVllmEmbeddings.model_construct(sagemaker_client=client, **kwargs)
+    return embeddings, client
+
+
+def test_embed_documents_keeps_the_order_across_batches():
+    embeddings, client = make_embeddings(batch_size=4, max_concurrent_batches=4)
+    assert embeddings.embed_documents(TEXTS) == [embedding(text) for text in TEXTS]
+    batches = sorted(client.requests, key=lambda batch: position(batch[0]))
+    assert [len(batch) for batch in batches] == [4] * 5 + [3]
+    assert [text for batch in batches for text in batch] == TEXTS
+
+
+def test_batches_are_bounded_by_tokens():
+    embeddings, client = make_embeddings(batch_size=100, max_batch_tokens=20, token_counter=len)
+    assert embeddings.embed_documents(TEXTS) == [embedding(text) for text in TEXTS]
+    assert len(client.requests) > 1
+    assert all(sum(map(len, batch)) <= 20 for batch in client.requests)
+
+
+def test_aembed_documents_matches_embed_documents():
+    embeddings, client = make_embeddings(batch_size=5, max_concurrent_batches=2)
+    assert asyncio.run(embeddings.aembed_documents(TEXTS)) == [embedding(text) for text in TEXTS]
+    assert len(client.requests) == 5
+    assert asyncio.run(embeddings.aembed_documents([])) == embeddings.embed_documents([]) == []
+
+
+def test_normalize():
+    embeddings, _ = make_embeddings(batch_size=4, normalize=True)
+    expected = [unit(embedding(text)) for text in TEXTS]
+    for result in (embeddings.embed_documents(TEXTS), asyncio.run(embeddings.aembed_documents(TEXTS))):
+        assert len(result) == len(expected)
+        for vector, expected_vector in zip(result, expected):
+            assert vector == pytest.approx(expected_vector)
+    assert embeddings.embed_query(TEXTS[5]) == pytest.approx(unit(embedding(TEXTS[5])))
+    # zero vectors are left as they are
+    assert embeddings._normalize_vectors([[0.0, 0.0], [3.0, 4.0]]) == [[0.0, 0.0], [0.6, 0.8]]
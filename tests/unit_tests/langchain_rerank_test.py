@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from emd.sdk.clients.integrations.langchain_clients import SageMakerVllmRerank
+
+DOCUMENTS = ["apple", "banana pie", "cherry", "date palm tree", "elderberry"]
+QUERY = "fruit"
+
+
+def score(document):
+    return len(document) / 100
+
+
+class FakeClient:
+    def __init__(self):
+        self.requests = []
+
+    def invoke(self, request):
+        self.requests.append(request)
+        if "text_2" in request:
+            return {"data": [{"score": score(request["text_2"])}]}
+        results = [
+            {"index": i, "relevance_score": score(document)}
+            for i, document in enumerate(request["documents"])
+        ]
+        return {"results": results[::-1]}
+
+    async def ainvoke(self, request):
+        return self.invoke(request)
+
+
+def make_reranker(**kwargs):
+    client = FakeClient()
+    reranker = SageMakerVllmRerank.model_construct(sagemaker_client=client, **kwargs)
+    return reranker, client
+
+
+def expected(top_n=None):
+    ranked = sorted(range(len(DOCUMENTS)), key=lambda i: score(DOCUMENTS[i]), reverse=True)
+    return [{"index": i, "relevance_score": score(DOCUMENTS[i])} for i in ranked][:top_n]
+
+
+def test_score_mode_is_the_default():
+    reranker, client = make_reranker()
+    assert reranker.rerank(DOCUMENTS, QUERY) == expected()
+    assert sorted(client.requests, key=lambda r: r["text_2"]) == [
+        {"encoding_format": "float", "text_1": QUERY, "text_2": document} for document in DOCUMENTS
+    ]
+
+
+def test_rerank_mode_chunks_documents():
+    reranker, client = make_reranker(rerank_mode="rerank", max_documents_per_request=2)
+    assert reranker.rerank(DOCUMENTS, QUERY, top_n=3) == expected(3)
+    assert sorted(len(request["documents"]) for request in client.requests) == [1, 2, 2]
+    assert all(request["query"] == QUERY for request in client.requests)
+
+
+@pytest.mark.parametrize("rerank_mode", ["score", "rerank"])
+def test_arerank_matches_rerank(rerank_mode):
+    reranker, _ = make_reranker(rerank_mode=rerank_mode, max_documents_per_request=2)
+    assert asyncio.run(reranker.arerank(DOCUMENTS, QUERY, top_n=4)) == reranker.rerank(DOCUMENTS, QUERY, top_n=4)
@@ -0,0 +1,51 @@
+import pytest
+
+from utils import response_cache
+from utils.response_cache import ResponseCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(response_cache, "time", clock)
+    return clock
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = ResponseCache(max_bytes=1000, ttl=10)
+    cache.put("a", "value", size=100)
+    clock.now += 9.9
+    assert cache.get("a") == "value"
+    clock.now += 0.2
+    assert cache.get("a") is None
+    assert cache.current_bytes == 0
+
+
+def test_least_recently_used_entries_are_evicted_to_stay_within_budget(clock):
+    cache = ResponseCache(max_bytes=300)
+    for key in ("a", "b", "c"):
+        cache.put(key, key, size=100)
+    assert cache.get("a") == "a"
+    cache.put("d", "d", size=150)
+    # b and c were used least recently, both are evicted to fit d
+    assert [key for key in "abcd" if cache.get(key) is not None] == ["a", "d"]
+    assert cache.current_bytes == 250
+
+
+def test_replacing_and_oversized_entries(clock):
+    cache = ResponseCache(max_bytes=300)
+    cache.put("a", "old", size=100)
+    cache.put("a", "new", size=120)
+    assert cache.get("a") == "new"
+    assert cache.current_bytes == 120
+    cache.put("b", "too large", size=301)
+    assert cache.get("b") is None
+    assert cache.current_bytes == 120
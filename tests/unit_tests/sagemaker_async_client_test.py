@@ -0,0 +1,159 @@
+import asyncio
+import binascii
+import json
+import struct
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+boto3 = pytest.importorskip("boto3")
+
+from emd.sdk.clients.sagemaker_client import SageMakerClient
+
+SSE_STREAM = b'data: {"choices": [{"delta": {"content": "he"}}]}\n\ndata: {"choices": [{"delta": {"content": "llo"}}]}\n\ndata: [DONE]\n\n'
+
+
+def encode_event(payload: bytes, headers: dict) -> bytes:
+    """Encode an application/vnd.amazon.eventstream message."""
+    encoded_headers = b""
+    for name, value in headers.items():
+        name, value = name.encode(), value.encode()
+        # header value type 7 is a string
+        encoded_headers += struct.pack("!B", len(name)) + name + struct.pack("!BH", 7, len(value)) + value
+    total_length = 12 + len(encoded_headers) + len(payload) + 4
+    prelude = struct.pack("!II", total_length, len(encoded_headers))
+    prelude += struct.pack("!I", binascii.crc32(prelude))
+    message = prelude + encoded_headers + payload
+    return message + struct.pack("!I", binascii.crc32(message))
+
+
+def payload_part(payload: bytes) -> bytes:
+    return encode_event(payload, {":message-type": "event", ":event-type": "PayloadPart"})
+
+
+def split(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.fixture
+def transport(monkeypatch):
+    """Route the http clients of `ainvoke`/`astream` to a handler set by the test."""
+    handlers = []
+    clients = []
+    async_client = httpx.AsyncClient
+
+    def handler(request):
+        return handlers[0](request)
+
+    def make_client(**kwargs):
+        client = async_client(transport=httpx.MockTransport(handler), **kwargs)
+        clients.append(client)
+        return client
+
+    monkeypatch.setattr(httpx, "AsyncClient", make_client)
+    return handlers, clients
+
+
+def make_client(**kwargs):
+    session = boto3.Session(
+        aws_access_key_id="test",
+        aws_secret_access_key="test",
+        region_name="us-east-1"
+    )
+    return SageMakerClient.model_construct(
+        boto_session=session,
+        client=session.client("sagemaker-runtime"),
+        endpoint_name="test-endpoint",
+        **{"retry_base_delay": 0, **kwargs}
+    )
+
+
+def test_ainvoke_signs_and_retries_throttled_requests(transport):
+    handlers, _ = transport
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if len(requests) == 1:
+            return httpx.Response(429)
+        if len(requests) == 2:
+            return httpx.Response(400, headers={"x-amzn-errortype": "ThrottlingException:"})
+        return httpx.Response(200, json={"echo": json.loads(request.content)})
+    handlers.append(handler)
+
+    client = make_client(model_kwargs={"temperature": 0})
+    assert asyncio.run(client.ainvoke({"prompt": "hi"})) == {"echo": {"temperature": 0, "prompt": "hi"}}
+    assert len(requests) == 3
+    assert requests[0].url.path == "/endpoints/test-endpoint/invocations"
+    assert all(request.headers["authorization"].startswith("AWS4-HMAC-SHA256") for request in requests)
+
+
+def test_ainvoke_raises_other_errors_and_exhausted_retries(transport):
+    handlers, _ = transport
+    responses = iter([httpx.Response(400, text="bad request")] + [httpx.Response(503)] * 3)
+    handlers.append(lambda request: next(responses))
+
+    client = make_client(max_retries=2)
+    with pytest.raises(RuntimeError, match="400"):
+        asyncio.run(client.ainvoke({"prompt": "hi"}))
+    with pytest.raises(RuntimeError, match="503"):
+        asyncio.run(client.ainvoke({"prompt": "hi"}))
+    assert next(responses, None) is None
+
+
+def test_retry_delay_is_jittered():
+    client = make_client(retry_base_delay=0.5, retry_max_delay=3)
+    for attempt in range(6):
+        assert 0 <= client._get_retry_delay(attempt) <= min(3, 0.5 * 2 ** attempt)
+    retry_after = httpx.Response(429, headers={"retry-after": "1"})
+    assert all(1 <= client._get_retry_delay(0, retry_after) <= 1.5 for _ in range(20))
+    assert client._get_retry_delay(0, httpx.Response(429, headers={"retry-after": "10"})) == 3
+
+
+@pytest.mark.parametrize("size", [1, 7, 64])
+def test_astream_decodes_event_stream_split_anywhere(transport, size):
+    handlers, _ = transport
+    body = b"".join(payload_part(part) for part in split(SSE_STREAM, 10))
+
+    async def content():
+        for chunk in split(body, size):
+            yield chunk
+    handlers.append(lambda request: httpx.Response(200, content=content()))
+
+    async def stream():
+        return [chunk async for chunk in make_client().astream({"prompt": "hi"})]
+    chunks = asyncio.run(stream())
+    assert [chunk["choices"][0]["delta"]["content"] for chunk in chunks] == ["he", "llo"]
+
+
+def test_astream_raises_stream_exceptions(transport):
+    handlers, _ = transport
+    body = payload_part(SSE_STREAM[:20]) + encode_event(
+        b'{"Message": "model error"}',
+        {":message-type": "exception", ":exception-type": "ModelStreamError"}
+    )
+    handlers.append(lambda request: httpx.Response(200, content=body))
+
+    async def stream():
+        return [chunk async for chunk in make_client().astream({"prompt": "hi"})]
+    with pytest.raises(RuntimeError, match="ModelStreamError"):
+        asyncio.run(stream())
+
+
+def test_http_client_is_per_event_loop(transport):
+    handlers, clients = transport
+    handlers.append(lambda request: httpx.Response(200, json={}))
+    client = make_client()
+
+    async def invoke_twice():
+        await asyncio.gather(client.ainvoke({}), client.ainvoke({}))
+        # let the close of the client of the previous loop finish
+        await asyncio.sleep(0)
+
+    asyncio.run(invoke_twice())
+    assert len(clients) == 1
+    asyncio.run(invoke_twice())
+    assert len(clients) == 2
+    assert clients[0].is_closed and not clients[1].is_closed
+    asyncio.run(client.aclose())
+    assert clients[1].is_closed
@@ -0,0 +1,50 @@
+import pytest
+
+pytest.importorskip("boto3")
+
+from emd.sdk.status import StatusPoller, _wait_until_done
+
+
+def entry(status, in_progress):
+    return {"model_id": "m", "model_tag": "t", "source": "pipeline", "status": status, "in_progress": in_progress}
+
+
+class FakePoller(StatusPoller):
+    def __init__(self, snapshots):
+        super().__init__(min_interval=0.01, max_interval=0.05)
+        self.snapshots = snapshots
+
+    def _poll(self):
+        return self.snapshots.pop(0) if len(self.snapshots) > 1 else self.snapshots[0]
+
+
+def test_wait_returns_once_the_polled_entry_is_done():
+    poller = FakePoller([
+        {"pipeline:a": entry("InProgress", True)},
+        {"pipeline:a": entry("Succeeded", False)},
+    ])
+    seen = []
+    event = _wait_until_done("pipeline:a", on_event=seen.append, timeout=5, poller=poller)
+    assert event["status"] == "Succeeded"
+    assert [event["status"] for event in seen] == ["InProgress", "Succeeded"]
+
+
+def test_wait_checks_entries_the_poller_does_not_list():
+    poller = FakePoller([{"pipeline:other": entry("InProgress", True)}])
+    checks = []
+
+    def check():
+        checks.append(None)
+        return entry("InProgress", True) if len(checks) < 3 else entry("Failed", False)
+
+    seen = []
+    event = _wait_until_done("pipeline:a", on_event=seen.append, timeout=5, poller=poller, check=check)
+    assert event["status"] == "Failed" and event["previous_status"] == "InProgress"
+    assert len(checks) == 3
+    # unchanged statuses are reported once
+    assert [event["status"] for event in seen] == ["InProgress", "Failed"]
+
+
+def test_wait_times_out():
+    poller = FakePoller([{"pipeline:other": entry("InProgress", True)}])
+    assert _wait_until_done("pipeline:a", timeout=0.1, poller=poller, check=lambda: None) is None
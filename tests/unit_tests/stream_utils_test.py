@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+from emd.sdk.clients.stream_utils import AsyncLineIterator, LineDecoder, LineIterator, iter_stream_chunks
+
+STREAM = b'data: {"a": 1}\r\n\r\ndata: {"b": 2}\n\n: comment\ndata: [DONE]\r\n'
+LINES = [b'data: {"a": 1}', b"", b'data: {"b": 2}', b"", b": comment", b"data: [DONE]"]
+
+
+def split(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, len(STREAM)])
+def test_line_decoder_splits_crlf_and_lf_frames(size):
+    decoder = LineDecoder()
+    lines = []
+    for chunk in split(STREAM, size):
+        lines += decoder.feed(chunk)
+    lines += decoder.flush()
+    assert lines == LINES
+    assert not decoder.buffer
+
+
+def test_line_decoder_flushes_the_last_line_without_newline():
+    decoder = LineDecoder()
+    assert decoder.feed(b"first\r\nsec") == [b"first"]
+    assert decoder.feed(b"ond\r") == []
+    assert decoder.flush() == [b"second"]
+    assert decoder.flush() == []
+
+
+def test_line_iterators_read_sagemaker_events():
+    events = [{"PayloadPart": {"Bytes": chunk}} for chunk in split(STREAM, 5)] + [{"InternalStreamFailure": {}}]
+    assert list(LineIterator(events)) == LINES
+
+    async def stream():
+        for event in events:
+            yield event
+
+    async def read():
+        return [line async for line in AsyncLineIterator(stream())]
+
+    assert asyncio.run(read()) == LINES
+
+
+def test_iter_stream_chunks_skips_non_data_lines():
+    assert list(iter_stream_chunks(split(STREAM, 4))) == [{"a": 1}, {"b": 2}]